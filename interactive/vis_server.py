@@ -91,6 +91,10 @@ def mrc_compute(
     K2 = M2 // 20
     c = np.arange(1, M2, K2)
 
+    if cache_policy == "LRU":
+        # one stack-distance pass gives every size at once
+        return c, list(tg.mrc_lru(t, c)[1])
+
     hr = []
     for _c in c:
         C = int(_c)
@@ -0,0 +1,61 @@
+"""
+Alias Table
+- Walker/Vose alias method for drawing from a fixed discrete distribution;
+- O(k) to build, O(1) per draw, for both scalar and batch draws;
+- Built once per parameter change and cached by TraceGenerator/TraceReconstructor
+  instead of rebuilding a CDF on every access.
+"""
+
+import numpy as np
+
+class AliasTable:
+    def __init__(self, weights):
+        '''
+        weights: non-negative weights of the k classes, need not be normalized
+        '''
+        w = np.asarray(weights, dtype=np.float64)
+        k = len(w)
+        if k == 0 or w.sum() <= 0:
+            raise ValueError("AliasTable needs at least one positive weight.")
+        self.k = k
+        q = w * (k / w.sum())
+        self.alias = np.arange(k, dtype=np.int64)
+        small = np.flatnonzero(q < 1.0)
+        large = np.flatnonzero(q >= 1.0)
+        # Vose's pairing, done for many (small, large) pairs at once: every small
+        # class tops up its column from a distinct large class, and the large
+        # classes that drop below 1 become small in the next round.
+        while len(small) and len(large):
+            m = min(len(small), len(large))
+            s, l = small[:m], large[:m]
+            self.alias[s] = l
+            q[l] -= 1.0 - q[s]
+            small = np.concatenate((small[m:], l[q[l] < 1.0]))
+            large = np.concatenate((large[m:], l[q[l] >= 1.0]))
+        # leftovers are 1 up to rounding
+        q[small] = 1.0
+        q[large] = 1.0
+        self.prob = q
+
+    def sample(self, size=None, rng=None):
+        '''
+        draw class indices; a scalar if size is None, else an int64 array
+        rng: np.random.Generator to draw from, defaults to the global np.random state
+        '''
+        if rng is None:
+            i = np.random.randint(0, self.k, size)
+            u = np.random.random(size)
+        else:
+            i = rng.integers(0, self.k, size)
+            u = rng.random(size)
+        j = np.where(u < self.prob[i], i, self.alias[i])
+        return int(j) if size is None else j
+
+    def sample_into(self, out, rng=None, block=1 << 22):
+        '''
+        fill out (e.g. an int32 array) with draws, `block` at a time, so the
+        temporaries stay bounded however long out is
+        '''
+        for i in range(0, len(out), block):
+            out[i:i + block] = self.sample(len(out[i:i + block]), rng)
+        return out
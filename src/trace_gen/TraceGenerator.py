@@ -1,20 +1,23 @@
 import numpy as np
+import functools
 from trace_gen.misc import *
-import random
+from trace_gen.AliasTable import AliasTable
+from trace_gen.tracefile import trace_writer
 # import scipy.interpolate as interpolate
-import bisect
 
 class TraceGenerator:
-    def __init__(self, M, n):
+    def __init__(self, M, n, seed=None):
         '''
         M: set size of items
         n: trace length
+        seed: seed (or np.random.Generator) for this generator's own random stream
         weights: an vector of weights assigned to each IRD (IRM) class
         irm_frac: fraction of the generated trace that follows IRM (item drawn from a zipf-like distribution)   
         zipf_a: parameter for the zipf distribution, only relevant if irm_frac > 0
         '''
         self.M = M
         self.n = n
+        self.rng = np.random.default_rng(seed)
         self.zipf_a = 1.2 
         self.ird_k = None # num of classes for IRD
         self.irm_k = None # num of classes for IRM
@@ -33,21 +36,28 @@ class TraceGenerator:
         self.pdf_e = fgen(20, np.array([1]), 5e-3)
         self.pdf_f = fgen(5, np.array([2]), 1e-2)  
         self.irm_type = 'zipf'
+        self.alias_tables = {} # cached IRM interval samplers, keyed by 'zipf'/'pareto'
+        self.ird_alias = None # IRD class sampler, built by set_pdf
+        self.scheduler = 'heap' # next-reference scheduler, 'heap' or 'calendar'
     
     def set_zipf(self, a):
         self.zipf_a = a
+        self.alias_tables.clear()
     
     def set_pareto(self, a, xm):
         self.pareto_a = a
         self.pareto_xm = xm
+        self.alias_tables.clear()
     
     def set_normal(self, mean, std):
         self.normal_mean = mean
         self.normal_std = std
+        self.alias_tables.clear()
 
     def set_uniform(self, a, b):
         self.uniform_a = a
         self.uniform_b = b
+        self.alias_tables.clear()
 
     def set_p_irm(self, frac):
         self.p_irm = frac
@@ -60,6 +70,7 @@ class TraceGenerator:
     
     def set_irm_k(self, k):
         self.irm_k = k
+        self.alias_tables.clear()
 
     def set_irm_type(self, irm_type):
         self.irm_type = irm_type
@@ -72,58 +83,60 @@ class TraceGenerator:
     
     def set_p_single(self, p_single):
         self.p_single = p_single
+
+    def set_seed(self, seed):
+        self.rng = np.random.default_rng(seed)
+
+    def set_scheduler(self, scheduler):
+        # 'calendar' keys a calendar queue on tmax; faster for very large M
+        self.scheduler = scheduler
     
-    def sample_zipf(self):
+    def interval_alias(self, kind):
+        # alias table over the irm_k IRM intervals; built once per parameter change
         if self.irm_k is None:
             self.irm_k = len(self.pdf)
-        
-        num_intervals = self.irm_k
-        interval_width = self.M // num_intervals
-        
-        p = 1.0 / np.power(np.arange(1, num_intervals + 1), self.zipf_a)
-        p /= np.sum(p) 
-        
-        choice_interval = np.random.choice(num_intervals, p=p)
-        
-        lower_bound = choice_interval * interval_width
-        upper_bound = (choice_interval + 1) * interval_width
-        
-        sample = np.random.uniform(lower_bound, upper_bound)
-        
-        return sample
+        if kind not in self.alias_tables:
+            i = np.arange(1, self.irm_k + 1)
+            if kind == 'pareto':
+                p = (self.pareto_xm / i) ** self.pareto_a
+            else:
+                p = 1.0 / np.power(i, self.zipf_a)
+            self.alias_tables[kind] = AliasTable(p)
+        return self.alias_tables[kind]
 
-    def sample_pareto(self):
-        if self.irm_k is None:
-            self.irm_k = len(self.pdf)
+    def sample_interval(self, kind, size=None, rng=None):
+        alias = self.interval_alias(kind)
+        interval_width = self.M // self.irm_k
         
-        num_intervals = self.irm_k
-        interval_width = self.M // num_intervals
-        
-        p = (self.pareto_xm / np.arange(1, num_intervals + 1)) ** self.pareto_alpha
-        p /= np.sum(p)  
-        
-        choice_interval = np.random.choice(num_intervals, p=p)
+        rng = self.rng if rng is None else rng
+        choice_interval = alias.sample(size, rng)
         
         lower_bound = choice_interval * interval_width
         upper_bound = (choice_interval + 1) * interval_width
         
-        sample = np.random.uniform(lower_bound, upper_bound)
-        
-        return sample
+        return rng.uniform(lower_bound, upper_bound, size)
+
+    def sample_zipf(self, size=None, rng=None):
+        return self.sample_interval('zipf', size, rng)
+
+    def sample_pareto(self, size=None, rng=None):
+        return self.sample_interval('pareto', size, rng)
 
-    def samlple_uniform(self):
-        sample = np.random.uniform(0, self.M, 1)
-        return int(sample)
+    def samlple_uniform(self, size=None, rng=None):
+        rng = self.rng if rng is None else rng
+        sample = rng.uniform(0, self.M, size)
+        return int(sample) if size is None else sample.astype(np.int64)
     
-    def sample_normal(self):
-        sample = np.random.normal(self.normal_mean, self.normal_std, 1)
+    def sample_normal(self, size=None, rng=None):
+        rng = self.rng if rng is None else rng
+        sample = rng.normal(self.normal_mean, self.normal_std, size)
 
         sample = np.clip(sample, 0, self.M)
         
-        return int(sample)
+        return int(sample) if size is None else sample.astype(np.int64)
 
     def sample_sequential(self, length):
-        start = np.random.randint(0, self.M - length)
+        start = self.rng.integers(0, self.M - length)
         samples = np.arange(start, start + length)
         return samples
 
@@ -152,46 +165,108 @@ class TraceGenerator:
     #     return sample 
 
     def sample_from_pdf(self):
-        if random.random() < self.p_single:
+        if self.rng.random() < self.p_single:
             sample = -1
         else:
-            u = random.random()
-            chosen_bin = bisect.bisect_right(self.cdf, u)
+            chosen_bin = self.ird_alias.sample(rng=self.rng)
             bin_start = self.bin_edges[chosen_bin]
             bin_end = self.bin_edges[chosen_bin + 1]
-            sample = np.random.uniform(bin_start, bin_end)
+            sample = self.rng.uniform(bin_start, bin_end)
         return sample
 
+    def sample_from_pdf_batch(self, size):
+        # vectorized sample_from_pdf: draws `size` IRDs in one pass
+        samples = sample_pdf_irds(self.ird_alias, self.bin_edges, size, self.rng)
+        samples[self.rng.random(size) < self.p_single] = -1
+        return samples
+
     def sample_from_irds(self):
-        return np.random.choice(self.irds)
+        return self.rng.choice(self.irds)
 
-    def gen_from_pdf(self, pdf, p_irm): 
-        pdf = np.array(pdf)
-        pdf /= pdf.sum()
-        self.pdf = pdf
-        self.cdf = np.cumsum(self.pdf)
-        self.cdf[-1] = 1.0
-        self.p_irm = p_irm
-        self.compute_tmax_and_bins()
+    def sample_from_irds_batch(self, size):
+        return self.rng.choice(self.irds, size)
+
+    def irm_sampler(self):
         if self.irm_type == 'zipf' or self.irm_type is None:
-            trace = gen_from_both(self.sample_from_pdf, self.sample_zipf, self.M, self.n, p_irm)
+            return self.sample_zipf
         elif self.irm_type == 'pareto':
-            trace = gen_from_both(self.sample_from_pdf, self.sample_pareto, self.M, self.n, p_irm)
+            return self.sample_pareto
         elif self.irm_type == 'uniform':
-            trace = gen_from_both(self.sample_from_pdf, self.samlple_uniform, self.M, self.n, p_irm)
+            return self.samlple_uniform
         elif self.irm_type == 'normal':
-            trace = gen_from_both(self.sample_from_pdf, self.sample_normal, self.M, self.n, p_irm)
+            return self.sample_normal
         # elif irm_type == 'sequential': # deal with this later...
         #     if self.seq_length is None:
         #         raise ValueError("Please assign a length to the sequential trace first.")
         #     trace, is_irm = gen_from_ird_seq()
         else:
             raise ValueError("Invalid IRM distribution type.")
-        return trace
+
+    def set_pdf(self, pdf, p_irm):
+        pdf = np.array(pdf)
+        pdf /= pdf.sum()
+        self.pdf = pdf
+        self.cdf = np.cumsum(self.pdf)
+        self.cdf[-1] = 1.0
+        self.ird_alias = AliasTable(self.pdf)
+        self.p_irm = p_irm
+        self.compute_tmax_and_bins()
+
+    def gen_from_pdf(self, pdf, p_irm, parallel=False, workers=None, seed=None): 
+        '''
+        parallel/workers: shard the address space over a process pool of
+        `workers` (default: all cores); reproducible for a given seed and
+        worker count, see misc.gen_parallel; by default the seed is drawn
+        from this generator's stream
+        '''
+        self.set_pdf(pdf, p_irm)
+        if parallel or workers is not None:
+            if seed is None:
+                seed = int(self.rng.integers(2**63))
+            sampler = functools.partial(sample_pdf_irds, self.ird_alias, self.bin_edges)
+            return gen_parallel(sampler, self.irm_sampler(), self.M, self.n, p_irm, self.p_single, workers, seed,
+                                scheduler=self.scheduler, span=self.tmax)
+        return gen_from_both_batch(self.sample_from_pdf_batch, self.irm_sampler(), self.M, self.n, p_irm, rng=self.rng,
+                                   scheduler=self.scheduler, span=self.tmax)
 
     def gen_from_irds(self, irds, p_single):
         # treat p_single as p_irm
         irds = irds[irds > -1]
         self.irds = irds
-        trace = gen_from_both(self.sample_from_irds, self.sample_zipf, self.M, self.n, p_single)
-        return trace
\ No newline at end of file
+        trace = gen_from_both_batch(self.sample_from_irds_batch, self.sample_zipf, self.M, self.n, p_single, rng=self.rng,
+                                    scheduler=self.scheduler, span=irds.max())
+        return trace
+
+    def iter_chunks(self, pdf, p_irm, chunk=1 << 20, n=None):
+        '''
+        streaming gen_from_pdf: yields the trace as int32 arrays of `chunk`
+        accesses, holding only the M-sized heap and one chunk in memory.
+        n: trace length, defaults to self.n; n=-1 streams forever
+        '''
+        self.set_pdf(pdf, p_irm)
+        n = self.n if n is None else (None if n < 0 else n)
+        return gen_from_both_chunks(self.sample_from_pdf_batch, self.irm_sampler(), self.M, n, p_irm, chunk, self.rng,
+                                    self.scheduler, self.tmax)
+
+    def iter_chunks_from_irds(self, irds, p_single, chunk=1 << 20, n=None):
+        # streaming gen_from_irds, see iter_chunks
+        self.irds = irds[irds > -1]
+        n = self.n if n is None else (None if n < 0 else n)
+        return gen_from_both_chunks(self.sample_from_irds_batch, self.sample_zipf, self.M, n, p_single, chunk, self.rng,
+                                    self.scheduler, self.irds.max())
+
+    def write_to(self, path, pdf, p_irm, chunk=1 << 20, n=None, raw=False):
+        '''
+        stream the trace to `path` one chunk at a time, as a trace file (see
+        tracefile; open_trace memory-maps it back), or as bare int32
+        addresses with raw=True; returns the number of accesses written
+        '''
+        written = 0
+        with (open(path, 'wb') if raw else trace_writer(path)) as fp:
+            for a in self.iter_chunks(pdf, p_irm, chunk, n):
+                if raw:
+                    a.tofile(fp)
+                else:
+                    fp.write(a)
+                written += len(a)
+        return written
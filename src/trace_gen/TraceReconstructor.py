@@ -10,22 +10,137 @@ Trace Reconstructor
 import numpy as np
 from trace_gen.misc import *
 import trace_gen.iad_wrapper as iad_wrapper
+from trace_gen.AliasTable import AliasTable
 from trace_gen.unroll import *
+from trace_gen.traceparse_wrapper import read_blocks, traceparse
+from trace_gen.addrmap_wrapper import addrmap
 
 class TraceReconstructor:
-    def __init__(self, trace):
+    def __init__(self, trace, seed=None):
         self.trace = trace
+        self.rng = np.random.default_rng(seed)
         self.items, self.counts = None, None
         self.irm_cdf = None
+        self.irm_alias = None
         self.ird_pdf = None
         self.irm_trace = None
         self.irds = None
         self.M = None
         self.ird_trace = None
         self.p_single = None
-        
+        self.n = None if trace is None else len(trace)
+        # streaming fit: log-binned IRD histogram and # of singletons
+        self.ird_hist = None
+        self.ird_bins = None
+        self.ird_cold = 0
+        self.ird_alias = None
+
+    @classmethod
+    def from_file(cls, path, fmt='spc', block=4096, seed=None, threads=None, chunk_bytes=None,
+                  reservoir=None, bins=16):
+        # reconstructor of an SPC/MSR/trace-gen text trace, at `block`-byte
+        # blocks; with chunk_bytes, fitted chunk by chunk (see fit_chunks)
+        if chunk_bytes is None:
+            return cls(read_blocks(path, fmt, block, threads), seed)
+        p = traceparse(path, fmt, threads)
+        chunks = (unroll(p.extents(c, block)) for c in p.chunks(chunk_bytes))
+        return cls.from_chunks(chunks, seed, reservoir, bins)
+
+    @classmethod
+    def from_chunks(cls, chunks, seed=None, reservoir=None, bins=16):
+        # reconstructor fitted on a trace given as an iterable of chunks
+        # (tracefile chunks, traceparse blocks...), never held in memory
+        r = cls(None, seed)
+        r.fit_chunks(chunks, reservoir, bins)
+        return r
+
+    def fit_chunks(self, chunks, reservoir=None, bins=16):
+        """
+        fit the IRM and IRD statistics on a trace streamed as chunks, in
+        O(footprint + bins) memory: addresses are hashed to dense ids, the
+        distances come from the incremental iad2 state, and the per-item
+        counts are kept online. The IRDs are summarized either as a
+        histogram with `bins` log-spaced bins per octave (integers drawn
+        uniformly within a bin when sampling), or, with reservoir=R, as a
+        uniform sample of R of them (self.irds, as get_irds builds it).
+        """
+        amap = addrmap()
+        ird = iad_wrapper.iad2(1 << 20)
+        counts = np.zeros(0, dtype=np.int64)
+        pending, n_pending = [], 0
+        hist = np.zeros(0, dtype=np.int64)
+        res = np.zeros(0 if reservoir is None else reservoir, dtype=np.int64)
+        n, warm = 0, 0
+
+        def flush():
+            # counts of the buffered ids, one bincount per footprint-sized batch
+            nonlocal counts, pending, n_pending
+            c = np.bincount(np.concatenate(pending), minlength=len(amap))
+            c[:len(counts)] += counts
+            counts, pending, n_pending = c, [], 0
+
+        for chunk in chunks:
+            ids = amap.map(chunk)
+            d = ird.run(ids)
+            d = d[d > 0]
+            pending.append(ids)
+            n_pending += len(ids)
+            if n_pending >= max(1 << 22, len(counts)):
+                flush()
+            if reservoir is None:
+                c = np.bincount(np.floor(np.log2(d) * bins).astype(np.int64))
+                c[:len(hist)] += hist[:len(c)]
+                hist = np.concatenate((c, hist[len(c):]))
+            else:
+                # algorithm R, one chunk at a time
+                k = min(len(d), max(0, reservoir - warm))
+                res[warm:warm + k] = d[:k]
+                j = self.rng.integers(0, np.arange(warm + k, warm + len(d)) + 1)
+                hit = j < reservoir
+                res[j[hit]] = d[k:][hit]
+            warm += len(d)
+            n += len(ids)
+        if pending:
+            flush()
+
+        self.trace = None
+        self.n = n
+        items = amap.addresses()
+        order = np.argsort(items)
+        self.items, self.counts = items[order], counts[order]
+        self.M = len(self.items)
+        self.p_single = np.sum(counts == 1) / n if n else 0.0
+        self.irm_cdf, self.irm_alias = None, None
+        n_single = int(self.p_single * warm)
+        if reservoir is None:
+            self.irds = None
+            self.ird_hist = hist
+            self.ird_bins = bins
+            self.ird_cold = n_single
+            weights = np.r_[n_single, hist].astype(np.float64)
+            self.ird_alias = AliasTable(weights) if weights.sum() > 0 else None
+        else:
+            res = res[:min(warm, reservoir)]
+            self.irds = np.append(res, -np.ones(int(self.p_single * len(res))))
+            self.ird_hist = None
+
+    def _hist_edges(self):
+        # integer bounds [lo, hi) of every histogram bin
+        k = np.arange(len(self.ird_hist) + 1)
+        e = np.ceil(np.exp2(k / self.ird_bins)).astype(np.int64)
+        return e[:-1], e[1:]
+
+    def _sample_hist(self, size):
+        if self.ird_alias is None:
+            raise ValueError("no IRDs were fitted")
+        k = self.ird_alias.sample(size, self.rng) - 1
+        lo, hi = self._hist_edges()
+        b = np.maximum(k, 0)
+        d = lo[b] + np.floor(self.rng.random(size) * (hi[b] - lo[b])).astype(np.int64)
+        return np.where(k < 0, -1, d)
+
     def get_counts(self):
-        self.items, self.counts = np.unique(self.trace, return_counts=True)
+        self.items, self.counts = item_counts(self.trace)
         # self.item, self.inverse_indices = np.unique(self.trace, return_inverse=True)
         # self.M = np.sum(self.counts > 3)
         self.M = len(self.items)
@@ -34,12 +149,15 @@ class TraceReconstructor:
     def get_cdf(self):
         if self.counts is None:
             self.get_counts() 
-        self.irm_cdf = np.cumsum(self.counts) / len(self.trace)
+        self.irm_cdf = np.cumsum(self.counts) / self.n
+        self.irm_alias = AliasTable(self.counts)
 
     def gen_from_irm(self, length):
-        if self.irm_cdf is None:
+        if self.irm_alias is None:
             self.get_cdf()
-        self.irm_trace = [np.searchsorted(self.irm_cdf, _) for _ in np.random.random(length)]
+        # indices into self.items, drawn in blocks straight into the output
+        out = np.empty(length, dtype=np.int32 if self.M < 2**31 else np.int64)
+        self.irm_trace = self.irm_alias.sample_into(out, self.rng)
         return self.irm_trace
 
     def get_irds(self):
@@ -53,25 +171,52 @@ class TraceReconstructor:
         self.irds = ird
         
     def sample_ird(self):
+        if self.ird_hist is not None:
+            return int(self._sample_hist(1)[0])
         if self.irds is None:
             self.get_irds()
-        return np.random.choice(self.irds)
-        
-    def gen_from_ird(self, length):
+        return self.rng.choice(self.irds)
+
+    def sample_ird_batch(self, size):
+        if self.ird_hist is not None:
+            return self._sample_hist(size)
         if self.irds is None:
             self.get_irds()
+        return self.rng.choice(self.irds, size)
+
+    def gen_from_ird(self, length):
+        if self.irds is None and self.ird_hist is None:
+            self.get_irds()
         if self.M is None:
             self.get_counts()
-        self.ird_trace = gen_from_ird2(self.sample_ird, self.M, length)
+        self.ird_trace = gen_from_both_batch(self.sample_ird_batch, None, self.M, length, rng=self.rng)
         return self.ird_trace
 
     def dump_param(self, bin_num=100):
+        if self.ird_hist is not None:
+            return self._dump_hist(bin_num)
         if self.irds is None:
             self.get_irds()
         irds = self.irds[self.irds > -1]
         counts, bin_edges = np.histogram(irds, bins=bin_num, density=True)
         p_irm = self.p_single
         return bin_edges[:-1], counts, p_irm
+
+    def _dump_hist(self, bin_num):
+        # dump_param of the histogram fit: its IRDs spread uniformly over
+        # each log bin and re-binned on bin_num linear bins
+        lo, hi = self._hist_edges()
+        nz = np.flatnonzero(self.ird_hist)
+        w = self.ird_hist[nz].astype(np.float64)
+        lo, hi = lo[nz], hi[nz]
+        a, b = lo.min(), hi.max() - 1
+        if a == b:
+            a, b = a - 0.5, b + 0.5
+        bin_edges = np.linspace(a, b, bin_num + 1)
+        cdf = (w * np.clip((bin_edges[:, None] + 1 - lo) / (hi - lo), 0, 1)).sum(axis=1)
+        cdf[0] = 0
+        counts = np.diff(cdf) / (w.sum() * np.diff(bin_edges))
+        return bin_edges[:-1], counts, self.p_single
     
 # Example usage:
 # trace_reconstructor = TraceReconstructor("your_trace_file_name")
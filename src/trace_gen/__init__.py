@@ -7,6 +7,7 @@ from .lru_wrapper import *
 from .lfu_wrapper import *
 from .TraceReconstructor import *
 from .TraceGenerator import *
+from .AliasTable import *
 from .fifo_wrapper import *
 from .fifo_m_wrapper import *
 from .clock_wrapper import *
@@ -15,4 +16,9 @@ from .ran_sieve_wrapper import *
 from .sieve_wrapper import *
 from .rand_m_wrapper import *
 from .min_wrapper import *
+from .ird_gen_wrapper import *
+from .shards_wrapper import *
+from .addrmap_wrapper import *
+from .tracefile import *
+from .traceparse_wrapper import *
 # from .arc_wrapper import *
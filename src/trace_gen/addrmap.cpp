@@ -0,0 +1,146 @@
+#include <stdint.h>
+#include <stdexcept>
+#include <vector>
+#include <pybind11/pybind11.h>
+#include <pybind11/stl.h>
+#include <pybind11/numpy.h>
+
+namespace py = pybind11;
+
+/*
+  Address compaction: maps arbitrary 64-bit addresses (e.g. raw LBAs) to
+  dense ids 0..size-1, in order of first appearance, so the simulators,
+  which index per-address state by address, only need state for the
+  addresses a trace actually touches.
+
+  Open addressing with linear probing on a power-of-2 table of ids, kept at
+  most half full; the hash is MurmurHash3's 64-bit finalizer. keys[id] is
+  the inverse map. One addrmap can be fed several traces (or chunks of a
+  trace) and shared by several simulators, and keeps the same id for an
+  address throughout.
+ */
+
+class addrmap
+{
+	std::vector<int32_t> table; // slot -> id, -1 if empty
+	std::vector<int64_t> keys;	// id -> address
+	uint64_t mask = 0;
+
+	static uint64_t hash(int64_t a)
+	{
+		uint64_t k = (uint64_t)a;
+		k ^= k >> 33;
+		k *= 0xff51afd7ed558ccdULL;
+		k ^= k >> 33;
+		k *= 0xc4ceb9fe1a85ec53ULL;
+		k ^= k >> 33;
+		return k;
+	}
+
+	void grow()
+	{
+		table.assign(table.empty() ? 1024 : 2 * table.size(), -1);
+		mask = table.size() - 1;
+		for (size_t id = 0; id < keys.size(); id++)
+		{
+			uint64_t s = hash(keys[id]) & mask;
+			while (table[s] != -1)
+				s = (s + 1) & mask;
+			table[s] = id;
+		}
+	}
+
+public:
+	addrmap() { grow(); }
+	~addrmap() {}
+
+	int64_t size() { return keys.size(); }
+
+	// id of a, -1 if a was never mapped
+	int32_t find(int64_t a)
+	{
+		for (uint64_t s = hash(a) & mask;; s = (s + 1) & mask)
+		{
+			int32_t id = table[s];
+			if (id == -1 || keys[id] == a)
+				return id;
+		}
+	}
+
+	// id of a, assigning the next id if a is new
+	int32_t insert(int64_t a)
+	{
+		uint64_t s = hash(a) & mask;
+		for (;; s = (s + 1) & mask)
+		{
+			int32_t id = table[s];
+			if (id == -1)
+				break;
+			if (keys[id] == a)
+				return id;
+		}
+		if (keys.size() >= INT32_MAX)
+			throw std::overflow_error("addrmap: more than 2^31-1 distinct addresses");
+		int32_t id = keys.size();
+		keys.push_back(a);
+		table[s] = id;
+		if (2 * keys.size() > table.size())
+			grow();
+		return id;
+	}
+
+	template <class T>
+	void map(int64_t n, const T *in, int32_t *out)
+	{
+		for (int64_t i = 0; i < n; i++)
+			out[i] = insert(in[i]);
+	}
+
+	template <class T>
+	void lookup(int64_t n, const T *in, int32_t *out)
+	{
+		for (int64_t i = 0; i < n; i++)
+			out[i] = find(in[i]);
+	}
+
+	// address of every id, id order; returns size()
+	int64_t addresses(int64_t *out)
+	{
+		for (size_t id = 0; id < keys.size(); id++)
+			out[id] = keys[id];
+		return keys.size();
+	}
+};
+
+PYBIND11_MODULE(_addrmap, m)
+{
+	py::class_<addrmap>(m, "addrmap")
+		.def(py::init<>())
+		.def("size", &addrmap::size)
+		.def("find", &addrmap::find)
+		.def("insert", &addrmap::insert);
+
+	m.def("addrmap_create", []() {
+		return new addrmap();
+	});
+	m.def("addrmap_size", [](void *_a) {
+		addrmap *a = (addrmap *)_a;
+		return a->size();
+	});
+	m.def("addrmap_map", [](void *_a, int64_t n, py::array_t<int64_t, py::array::c_style> &in, py::array_t<int32_t> &out) {
+		addrmap *a = (addrmap *)_a;
+		a->map(n, in.data(), out.mutable_data());
+	}, py::call_guard<py::gil_scoped_release>());
+	m.def("addrmap_map32", [](void *_a, int64_t n, py::array_t<int32_t, py::array::c_style> &in, py::array_t<int32_t> &out) {
+		addrmap *a = (addrmap *)_a;
+		a->map(n, in.data(), out.mutable_data());
+	}, py::call_guard<py::gil_scoped_release>());
+	m.def("addrmap_lookup", [](void *_a, int64_t n, py::array_t<int64_t, py::array::c_style> &in, py::array_t<int32_t> &out) {
+		addrmap *a = (addrmap *)_a;
+		a->lookup(n, in.data(), out.mutable_data());
+	}, py::call_guard<py::gil_scoped_release>());
+	m.def("addrmap_addresses", [](void *_a, py::array_t<int64_t> &out) {
+		addrmap *a = (addrmap *)_a;
+		return a->addresses(out.mutable_data());
+	});
+}
@@ -0,0 +1,59 @@
+import numpy as np
+import _addrmap
+
+
+class addrmap:
+    # native open-addressing map from 64-bit addresses to dense int32 ids
+    # (first-appearance order); pass one as amap= to any simulator so that
+    # sparse traces (e.g. raw LBAs) only cost state per distinct address.
+    # Ids persist across calls, so one map can be shared by several
+    # simulators or fed a trace chunk by chunk (from one thread at a time).
+    def __init__(self):
+        self.a = _addrmap.addrmap_create()
+
+    def __len__(self):
+        return _addrmap.addrmap_size(self.a)
+
+    def map(self, trace):
+        # dense id of every address of trace, assigning ids to new addresses
+        trace = np.ascontiguousarray(trace)
+        out = np.empty(len(trace), dtype=np.int32)
+        if trace.dtype == np.int32:
+            _addrmap.addrmap_map32(self.a, len(trace), trace, out)
+        else:
+            _addrmap.addrmap_map(self.a, len(trace), trace.astype(np.int64, copy=False), out)
+        return out
+
+    def lookup(self, trace):
+        # dense id of every address of trace, -1 for unmapped addresses
+        trace = np.ascontiguousarray(trace, dtype=np.int64)
+        out = np.empty(len(trace), dtype=np.int32)
+        _addrmap.addrmap_lookup(self.a, len(trace), trace, out)
+        return out
+
+    def addresses(self):
+        # address of every id, in id order
+        out = np.empty(len(self), dtype=np.int64)
+        _addrmap.addrmap_addresses(self.a, out)
+        return out
+
+    def unmap(self, ids):
+        return self.addresses()[ids]
+
+
+def dense_trace(trace):
+    # trace the simulators can index directly: int32 and int64 traces
+    # (memmaps and contiguous slices too) are passed through without a copy,
+    # other dtypes are converted to int32 (int64 if addresses pass 2^31);
+    # traces too sparse to index directly are compacted through an addrmap
+    # (hit rates do not depend on the address labels)
+    trace = np.asarray(trace)
+    if len(trace) == 0:
+        return trace.astype(np.int32)
+    lo, hi = trace.min(), trace.max()
+    if lo >= 0 and hi < max(1 << 20, 4 * len(trace)):
+        if trace.dtype in (np.int32, np.int64):
+            return np.ascontiguousarray(trace)
+        dtype = np.int32 if hi <= np.iinfo(np.int32).max else np.int64
+        return np.ascontiguousarray(trace, dtype=dtype)
+    return addrmap().map(trace)
@@ -158,7 +158,7 @@ PYBIND11_MODULE(_arc, m) {
     });
     m.def("arc_data", [](py::object _a) -> py::tuple {
         if (py::isinstance<arc>(_a)) {
-            arc ar = _a.cast<arc>();
+            arc& ar = _a.cast<arc&>();
             int access_count, miss_count;
             ar.data(access_count, miss_count);
             return py::make_tuple(access_count, miss_count);
@@ -7,6 +7,7 @@
 #include <pybind11/pybind11.h>
 #include <pybind11/stl.h>
 #include <pybind11/numpy.h>
+#include "sim_common.h"
 
 namespace py = pybind11;
 
@@ -14,23 +15,23 @@ class clock1
 {
 	int C = 0;
 	int K = 1;
-	std::vector<int> cache;
-	std::vector<int> t_enter;
+	std::vector<int64_t> cache;
+	std::vector<int64_t> t_enter;
 	std::vector<int> counter;
 	std::vector<char> map;
-	std::vector<int> enter; // time item entered cache
-	std::vector<int> ref;	// time item last referenced
+	std::vector<int64_t> enter; // time item entered cache
+	std::vector<int64_t> ref;	// time item last referenced
 
-	int n_top = 0;
+	int64_t n_top = 0;
 	double sum_top = 0, sum_top2 = 0;
 
 	int in = 0, out = 0;
-	int n_cachefill = 0;
-	int n_access = 0;
-	int n_miss = 0;
-	int n_recycle = 0;
-	int n_examined = 0;
-	int sum_counter = 0;
+	int64_t n_cachefill = 0;
+	int64_t n_access = 0;
+	int64_t n_miss = 0;
+	int64_t n_recycle = 0;
+	int64_t n_examined = 0;
+	int64_t sum_counter = 0;
 
 public:
 	clock1(int _C, int _K = 1)
@@ -49,19 +50,19 @@ public:
 		return (in + 1) % (C + 1) == out;
 	}
 
-	int pop(void)
+	int64_t pop(void)
 	{
-		int32_t addr = cache[out];
-		int age = (n_access - t_enter[out]);
+		int64_t addr = cache[out];
+		int64_t age = (n_access - t_enter[out]);
 		out = (out + 1) % (C + 1);
 		map[addr] = false;
 		sum_top += age;
-		sum_top2 += (age * age);
+		sum_top2 += 1.0 * age * age;
 		n_top++;
 		return addr;
 	}
 
-	void push(int32_t addr)
+	void push(int64_t addr)
 	{
 		cache[in] = addr;
 		t_enter[in] = n_access;
@@ -70,9 +71,9 @@ public:
 	}
 
 	// must have enough space for C entries
-	int contents(py::array_t< int >& val)
+	int contents(py::array_t< int64_t >& val)
 	{
-		int* val_ptr = val.mutable_data();
+		int64_t* val_ptr = val.mutable_data();
 		int i, n;
 		for (i = (in + C) % (C + 1), n = 0;; i = (i + C) % (C + 1))
 		{
@@ -83,12 +84,12 @@ public:
 		return n;
 	}
 
-	void access(int32_t addr)
+	void access(int64_t addr)
 	{
 		n_access++;
 		if (addr >= map.size())
 		{
-			int n = std::max(addr * 3 / 2, addr + 1);
+			int64_t n = std::max(addr * 3 / 2, addr + 1);
 			map.resize(n, 0);
 			counter.resize(n, 0);
 		}
@@ -125,13 +126,13 @@ public:
 		}
 	}
 
-	void access_verbose(int32_t addr, int32_t* evict_addr, int* miss,
-						int* ref_age, int* enter_age)
+	void access_verbose(int64_t addr, int64_t* evict_addr, int* miss,
+						int64_t* ref_age, int64_t* enter_age)
 	{
 		n_access++;
 		if (addr >= map.size())
 		{
-			int n = std::max(addr * 3 / 2, addr + 1);
+			int64_t n = std::max(addr * 3 / 2, addr + 1);
 			map.resize(n, 0);
 			counter.resize(n, 0);
 			enter.resize(n, 0);
@@ -181,16 +182,17 @@ public:
 		}
 	}
 
-	void multi_access(int n, py::array_t< int32_t >& addrs)
+	template <class T>
+	void multi_access(int64_t n, py::array_t<T, py::array::c_style>& addrs)
 	{
-		int32_t* addrs_ptr = addrs.mutable_data();
-		for (int i = 0; i < n; i++)
+		const T* addrs_ptr = addrs.data();
+		for (int64_t i = 0; i < n; i++)
 			access(addrs_ptr[i]);
 	}
 
-	void queue_stats(py::array_t< int >& n, py::array_t<double>& sum, py::array_t<double>& sum2)
+	void queue_stats(py::array_t< int64_t >& n, py::array_t<double>& sum, py::array_t<double>& sum2)
 	{
-		int* n_ptr = n.mutable_data();
+		int64_t* n_ptr = n.mutable_data();
 		double* sum_ptr = sum.mutable_data();
 		double* sum2_ptr = sum2.mutable_data();
 		*n_ptr = n_top;
@@ -198,18 +200,19 @@ public:
 		*sum2_ptr = sum_top2;
 	}
 
-	void multi_access_age(int n, py::array_t< int32_t >& addrs, py::array_t< int >& evicted, py::array_t< int >& misses,
-						  py::array_t< int >& age1, py::array_t< int >& age2)
+	template <class T>
+	void multi_access_age(int64_t n, py::array_t<T, py::array::c_style>& addrs, py::array_t< int64_t >& evicted, py::array_t< int >& misses,
+						  py::array_t< int64_t >& age1, py::array_t< int64_t >& age2)
 	{
-		int32_t* addrs_ptr = addrs.mutable_data();
-		int* evicted_ptr = evicted.mutable_data();
+		const T* addrs_ptr = addrs.data();
+		int64_t* evicted_ptr = evicted.mutable_data();
 		int* misses_ptr = misses.mutable_data();
-		int* age1_ptr = age1.mutable_data();
-		int* age2_ptr = age2.mutable_data();
+		int64_t* age1_ptr = age1.mutable_data();
+		int64_t* age2_ptr = age2.mutable_data();
 
 		enter.resize(100000);
 		ref.resize(100000);
-		for (int i = 0; i < n; i++)
+		for (int64_t i = 0; i < n; i++)
 			access_verbose(addrs_ptr[i], &evicted_ptr[i], &misses_ptr[i], &age1_ptr[i], &age2_ptr[i]);
 	}
 
@@ -219,8 +222,8 @@ public:
 		return 1 - miss_rate;
 	}
 
-	void data(int &_access, int &_miss, int &_cachefill, int &_recycle,
-			  int &_examined, int &_sum_counter)
+	void data(int64_t &_access, int64_t &_miss, int64_t &_cachefill, int64_t &_recycle,
+			  int64_t &_examined, int64_t &_sum_counter)
 	{
 		_access = n_access;
 		_miss = n_miss;
@@ -231,32 +234,69 @@ public:
 	}
 };
 
+// the bindings that take a trace, for int32 or int64 addresses
+template <class T>
+static void def_runs(py::module_& m)
+{
+	m.def("clock1_run", [](void* _c, int64_t n, py::array_t<T, py::array::c_style>& a) {
+		clock1* c = (clock1 *)_c;
+		c->multi_access(n, a);
+	}, py::call_guard<py::gil_scoped_release>());
+	// cumulative (accesses, misses) at window ends, see run_windows()
+	m.def("clock1_run_windows", [](void* _c, int64_t n, py::array_t<T, py::array::c_style>& a, int64_t first, int64_t window,
+								  py::array_t<int64_t>& acc, py::array_t<int64_t>& miss) {
+		clock1* c = (clock1*)_c;
+		return run_windows(*c, a.data(), n, first, window, acc.mutable_data(), miss.mutable_data(),
+						   [](clock1& c, int64_t& _a, int64_t& _m) { int64_t x[4]; c.data(_a, _m, x[0], x[1], x[2], x[3]); });
+	}, py::call_guard<py::gil_scoped_release>());
+	m.def("clock1_run_age", [](void* _c, int64_t n, py::array_t<T, py::array::c_style>& a, py::array_t< int64_t >& b, py::array_t< int >& c, py::array_t< int64_t >& d, py::array_t< int64_t >& e) {
+		clock1* cl = (clock1 *)_c;
+		cl->multi_access_age(n, a, b, c, d, e);
+	}, py::call_guard<py::gil_scoped_release>());
+
+	// raw hit rate of one clock1 per size, all run in a single tiled pass
+	m.def("clock1_mrc", [](int64_t n, py::array_t<T, py::array::c_style>& addrs, std::vector<int> sizes, int K, int threads) {
+		std::vector<std::unique_ptr<clock1>> caches;
+		for (int C : sizes)
+			caches.emplace_back(new clock1(C, K));
+		{
+			py::gil_scoped_release release;
+			run_tiled(caches, addrs.data(), n, threads);
+		}
+		py::array_t<double> hr(caches.size());
+		double* hr_ptr = hr.mutable_data();
+		for (size_t j = 0; j < caches.size(); j++)
+		{
+			int64_t a, m, c, r, x, y;
+			caches[j]->data(a, m, c, r, x, y);
+			hr_ptr[j] = a ? 1 - (double)m / a : 0;
+		}
+		return hr;
+	}, py::arg("n"), py::arg("addrs"), py::arg("sizes"), py::arg("K") = 1, py::arg("threads") = 1);
+}
+
 PYBIND11_MODULE(_clock, m)
 {
 	py::class_<clock1>(m, "clock1")
 		.def(py::init<int, int>(), py::arg("C"), py::arg("K") = 1)
-		.def("multi_access", &clock1::multi_access)
+		.def("multi_access", &clock1::multi_access<int32_t>, py::call_guard<py::gil_scoped_release>())
+		.def("multi_access", &clock1::multi_access<int64_t>, py::call_guard<py::gil_scoped_release>())
 		.def("contents", &clock1::contents)
-		.def("multi_access_age", &clock1::multi_access_age)
+		.def("multi_access_age", &clock1::multi_access_age<int32_t>, py::call_guard<py::gil_scoped_release>())
+		.def("multi_access_age", &clock1::multi_access_age<int64_t>, py::call_guard<py::gil_scoped_release>())
 		.def("queue_stats", &clock1::queue_stats)
 		.def("hit_rate", &clock1::hit_rate)
 		.def("data", &clock1::data);
 	m.def("clock1_create", [](int C, int K) {
 		return new clock1(C, K);
 	}, py::arg("C"), py::arg("K") = 1);
-	m.def("clock1_run", [](void* _c, int n, py::array_t< int32_t >& a) {
-		clock1* c = (clock1 *)_c;
-		c->multi_access(n, a);
-	});
-	m.def("clock1_contents", [](void* _c, py::array_t< int >& out) {
+	def_runs<int32_t>(m);
+	def_runs<int64_t>(m);
+	m.def("clock1_contents", [](void* _c, py::array_t< int64_t >& out) {
 		clock1* c = (clock1 *)_c;
 		return c->contents(out);
 	});
-	m.def("clock1_run_age", [](void* _c, int n, py::array_t< int32_t >& a, py::array_t< int >& b, py::array_t< int >& c, py::array_t< int >& d, py::array_t< int >& e) {
-		clock1* cl = (clock1 *)_c;
-		cl->multi_access_age(n, a, b, c, d, e);
-	});
-	m.def("clock1_queue_stats", [](void* _c, py::array_t< int >& n, py::array_t< double >& sum, py::array_t< double >& sum2) {
+	m.def("clock1_queue_stats", [](void* _c, py::array_t< int64_t >& n, py::array_t< double >& sum, py::array_t< double >& sum2) {
 		clock1* c = (clock1 *)_c;
 		c->queue_stats(n, sum, sum2);
 	});
@@ -267,8 +307,8 @@ PYBIND11_MODULE(_clock, m)
 	m.def("clock1_data", [](py::object _c) -> py::tuple {
 		if (py::isinstance<clock1>(_c))
 		{
-			clock1 cl = _c.cast<clock1>();
-			int _access, _miss, _cachefill, _recycle, _examined, _sum_counter;
+			clock1& cl = _c.cast<clock1&>();
+			int64_t _access, _miss, _cachefill, _recycle, _examined, _sum_counter;
 			cl.data(_access, _miss, _cachefill, _recycle, _examined, _sum_counter);
 			return py::make_tuple(_access, _miss, _cachefill, _recycle, _examined, _sum_counter);
 		} else {
@@ -1,61 +1,61 @@
 from ctypes import *
 import numpy as np
+from trace_gen.addrmap_wrapper import dense_trace
+from trace_gen import windows
 import _clock
 
 class clock:
-    def __init__(self, C, K=1):
+    def __init__(self, C, K=1, amap=None):
+        self.amap = amap
         self.f = _clock.clock1_create(C, K)
         self.C = C
         self.K = K
 
     def run(self, trace):  # clock* new f; f->multi-access(n, a)
-        if type(trace[0]) != np.int32:
+        if self.amap is not None:
+            trace = self.amap.map(trace)
+        if type(trace[0]) not in (np.int32, np.int64):
             trace = np.array(trace, dtype=np.int32)
         _clock.clock1_run(self.f, len(trace), trace)
 
     def contents(self):
-        val = np.zeros(self.C, dtype=np.int32)
+        val = np.zeros(self.C, dtype=np.int64)
         n = _clock.clock1_contents(self.f, val)
-        return val[:n]
+        return val[:n] if self.amap is None else self.amap.unmap(val[:n])
+
+    def run_windows(self, trace, window, snapshots=None):
+        # (accesses, misses) of every window of trace in one native call,
+        # plus contents() after each of the snapshots offsets if given
+        return windows.run_windows(self, _clock.clock1_run_windows, self.f, trace, window, snapshots)
 
     def run_parts(self, trace, n):
-        a0, m0, vals = 0, 0, []
-        for i in range(0, len(trace), n):
-            # print('y', i, n, i*n, (i+1)*n)
-            t = np.array(trace[i:i+n], dtype=np.int32)
-            self.run(t)
-            # code here
-            a, m, c, r, x, y = self.data()
-            # print('x', a,m,c,r)
-            vals.append(1 - (m-m0)/(a-a0))
-            a0, m0 = a, m
-        return np.array(vals)
+        # hit rate of every window of n references
+        a, m = self.run_windows(trace, n)
+        return 1 - m / a
 
     # run slice to get contents: return a list of cache states.
     def run_slices(self, trace, n):
-        sliced_contents = []
-        for i in range(0, len(trace), n):
-            # print('y', i, n, i*n, (i+1)*n)
-            t = np.array(trace[i:i+n], dtype=np.int32)
-            self.run(t)
-            contents = self.contents()
-            sliced_contents.append(contents)
-        return sliced_contents
+        ends = [min(i + n, len(trace)) for i in range(0, len(trace), n)]
+        return self.run_windows(trace, n, ends)[2]
 
     def run_verbose(self, trace):
-        if type(trace[0]) != np.int32:
+        if self.amap is not None:
+            trace = self.amap.map(trace)
+        if type(trace[0]) not in (np.int32, np.int64):
             trace = np.array(trace, dtype=np.int32)
         misses = np.zeros(len(trace), dtype=np.int32)
         _clock.clock1_run_verbose(self.f, len(trace), trace, misses)
         return misses
 
     def run_age(self, trace):
-        if type(trace[0]) != np.int32:
+        if self.amap is not None:
+            trace = self.amap.map(trace)
+        if type(trace[0]) not in (np.int32, np.int64):
             trace = np.array(trace, dtype=np.int32)
         misses = np.zeros(len(trace), dtype=np.int32)
-        evicted = np.zeros(len(trace), dtype=np.int32)
-        age1 = np.zeros(len(trace), dtype=np.int32)
-        age2 = np.zeros(len(trace), dtype=np.int32)
+        evicted = np.zeros(len(trace), dtype=np.int64)
+        age1 = np.zeros(len(trace), dtype=np.int64)
+        age2 = np.zeros(len(trace), dtype=np.int64)
         _clock.clock1_run_age(self.f, len(trace), trace, evicted, misses, age1, age2)
         return [age1, age2, misses]
 
@@ -64,9 +64,9 @@ class clock:
         return 1 - (m - self.C) / (a - c)
 
     def queue_raw_stats(self):
-        n, s, s2 = c_int(), c_double(), c_double()
+        n, s, s2 = np.zeros(1, dtype=np.int64), np.zeros(1), np.zeros(1)
         _clock.clock1_queue_stats(self.f, n, s, s2)
-        return [n.value, s.value, s2.value]
+        return [int(n[0]), s[0], s2[0]]
 
     # returns (mean, std)
     def queue_stats(self):
@@ -77,3 +77,9 @@ class clock:
         return _clock.clock1_data(self.f)
 
         
+
+
+def clock_mrc(trace, sizes, K=1, threads=1):
+    # raw hit rate of a CLOCK cache of each size, in one tiled native pass
+    trace = dense_trace(trace)
+    return _clock.clock1_mrc(len(trace), trace, [int(C) for C in sizes], K, threads)
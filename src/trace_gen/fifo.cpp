@@ -6,25 +6,26 @@
 #include <pybind11/pybind11.h>
 #include <pybind11/stl.h>
 #include <pybind11/numpy.h>
+#include "sim_common.h"
 
 namespace py = pybind11;
 
 class fifo
 {
 	int C = 0;
-	std::vector<int> cache;
-	std::vector<int> enter;
+	std::vector<int64_t> cache;
+	std::vector<int64_t> enter;
 
-	int n_evict = 0;
+	int64_t n_evict = 0;
 	double s_evict = 0;
 	double s2_evict = 0;
 
 	std::vector<char> map;
 
 	int in = 0, out = 0;
-	int n_cachefill = 0;
-	int n_access = 0;
-	int n_miss = 0;
+	int64_t n_cachefill = 0;
+	int64_t n_access = 0;
+	int64_t n_miss = 0;
 
 public:
 	fifo(int _C)
@@ -36,7 +37,7 @@ public:
 	}
 	~fifo() {}
 
-	void access(int32_t addr)
+	void access(int64_t addr)
 	{
 		n_access++;
 
@@ -53,9 +54,9 @@ public:
 			}
 			else
 			{
-				int evictee = cache[out];
+				int64_t evictee = cache[out];
 
-				int age = n_access - enter[out];
+				int64_t age = n_access - enter[out];
 				n_evict++;
 				s_evict += age;
 				s2_evict += 1.0 * age * age;
@@ -71,9 +72,9 @@ public:
 		assert(0 <= in && in < C + 1 && 0 <= out && out < C + 1);
 	}
 
-	int contents(py::array_t<int>& val)
+	int contents(py::array_t<int64_t>& val)
 	{
-		int *val_ptr = val.mutable_data();
+		int64_t *val_ptr = val.mutable_data();
 		int i, n = 0;
 		for (i = (in + C) % (C + 1);; i = (i + C) % (C + 1))
 		{
@@ -84,39 +85,42 @@ public:
 		return n;
 	}
 
-	void multi_access(int n, py::array_t< int32_t >& addrs)
+	template <class T>
+	void multi_access(int64_t n, py::array_t<T, py::array::c_style>& addrs)
 	{
-		int32_t *addrs_ptr = addrs.mutable_data();
+		const T *addrs_ptr = addrs.data();
 		
-		for (int i = 0; i < n; i++)
+		for (int64_t i = 0; i < n; i++)
 			access(addrs_ptr[i]);
 	}
 
-	void multi_access_verbose(int n, py::array_t<int32_t>& addrs, py::array_t< int >& misses)
+	template <class T>
+	void multi_access_verbose(int64_t n, py::array_t<T, py::array::c_style>& addrs, py::array_t< int >& misses)
 	{
-		int32_t *addrs_ptr = addrs.mutable_data();
+		const T *addrs_ptr = addrs.data();
 		int *misses_ptr = misses.mutable_data();
 
-		for (int i = 0; i < n; i++)
+		for (int64_t i = 0; i < n; i++)
 		{
 
-			int nm = n_miss;
+			int64_t nm = n_miss;
 			access(addrs_ptr[i]);
 			if (n_miss != nm)
 				misses_ptr[i] = 1;
 		}
 	}
 
-	void multi_access_age(int n, py::array_t<int32_t>& addrs, py::array_t< int >& misses, py::array_t<int>& age)
+	template <class T>
+	void multi_access_age(int64_t n, py::array_t<T, py::array::c_style>& addrs, py::array_t< int >& misses, py::array_t<int64_t>& age)
 	{
-		int32_t *addrs_ptr = addrs.mutable_data();
+		const T *addrs_ptr = addrs.data();
 		int *misses_ptr = misses.mutable_data();
-		int *age_ptr = age.mutable_data();
+		int64_t *age_ptr = age.mutable_data();
 
-		std::vector<int> times;
-		times.resize(C, 0);
-		int t = 1;
-		for (int i = 0; i < n; i++, t++)
+		std::vector<int64_t> times;
+		times.resize(C + 1, 0);
+		int64_t t = 1;
+		for (int64_t i = 0; i < n; i++, t++)
 		{
 			n_access++;
 			auto addr = addrs_ptr[i];
@@ -132,7 +136,7 @@ public:
 				}
 				else
 				{
-					int evictee = cache[out];
+					int64_t evictee = cache[out];
 					age_ptr[i] = t - times[out];
 					out = (out + 1) % (C + 1);
 					map[evictee] = false;
@@ -151,9 +155,9 @@ public:
 		return 1 - miss_rate;
 	}
 
-	void queue_stats(py::array_t< int32_t >& n, py::array_t<double>& s, py::array_t<double>& s2)
+	void queue_stats(py::array_t< int64_t >& n, py::array_t<double>& s, py::array_t<double>& s2)
 	{
-		int32_t* n_ptr = n.mutable_data();
+		int64_t* n_ptr = n.mutable_data();
 		double* s_ptr = s.mutable_data();
 		double* s2_ptr = s2.mutable_data();
 
@@ -162,7 +166,7 @@ public:
 		*s2_ptr = s2_evict;
 	}
 
-	void data(int &_access, int &_miss, int &_cachefill)
+	void data(int64_t &_access, int64_t &_miss, int64_t &_cachefill)
 	{
 		_access = n_access;
 		_miss = n_miss;
@@ -170,49 +174,87 @@ public:
 	}
 };
 
+// the bindings that take a trace, for int32 or int64 addresses
+template <class T>
+static void def_runs(py::module_& m)
+{
+	m.def("fifo_run", [](void *_f, int64_t n, py::array_t<T, py::array::c_style>& a) {
+		fifo *f = (fifo *)_f;
+		f->multi_access(n, a);
+	}, py::call_guard<py::gil_scoped_release>());
+	// cumulative (accesses, misses) at window ends, see run_windows()
+	m.def("fifo_run_windows", [](void* _f, int64_t n, py::array_t<T, py::array::c_style>& a, int64_t first, int64_t window,
+								  py::array_t<int64_t>& acc, py::array_t<int64_t>& miss) {
+		fifo* f = (fifo*)_f;
+		return run_windows(*f, a.data(), n, first, window, acc.mutable_data(), miss.mutable_data(),
+						   [](fifo& c, int64_t& _a, int64_t& _m) { int64_t f; c.data(_a, _m, f); });
+	}, py::call_guard<py::gil_scoped_release>());
+	m.def("fifo_run_verbose", [](void *_f, int64_t n, py::array_t<T, py::array::c_style>& a, py::array_t< int >& b) {
+		fifo *f = (fifo *)_f;
+		f->multi_access_verbose(n, a, b);
+	}, py::call_guard<py::gil_scoped_release>());
+	m.def("fifo_run_age", [](void *_f, int64_t n, py::array_t<T, py::array::c_style>& a, py::array_t< int >& b, py::array_t< int64_t >& c) {
+		fifo *f = (fifo *)_f;
+		f->multi_access_age(n, a, b, c);
+	}, py::call_guard<py::gil_scoped_release>());
+
+	// raw hit rate of one fifo per size, all run in a single tiled pass
+	m.def("fifo_mrc", [](int64_t n, py::array_t<T, py::array::c_style>& addrs, std::vector<int> sizes, int threads) {
+		std::vector<std::unique_ptr<fifo>> caches;
+		for (int C : sizes)
+			caches.emplace_back(new fifo(C));
+		{
+			py::gil_scoped_release release;
+			run_tiled(caches, addrs.data(), n, threads);
+		}
+		py::array_t<double> hr(caches.size());
+		double* hr_ptr = hr.mutable_data();
+		for (size_t j = 0; j < caches.size(); j++)
+		{
+			int64_t a, m, c;
+			caches[j]->data(a, m, c);
+			hr_ptr[j] = a ? 1 - (double)m / a : 0;
+		}
+		return hr;
+	}, py::arg("n"), py::arg("addrs"), py::arg("sizes"), py::arg("threads") = 1);
+}
+
 PYBIND11_MODULE(_fifo, m)
 {
 	py::class_<fifo>(m, "fifo")
 		.def(py::init<int>())
-		.def("multi_access", &fifo::multi_access)
+		.def("multi_access", &fifo::multi_access<int32_t>, py::call_guard<py::gil_scoped_release>())
+		.def("multi_access", &fifo::multi_access<int64_t>, py::call_guard<py::gil_scoped_release>())
 		.def("contents", &fifo::contents)
-		.def("multi_access_verbose", &fifo::multi_access_verbose)
-		.def("multi_access_age", &fifo::multi_access_age)
+		.def("multi_access_verbose", &fifo::multi_access_verbose<int32_t>, py::call_guard<py::gil_scoped_release>())
+		.def("multi_access_verbose", &fifo::multi_access_verbose<int64_t>, py::call_guard<py::gil_scoped_release>())
+		.def("multi_access_age", &fifo::multi_access_age<int32_t>, py::call_guard<py::gil_scoped_release>())
+		.def("multi_access_age", &fifo::multi_access_age<int64_t>, py::call_guard<py::gil_scoped_release>())
 		.def("hit_rate", &fifo::hit_rate)
 		.def("queue_stats", &fifo::queue_stats)
 		.def("data", &fifo::data);
 	m.def("fifo_create", [](int C) {
 		return new fifo(C);
 	});
-	m.def("fifo_run", [](void *_f, int n, py::array_t< int32_t >& a) {
-		fifo *f = (fifo *)_f;
-		f->multi_access(n, a);
-	});
-	m.def("fifo_contents", [](void *_f, py::array_t< int >& out) {
+	def_runs<int32_t>(m);
+	def_runs<int64_t>(m);
+	m.def("fifo_contents", [](void *_f, py::array_t< int64_t >& out) {
 		fifo *f = (fifo *)_f;
-		f->contents(out);
-	});
-	m.def("fifo_run_verbose", [](void *_f, int n, py::array_t< int32_t >& a, py::array_t< int >& b) {
-		fifo *f = (fifo *)_f;
-		f->multi_access_verbose(n, a, b);
-	});
-	m.def("fifo_run_age", [](void *_f, int n, py::array_t< int32_t >& a, py::array_t< int >& b, py::array_t< int >& c) {
-		fifo *f = (fifo *)_f;
-		f->multi_access_age(n, a, b, c);
+		return f->contents(out);
 	});
 	m.def("fifo_hitrate", [](void *_f) {
 		fifo *f = (fifo *)_f;
 		return f->hit_rate();
 	});
-	m.def("fifo_queue_stats", [](void *_f, py::array_t< int32_t >& n, py::array_t<double>& s, py::array_t<double>& s2) {
+	m.def("fifo_queue_stats", [](void *_f, py::array_t< int64_t >& n, py::array_t<double>& s, py::array_t<double>& s2) {
 		fifo *f = (fifo *)_f;
 		f->queue_stats(n, s, s2);
 	});
 	m.def("fifo_data", [](py::object _f) -> py::tuple {
 		if (py::isinstance<fifo>(_f))
 		{
-			fifo f = _f.cast<fifo>();
-			int _access, _miss, _cachefill;
+			fifo& f = _f.cast<fifo&>();
+			int64_t _access, _miss, _cachefill;
 			f.data(_access, _miss, _cachefill);
 			return py::make_tuple(_access, _miss, _cachefill);
 		}
@@ -7,6 +7,7 @@
 #include <pybind11/numpy.h>
 #include <pybind11/pybind11.h>
 #include <pybind11/stl.h>
+#include "sim_common.h"
 
 namespace py = pybind11;
 
@@ -17,25 +18,25 @@ class fifo_m
 	std::vector<int> heads;
 
 	int total_m = 0;
-	std::vector<int32_t> cells; // physical slots, -1 means empty
+	std::vector<int64_t> cells; // physical slots, -1 means empty
 	std::vector<int> loc;		// addr -> physical slot index in `cells` (or -1)
 
 	bool strict_mode = false;
 	bool lru_mode = false;
 
 	int len = 0;
-	int n_access = 0;
-	int n_miss = 0;
-	int fill_access = 0;
-	int fill_miss = 0;
+	int64_t n_access = 0;
+	int64_t n_miss = 0;
+	int64_t fill_access = 0;
+	int64_t fill_miss = 0;
 
-	void expand(int32_t addr)
+	void expand(int64_t addr)
 	{
 		if (addr < 0)
 			throw std::invalid_argument("Address must be non-negative");
-		if (addr >= (int32_t)loc.size())
+		if (addr >= (int64_t)loc.size())
 		{
-			int n = addr * 3 / 2 + 1;
+			int64_t n = addr * 3 / 2 + 1;
 			loc.resize(n, -1);
 		}
 	}
@@ -67,13 +68,13 @@ class fifo_m
 	// Insert `addr` in logical position 0 (position 1 in the paper) of `list`,
 	// shifting all items back by one position. Returns the displaced item that
 	// was in the last position (or -1). Does not change `len`.
-	int32_t insert_front_shift_displace(int list, int32_t addr)
+	int64_t insert_front_shift_displace(int list, int64_t addr)
 	{
 		int m = list_sizes[list];
 		int new_head = (heads[list] - 1 + m) % m;
 		int new_head_slot = offsets[list] + new_head;
 
-		int32_t displaced = cells[new_head_slot];
+		int64_t displaced = cells[new_head_slot];
 		if (displaced != -1)
 			loc[displaced] = -1;
 
@@ -86,16 +87,16 @@ class fifo_m
 
 	// Same as insert_front_shift_displace, but evicts the displaced item from the cache,
 	// updating `len` and `loc`.
-	void insert_front_shift_evict(int list, int32_t addr)
+	void insert_front_shift_evict(int list, int64_t addr)
 	{
-		int32_t displaced = insert_front_shift_displace(list, addr);
+		int64_t displaced = insert_front_shift_displace(list, addr);
 		if (displaced == -1)
 			len++; // filled a previously-empty slot
 	}
 
-	void strict_promote(int list, int logical_pos0, int32_t addr)
+	void strict_promote(int list, int logical_pos0, int64_t addr)
 	{
-		int32_t displaced = insert_front_shift_displace(list + 1, addr);
+		int64_t displaced = insert_front_shift_displace(list + 1, addr);
 
 		for (int t = logical_pos0; t >= 1; t--)
 		{
@@ -111,7 +112,7 @@ class fifo_m
 			loc[displaced] = head_slot;
 	}
 
-	void lru_move_to_front_last_list(int logical_pos0, int32_t addr)
+	void lru_move_to_front_last_list(int logical_pos0, int64_t addr)
 	{
 		int list = (int)list_sizes.size() - 1;
 		for (int t = logical_pos0; t >= 1; t--)
@@ -150,7 +151,7 @@ public:
 
 	}
 
-	void access(int32_t addr)
+	void access(int64_t addr)
 	{
 		n_access++;
 		if (len < total_m)
@@ -182,7 +183,7 @@ public:
 		if (!strict_mode)
 		{
 			int old_slot = slot;
-			int32_t displaced = insert_front_shift_displace(list + 1, addr);
+			int64_t displaced = insert_front_shift_displace(list + 1, addr);
 			cells[old_slot] = displaced;
 			if (displaced != -1)
 				loc[displaced] = old_slot;
@@ -192,23 +193,24 @@ public:
 		strict_promote(list, pos0, addr);
 	}
 
-	void multi_access(int n, py::array_t<int32_t>& addrs)
+	template <class T>
+	void multi_access(int64_t n, py::array_t<T, py::array::c_style>& addrs)
 	{
-		int32_t* addrs_ptr = addrs.mutable_data();
-		for (int i = 0; i < n; i++)
+		const T* addrs_ptr = addrs.data();
+		for (int64_t i = 0; i < n; i++)
 			access(addrs_ptr[i]);
 	}
 
-	int contents(py::array_t<int32_t>& out)
+	int contents(py::array_t<int64_t>& out)
 	{
-		int32_t* out_ptr = out.mutable_data();
+		int64_t* out_ptr = out.mutable_data();
 		int n = 0;
 		for (size_t li = 0; li < list_sizes.size(); li++)
 		{
 			for (int p = 0; p < list_sizes[li]; p++)
 			{
 				int slot = phys_slot((int)li, p);
-				int32_t v = cells[slot];
+				int64_t v = cells[slot];
 				if (v != -1)
 					out_ptr[n++] = v;
 			}
@@ -219,12 +221,12 @@ public:
 	double hit_rate() const
 	{
 		if (n_access <= fill_access)
-			return 1.0 - (n_miss * 1.0 / std::max(1, n_access));
+			return 1.0 - (n_miss * 1.0 / std::max<int64_t>(1, n_access));
 		double miss_rate = (n_miss - fill_miss) * 1.0 / (n_access - fill_access);
 		return 1.0 - miss_rate;
 	}
 
-	void data(int& _access, int& _miss, int& _fill_access, int& _fill_miss) const
+	void data(int64_t& _access, int64_t& _miss, int64_t& _fill_access, int64_t& _fill_miss) const
 	{
 		_access = n_access;
 		_miss = n_miss;
@@ -235,6 +237,43 @@ public:
 	int cache_size() const { return total_m; }
 };
 
+// the bindings that take a trace, for int32 or int64 addresses
+template <class T>
+static void def_runs(py::module_& m)
+{
+	m.def("fifo_m_run", [](void* _f, int64_t n, py::array_t<T, py::array::c_style>& a) {
+		fifo_m* f = (fifo_m*)_f;
+		f->multi_access(n, a);
+	}, py::call_guard<py::gil_scoped_release>());
+	// cumulative (accesses, misses) at window ends, see run_windows()
+	m.def("fifo_m_run_windows", [](void* _f, int64_t n, py::array_t<T, py::array::c_style>& a, int64_t first, int64_t window,
+								  py::array_t<int64_t>& acc, py::array_t<int64_t>& miss) {
+		fifo_m* f = (fifo_m*)_f;
+		return run_windows(*f, a.data(), n, first, window, acc.mutable_data(), miss.mutable_data(),
+						   [](fifo_m& c, int64_t& _a, int64_t& _m) { int64_t x[2]; c.data(_a, _m, x[0], x[1]); });
+	}, py::call_guard<py::gil_scoped_release>());
+
+	// raw hit rate of one fifo_m per size, all run in a single tiled pass
+	m.def("fifo_m_mrc", [](int64_t n, py::array_t<T, py::array::c_style>& addrs, std::vector<std::vector<int>> ms, bool strict, bool lru, int threads) {
+		std::vector<std::unique_ptr<fifo_m>> caches;
+		for (auto& m : ms)
+			caches.emplace_back(new fifo_m(m, strict, lru));
+		{
+			py::gil_scoped_release release;
+			run_tiled(caches, addrs.data(), n, threads);
+		}
+		py::array_t<double> hr(caches.size());
+		double* hr_ptr = hr.mutable_data();
+		for (size_t j = 0; j < caches.size(); j++)
+		{
+			int64_t a, m, fa, fm;
+			caches[j]->data(a, m, fa, fm);
+			hr_ptr[j] = a ? 1 - (double)m / a : 0;
+		}
+		return hr;
+	}, py::arg("n"), py::arg("addrs"), py::arg("ms"), py::arg("strict") = false, py::arg("lru") = false, py::arg("threads") = 1);
+}
+
 PYBIND11_MODULE(_fifo_m, m)
 {
 	py::class_<fifo_m>(m, "fifo_m")
@@ -242,7 +281,8 @@ PYBIND11_MODULE(_fifo_m, m)
 			 py::arg("m"),
 			 py::arg("strict") = false,
 			 py::arg("lru") = false)
-		.def("multi_access", &fifo_m::multi_access)
+		.def("multi_access", &fifo_m::multi_access<int32_t>, py::call_guard<py::gil_scoped_release>())
+		.def("multi_access", &fifo_m::multi_access<int64_t>, py::call_guard<py::gil_scoped_release>())
 		.def("contents", &fifo_m::contents)
 		.def("hit_rate", &fifo_m::hit_rate)
 		.def("cache_size", &fifo_m::cache_size);
@@ -254,12 +294,10 @@ PYBIND11_MODULE(_fifo_m, m)
 		  py::arg("strict") = false,
 		  py::arg("lru") = false);
 
-	m.def("fifo_m_run", [](void* _f, int n, py::array_t<int32_t>& a) {
-		fifo_m* f = (fifo_m*)_f;
-		f->multi_access(n, a);
-	});
+	def_runs<int32_t>(m);
+	def_runs<int64_t>(m);
 
-	m.def("fifo_m_contents", [](void* _f, py::array_t<int32_t>& out) {
+	m.def("fifo_m_contents", [](void* _f, py::array_t<int64_t>& out) {
 		fifo_m* f = (fifo_m*)_f;
 		return f->contents(out);
 	});
@@ -272,8 +310,8 @@ PYBIND11_MODULE(_fifo_m, m)
 	m.def("fifo_m_data", [](py::object _f) -> py::tuple {
 		if (py::isinstance<fifo_m>(_f))
 		{
-			fifo_m f = _f.cast<fifo_m>();
-			int a, m, fa, fm;
+			fifo_m& f = _f.cast<fifo_m&>();
+			int64_t a, m, fa, fm;
 			f.data(a, m, fa, fm);
 			return py::make_tuple(a, m, fa, fm);
 		}
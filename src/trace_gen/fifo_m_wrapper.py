@@ -1,23 +1,33 @@
 import numpy as np
+from trace_gen.addrmap_wrapper import dense_trace
+from trace_gen import windows
 import _fifo_m
 
 
 class fifo_m:
-    def __init__(self, m, strict: bool = False, lru: bool = False):
+    def __init__(self, m, strict: bool = False, lru: bool = False, amap=None):
+        self.amap = amap
         m = list(m)
         self.m = m
         self.C = int(sum(m))
         self.f = _fifo_m.fifo_m_create(m, strict=strict, lru=lru)
 
     def run(self, trace):
-        if type(trace[0]) != np.int32:
+        if self.amap is not None:
+            trace = self.amap.map(trace)
+        if type(trace[0]) not in (np.int32, np.int64):
             trace = np.array(trace, dtype=np.int32)
         _fifo_m.fifo_m_run(self.f, len(trace), trace)
 
+    def run_windows(self, trace, window, snapshots=None):
+        # (accesses, misses) of every window of trace in one native call,
+        # plus contents() after each of the snapshots offsets if given
+        return windows.run_windows(self, _fifo_m.fifo_m_run_windows, self.f, trace, window, snapshots)
+
     def contents(self):
-        val = np.zeros(self.C, dtype=np.int32)
+        val = np.zeros(self.C, dtype=np.int64)
         n = _fifo_m.fifo_m_contents(self.f, val)
-        return val[:n]
+        return val[:n] if self.amap is None else self.amap.unmap(val[:n])
 
     def hitrate(self):
         return _fifo_m.fifo_m_hitrate(self.f)
@@ -25,3 +35,10 @@ class fifo_m:
     def data(self) -> tuple:
         # returns (accesses, misses, fill_accesses, fill_misses)
         return _fifo_m.fifo_m_data(self.f)
+
+
+def fifo_m_mrc(trace, ms, strict=False, lru=False, threads=1):
+    # raw hit rate of a FIFO(m) cache for each list-size vector m in ms,
+    # in one tiled native pass
+    trace = dense_trace(trace)
+    return _fifo_m.fifo_m_mrc(len(trace), trace, [list(m) for m in ms], strict, lru, threads)
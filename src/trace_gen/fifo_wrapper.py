@@ -1,31 +1,43 @@
 from ctypes import *
 import numpy as np
+from trace_gen.addrmap_wrapper import dense_trace
 # libfifo = CDLL('./libfifo.so')
+from trace_gen import windows
 import _fifo
 # libfifo.fifo_hitrate.restype = c_double
 # libfifo.fifo_create.restype = c_void_p
 
 class fifo:
-    def __init__(self, C):
+    def __init__(self, C, amap=None):
+        self.amap = amap
         # self.f = libfifo.fifo_create(c_int(C))
         self.f = _fifo.fifo_create(C)
         self.C = C
 
     def run(self, trace):
-        if type(trace[0]) != np.int32:
+        if self.amap is not None:
+            trace = self.amap.map(trace)
+        if type(trace[0]) not in (np.int32, np.int64):
             trace = np.array(trace, dtype=np.int32)
         # libfifo.fifo_run(c_void_p(self.f), c_int(len(trace)),
         #                      trace.ctypes.data_as(c_void_p))
         _fifo.fifo_run(self.f, len(trace), trace)
 
+    def run_windows(self, trace, window, snapshots=None):
+        # (accesses, misses) of every window of trace in one native call,
+        # plus contents() after each of the snapshots offsets if given
+        return windows.run_windows(self, _fifo.fifo_run_windows, self.f, trace, window, snapshots)
+
     def contents(self):
-        val = np.zeros(self.C,dtype=np.int32)
+        val = np.zeros(self.C, dtype=np.int64)
         # n = libfifo.fifo_contents(c_void_p(self.f), val.ctypes.data_as(c_void_p))
         n = _fifo.fifo_contents(self.f, val)
-        return val[:n]
+        return val[:n] if self.amap is None else self.amap.unmap(val[:n])
 
     def run_verbose(self, trace):
-        if type(trace[0]) != np.int32:
+        if self.amap is not None:
+            trace = self.amap.map(trace)
+        if type(trace[0]) not in (np.int32, np.int64):
             trace = np.array(trace, dtype=np.int32)
         misses = np.zeros(len(trace), dtype=np.int32)
         # libfifo.fifo_run_verbose(c_void_p(self.f), c_int(len(trace)),
@@ -35,10 +47,12 @@ class fifo:
         return misses
 
     def run_age(self, trace):
-        if type(trace[0]) != np.int32:
+        if self.amap is not None:
+            trace = self.amap.map(trace)
+        if type(trace[0]) not in (np.int32, np.int64):
             trace = np.array(trace, dtype=np.int32)
         misses = np.zeros(len(trace), dtype=np.int32)
-        ages = np.zeros(len(trace), dtype=np.int32)
+        ages = np.zeros(len(trace), dtype=np.int64)
         # libfifo.fifo_run_age(c_void_p(self.f), c_int(len(trace)),
                                 #  trace.ctypes.data_as(c_void_p),
                                 #  misses.ctypes.data_as(c_void_p),
@@ -60,10 +74,10 @@ class fifo:
         # return [n_access.value, n_miss.value, n_cachefill.value]
 
     def queue_raw_stats(self):
-        n,s,s2 = c_int(),c_double(),c_double()
+        n, s, s2 = np.zeros(1, dtype=np.int64), np.zeros(1), np.zeros(1)
         # libfifo.fifo_queue_stats(c_void_p(self.f), byref(n), byref(s), byref(s2))
         _fifo.fifo_queue_stats(self.f, n, s, s2)
-        return [n.value,s.value,s2.value]
+        return [int(n[0]), s[0], s2[0]]
 
     # returns (mean, std)
     def queue_stats(self):
@@ -72,3 +86,9 @@ class fifo:
 
     # def __del__(self):
     #     libfifo.fifo_delete(c_void_p(self.f))
+
+
+def fifo_mrc(trace, sizes, threads=1):
+    # raw hit rate of a FIFO cache of each size, in one tiled native pass
+    trace = dense_trace(trace)
+    return _fifo.fifo_mrc(len(trace), trace, [int(C) for C in sizes], threads)
@@ -1,47 +1,152 @@
 #include <stdio.h>
 #include <stdlib.h>
 #include <stdint.h>
+#include <algorithm>
+#include <thread>
+#include <vector>
 #include <pybind11/pybind11.h>
 #include <pybind11/stl.h>
 #include <pybind11/numpy.h>
 
 namespace py = pybind11;
 
-int iad(int32_t max, int32_t n, py::array_t< int32_t >& in, py::array_t< int32_t >& out)
+/*
+  Inter-reference distances: out[i] = i - (index of the previous reference
+  to in[i]), or -1 for a first reference.
+
+  The last-seen times are kept in a dense table indexed by address - min
+  when the addresses span at most max(2^20, 4n) values, and otherwise in
+  an open-addressing hash table (linear probing, at most half full), so
+  sparse traces such as raw LBAs only cost state per distinct address.
+  Since a distance only depends on references to the same address, the
+  parallel mode gives each thread the addresses that hash to it (in runs
+  of 16, so that threads do not share cache lines of the dense table):
+  every thread scans the whole trace but only touches the times, and
+  writes the distances, of its own addresses.
+ */
+
+static uint64_t hash(int64_t a)
 {
-    const int32_t* in_ptr = in.data();
-    int32_t* out_ptr = out.mutable_data();
-    int32_t *T = (int32_t *)calloc(1, sizeof(int32_t) * (uint64_t)max);
-    int32_t t = 1;
-    for (int i = 0; i < n; i++)
+    uint64_t k = (uint64_t)a;
+    k ^= k >> 33;
+    k *= 0xff51afd7ed558ccdULL;
+    k ^= k >> 33;
+    k *= 0xc4ceb9fe1a85ec53ULL;
+    k ^= k >> 33;
+    return k;
+}
+
+// last-seen time of every address, 0 = not seen yet
+template <class O>
+class last_seen
+{
+    struct slot
     {
-        int32_t a = in_ptr[i];
-        if (a >= max)
+        int64_t a;
+        O t;
+    };
+    std::vector<slot> table;
+    uint64_t mask = 0;
+    int64_t used = 0;
+
+    void grow()
+    {
+        std::vector<slot> old(table.empty() ? 1024 : 2 * table.size(), slot{0, 0});
+        old.swap(table);
+        mask = table.size() - 1;
+        for (auto& e : old)
+            if (e.t)
+            {
+                uint64_t s = hash(e.a) & mask;
+                while (table[s].t)
+                    s = (s + 1) & mask;
+                table[s] = e;
+            }
+    }
+
+public:
+    last_seen() { grow(); }
+
+    O& operator[](int64_t a)
+    {
+        uint64_t s = hash(a) & mask;
+        for (; table[s].t; s = (s + 1) & mask)
+            if (table[s].a == a)
+                return table[s].t;
+        if (2 * (used + 1) > (int64_t)table.size())
         {
-            printf("ERROR: a[%d] = %d (max %d)\n", i, a, max);
-            break;
+            grow();
+            s = hash(a) & mask;
+            while (table[s].t)
+                s = (s + 1) & mask;
         }
-        if (T[a] == 0)
-            out_ptr[i] = -1;
-        else
-            out_ptr[i] = t - T[a];
-        T[a] = t;
-        t++;
+        used++;
+        table[s].a = a;
+        return table[s].t;
+    }
+};
+
+// distances of the references to the addresses of partition `part`
+template <class T, class O>
+static void iad_part(const T* in, int64_t n, O* out, int part, int parts, O* dense, int64_t lo)
+{
+    last_seen<O> sparse;
+    for (int64_t i = 0; i < n; i++)
+    {
+        T a = in[i];
+        if (parts > 1 && (int)(hash(a >> 4) % parts) != part)
+            continue;
+        O& last = dense ? dense[a - lo] : sparse[a];
+        out[i] = last ? (O)(i + 1) - last : -1;
+        last = i + 1;
     }
-    free(T);
-    return 1;
 }
 
-int iad2(int32_t max, int32_t n, py::array_t< int32_t >& in, py::array_t< int32_t >& out,
-         py::array_t< int32_t >& t, py::array_t< int32_t >& T)
+// T: address type, O: distance type. dense: 1/0 to force the dense table
+// or the hash table, -1 to choose by density. Returns 1 if the dense
+// table was used.
+template <class T, class O>
+int iad(int64_t n, py::array_t<T, py::array::c_style>& in, py::array_t< O >& out, int threads, int dense)
 {
-    const int32_t* in_ptr = in.data();
-    int32_t* out_ptr = out.mutable_data();
-    int32_t* t_ptr = t.mutable_data();
-    int32_t* T_ptr = T.mutable_data();
-    for (int i = 0; i < n; i++)
+    const T* in_ptr = in.data();
+    O* out_ptr = out.mutable_data();
+    py::gil_scoped_release release;
+    if (n <= 0)
+        return 0;
+    T lo = in_ptr[0], hi = in_ptr[0];
+    if (dense != 0)
+        for (int64_t i = 1; i < n; i++)
+        {
+            lo = std::min(lo, in_ptr[i]);
+            hi = std::max(hi, in_ptr[i]);
+        }
+    uint64_t span = (uint64_t)hi - (uint64_t)lo + 1;
+    if (dense < 0)
+        dense = span <= std::max<uint64_t>(1 << 20, 4 * (uint64_t)n);
+    std::vector<O> table(dense ? span : 0, 0);
+    O* table_ptr = dense ? table.data() : nullptr;
+
+    int parts = n < (1 << 20) ? 1 : std::max(1, threads);
+    std::vector<std::thread> ts;
+    for (int p = 1; p < parts; p++)
+        ts.emplace_back(iad_part<T, O>, in_ptr, n, out_ptr, p, parts, table_ptr, (int64_t)lo);
+    iad_part<T, O>(in_ptr, n, out_ptr, 0, parts, table_ptr, lo);
+    for (auto& t : ts)
+        t.join();
+    return dense;
+}
+
+template <class T>
+int iad2(int64_t max, int64_t n, py::array_t<T, py::array::c_style>& in, py::array_t< int64_t >& out,
+         py::array_t< int64_t >& t, py::array_t< int64_t >& T_)
+{
+    const T* in_ptr = in.data();
+    int64_t* out_ptr = out.mutable_data();
+    int64_t* t_ptr = t.mutable_data();
+    int64_t* T_ptr = T_.mutable_data();
+    for (int64_t i = 0; i < n; i++)
     {
-        int32_t a = in_ptr[i];
+        T a = in_ptr[i];
         if (a >= max)
             return 0;
         if (T_ptr[a] == 0)
@@ -55,6 +160,11 @@ int iad2(int32_t max, int32_t n, py::array_t< int32_t >& in, py::array_t< int32_
 }
 
 PYBIND11_MODULE(_iad, m) {
-    m.def("iad", &iad);
-    m.def("iad2", &iad2);
-}
\ No newline at end of file
+    // int32 distances for traces shorter than 2^31, int64 beyond
+    m.def("iad", &iad<int32_t, int32_t>);
+    m.def("iad", &iad<int64_t, int32_t>);
+    m.def("iad", &iad<int32_t, int64_t>);
+    m.def("iad", &iad<int64_t, int64_t>);
+    m.def("iad2", &iad2<int32_t>);
+    m.def("iad2", &iad2<int64_t>);
+}
@@ -0,0 +1,223 @@
+#!/usr/bin/python3
+# trace-iad: inter-reference distances of an address trace, streamed block
+# by block through the native iad2 kernel, so that traces of any length run
+# in memory bounded by the block and the address footprint.
+import os
+import sys
+import argparse
+import numpy as np
+from trace_gen.unroll import unroll
+from trace_gen.iad_wrapper import iad2
+from trace_gen.addrmap_wrapper import addrmap
+from trace_gen.tracefile import MAGIC, open_trace
+from trace_gen.traceparse_wrapper import FORMATS, traceparse
+
+_POW10 = 10 ** np.arange(19, dtype=np.int64)
+
+
+def _text_blocks(fp, block):
+    # whitespace-separated addresses from a binary stream, about 16 bytes
+    # per address read at a time and cut at the last newline
+    rest = b''
+    while True:
+        buf = fp.read(16 * block)
+        if not buf:
+            break
+        buf = rest + buf
+        cut = buf.rfind(b'\n') + 1
+        buf, rest = buf[:cut], buf[cut:]
+        if buf:
+            yield np.fromstring(buf, dtype=np.int64, sep=' ')
+    if rest.strip():
+        yield np.fromstring(rest, dtype=np.int64, sep=' ')
+
+
+def _raw_blocks(fp, dtype, block):
+    rest = b''
+    while True:
+        buf = fp.read(block * dtype.itemsize)
+        if not buf:
+            break
+        buf = rest + buf
+        cut = len(buf) - len(buf) % dtype.itemsize
+        buf, rest = buf[:cut], buf[cut:]
+        yield np.frombuffer(buf, dtype=dtype)
+
+
+def _parsed_blocks(path, fmt, block, block_size):
+    # 'addr': the first field of every line; otherwise the block addresses
+    # of the requests of an SPC/MSR/trace-gen trace (see traceparse)
+    p = traceparse(path, dict(lba=0, delim=' ') if fmt == 'addr' else fmt)
+    for cols in p.chunks(16 * block):
+        yield cols['lba'] if fmt == 'addr' else unroll(p.extents(cols, block_size))
+
+
+def _mapped_blocks(path, dtype, block):
+    n = os.path.getsize(path) // dtype.itemsize
+    if n:
+        a = np.memmap(path, dtype=dtype, mode='r', shape=(n,))
+        for i in range(0, n, block):
+            yield a[i:i + block]
+
+
+def blocks(path, kind='auto', fmt='addr', block=1 << 22, block_size=4096):
+    """
+    the address trace in path ('-' = stdin) as arrays of about `block`
+    addresses. kind: 'text', 'int32'/'int64' (raw little-endian), 'trace'
+    (a tracefile), or 'auto' (a tracefile if it starts with its magic,
+    text otherwise); fmt: the text layout, 'addr' (one address per line)
+    or one of FORMATS, unrolled to block_size-byte blocks.
+    """
+    if kind in ('int32', 'int64'):
+        dtype = np.dtype(kind).newbyteorder('<')
+    if path == '-':
+        fp = sys.stdin.buffer
+        if kind == 'auto':
+            kind = 'trace' if fp.peek(len(MAGIC))[:len(MAGIC)] == MAGIC else 'text'
+        if kind == 'trace' or (kind == 'text' and fmt != 'addr'):
+            raise ValueError(f"cannot stream {kind if kind == 'trace' else fmt} input from stdin")
+        if kind == 'text':
+            return _text_blocks(fp, block)
+        return _raw_blocks(fp, dtype, block)
+    if kind == 'auto':
+        with open(path, 'rb') as fp:
+            kind = 'trace' if fp.read(len(MAGIC)) == MAGIC else 'text'
+    if kind == 'trace':
+        return open_trace(path).chunks(block)
+    if kind == 'text':
+        return _parsed_blocks(path, fmt, block, block_size)
+    return _mapped_blocks(path, dtype, block)
+
+
+def _ascii(vals, width=0, end='\n'):
+    # vals as a matrix of ASCII digits, one row per value ended by `end`,
+    # and the mask of the characters to keep (see format_text)
+    vals = np.asarray(vals, dtype=np.int64)
+    cold = vals < 0
+    if width:
+        v = np.where(cold, _POW10[width] - 1, vals)
+    else:
+        v = np.where(cold, 1, vals)
+    digits = np.maximum(1, np.searchsorted(_POW10, v, side='right'))
+    if width:
+        digits = np.maximum(digits, width)
+    w = max(2, int(digits.max(initial=0)))
+    # filled a digit position (contiguous row) at a time, then transposed
+    chars = np.empty((w + 1, len(v)), dtype=np.uint8)
+    if w < 10:
+        v = v.astype(np.int32)
+    for j in range(w - 1, -1, -1):
+        q = v // 10
+        chars[j] = v - q * 10
+        v = q
+    chars[:w] += ord('0')
+    chars[w] = ord(end)
+    chars = np.ascontiguousarray(chars.T)
+    start = w - digits
+    if not width:
+        start[cold] = w - 2
+        chars[cold, w - 2] = ord('-')
+    return chars, np.arange(w + 1) >= start[:, None]
+
+
+def format_text(vals, width=0):
+    """
+    distances as ASCII lines, formatted without a Python loop: width 0
+    prints them as is (-1 for first references), width w zero-pads them
+    to w digits and prints first references as w 9s.
+    """
+    chars, keep = _ascii(vals, width)
+    return chars[keep].tobytes()
+
+
+class ird_hist:
+    # running histogram of distances: counts[d] of every distance d (or
+    # of every power-of-two bin [2^k, 2^(k+1)) with log2), and the number
+    # of first references
+    def __init__(self, log2=False):
+        self.log2 = log2
+        self.cold = 0
+        self.counts = np.zeros(0, dtype=np.int64)
+
+    def add(self, vals):
+        warm = vals[vals > 0]
+        self.cold += len(vals) - len(warm)
+        if self.log2:
+            warm = np.log2(warm).astype(np.int64)
+        c = np.bincount(warm)
+        if len(c) > len(self.counts):
+            c[:len(self.counts)] += self.counts
+            self.counts = c
+        else:
+            self.counts[:len(c)] += c
+
+    def rows(self):
+        # (distance or bin start, count) of the nonzero entries, first
+        # references as distance -1
+        d = np.flatnonzero(self.counts)
+        c = self.counts[d]
+        if self.log2:
+            d = np.left_shift(1, d)
+        return np.column_stack((np.r_[-1, d], np.r_[self.cold, c]))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Calculate inter-reference (inter-arrival) distances')
+    parser.add_argument('infile', nargs='?', default='-',
+                        help='input trace (default: stdin)')
+    parser.add_argument('-o', '--output', default='-',
+                        help='output file (default: stdout)')
+    parser.add_argument('--input', choices=['auto', 'text', 'int32', 'int64', 'trace'], default='auto',
+                        help='input encoding; auto: a trace file if it has the header, text otherwise')
+    parser.add_argument('--format', choices=['addr'] + list(FORMATS), default='addr',
+                        help='text layout: one address per line, or requests unrolled to blocks')
+    parser.add_argument('--block-size', type=int, default=4096,
+                        help='bytes per block for --format spc/msr/tracegen')
+    parser.add_argument('--sparse', action='store_true',
+                        help='hash addresses to dense ids (for LBAs or other sparse addresses)')
+    parser.add_argument('--width', type=int, default=0,
+                        help='zero-pad text output to this many digits')
+    parser.add_argument('--binary', action='store_true',
+                        help='write raw little-endian int64 distances instead of text')
+    parser.add_argument('--hist', action='store_true',
+                        help='write only "distance count" lines')
+    parser.add_argument('--log2', action='store_true',
+                        help='with --hist, count power-of-two bins')
+    parser.add_argument('--chunk', type=int, default=1 << 22,
+                        help='addresses per block')
+    args = parser.parse_args(argv)
+    if args.log2 and not args.hist:
+        parser.error('--log2 needs --hist')
+
+    try:
+        it = blocks(args.infile, args.input, args.format, args.chunk, args.block_size)
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+    sim = iad2(1 << 20, addrmap() if args.sparse else None)
+    hist = ird_hist(args.log2) if args.hist else None
+    out = sys.stdout.buffer if args.output == '-' else open(args.output, 'wb')
+    try:
+        for a in it:
+            vals = sim.run(a)
+            if hist is not None:
+                hist.add(vals)
+            elif args.binary:
+                out.write(vals.astype('<i8', copy=False).tobytes())
+            else:
+                out.write(format_text(vals, args.width))
+        if hist is not None:
+            rows = hist.rows()
+            (dc, dk), (cc, ck) = _ascii(rows[:, 0], end=' '), _ascii(rows[:, 1])
+            out.write(np.hstack((dc, cc))[np.hstack((dk, ck))].tobytes())
+        out.flush()
+    except BrokenPipeError:
+        # output piped into head and the like
+        sys.stderr.close()
+    finally:
+        if out is not sys.stdout.buffer:
+            out.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -3,32 +3,55 @@ import numpy as np
 import _iad
 
 class iad2:
-    def __init__(self, _max):
+    # streaming iad over addresses < _max; with amap, over any addresses.
+    # _max is the initial size of the last-seen table, which grows when a
+    # chunk holds larger addresses (or, with amap, more distinct ones)
+    def __init__(self, _max, amap=None):
         self.max = _max
-        self.times = np.zeros(_max+1, dtype=np.int32)
+        self.amap = amap
+        self.times = np.zeros(_max+1, dtype=np.int64)
         self.t = 1
 
+    def grow(self, _max):
+        if _max > self.max:
+            _max = max(_max, 2 * self.max)
+            self.times = np.concatenate((self.times, np.zeros(_max - self.max, dtype=np.int64)))
+            self.max = _max
+
     def recency(self):
         b = self.times[self.times > 0]
         return self.t - b
 
     def run(self, trace):
-        vals = np.zeros(len(trace), dtype=np.int32)
+        vals = np.zeros(len(trace), dtype=np.int64)
         n = len(trace)
-        t = c_int(self.t)
-        if type(trace[0]) != np.int32:
+        t = np.array([self.t], dtype=np.int64)
+        if self.amap is not None:
+            trace = self.amap.map(trace)
+        if n == 0:
+            return vals
+        if type(trace[0]) not in (np.int32, np.int64):
             trace = np.array(trace, np.int32)
+        self.grow(len(self.amap) if self.amap is not None else int(trace.max()) + 1)
         rv = _iad.iad2(self.max, n, trace, vals, t, self.times)
         assert rv, '%d' % rv
-        self.t = t.value
+        self.t = int(t[0])
         return vals
 
 
-def iad(trace):
+def iad(trace, threads=1, dense=None):
+    """
+    inter-reference distance of every reference of trace (-1 for first
+    references). Addresses may be any int32/int64 values: the last-seen
+    times go in a dense table when the addresses are dense enough and in
+    a hash table otherwise (dense=True/False forces one). threads > 1
+    splits the addresses by hash over that many threads.
+    """
+    trace = np.asarray(trace)
+    if trace.dtype not in (np.int32, np.int64):
+        trace = trace.astype(np.int64)
     n = len(trace)
-    m = np.max(trace) + 1
-    if type(trace[0]) != np.int32:
-        trace = np.array(trace, np.int32)
-    val = np.zeros(n, dtype=np.int32)
-    _iad.iad(m, n, trace, val)
+    # int32 distances unless the trace is longer than int32 can count
+    val = np.zeros(n, dtype=np.int32 if n < 2**31 else np.int64)
+    _iad.iad(n, trace, val, threads, -1 if dense is None else int(dense))
     return val
@@ -0,0 +1,454 @@
+#include <stdint.h>
+#include <algorithm>
+#include <stdexcept>
+#include <utility>
+#include <vector>
+#include <pybind11/pybind11.h>
+#include <pybind11/stl.h>
+#include <pybind11/numpy.h>
+
+namespace py = pybind11;
+
+/*
+  Event-heap engine behind gen_from_both / gen_from_ird2.
+
+  heap holds (next reference time, addr) for every address in the IRD pool,
+  ordered like the Python heapq version (by time, then by addr). Each IRD
+  access pops the earliest address, emits it and re-inserts it at t0 + ird;
+  an IRD of -1 emits a fresh address (a0++) instead. IRM accesses emit a
+  pre-drawn address and leave the heap untouched.
+
+  In pooled mode (run_pooled, behind gen_from_ph) the IRD of each access is
+  taken from a per-address queue instead, for traces where every address has
+  its own inter-reference distribution. Queues are topped up from Python in
+  bulk (load); a run stops early when the popped address has an empty queue
+  and reports it through starved().
+ */
+
+/*
+  Calendar queue over the same (t, addr) events, for large M where the
+  binary heap falls out of cache. Time is cut into days of width w; day d
+  lives in bucket d mod nb, and the nb buckets cover a window (a "year") at
+  least as long as the IRD range, so a bucket only ever holds events of a
+  single day. Events past the window wait in a small overflow heap. Each
+  address has one pending event, so buckets are intrusive lists threaded
+  through per-address arrays. Pops come out in exactly the heap's
+  (t, addr) order.
+
+  w and nb are calibrated on the first pop from the events pushed so far:
+  about two events per day, and a window of `span` (the IRD bound, e.g.
+  tmax), or the largest initial IRD if span is 0.
+ */
+class cal_queue
+{
+	typedef std::pair<double, int32_t> event;
+
+	double span, inv_w = 1;
+	int64_t nb = 0, mask = 0, cur = 0; // cur: the day being drained
+	std::vector<int32_t> head;		   // bucket -> first addr, -1 if empty
+	std::vector<int32_t> link;		   // addr -> next addr in its bucket
+	std::vector<double> tm;			   // addr -> scheduled time
+	std::vector<event> over;		   // min-heap of events beyond the window
+	std::vector<event> staged;		   // pushes before calibration
+	size_t n = 0, in_buckets = 0;
+	bool built = false;
+	int32_t top_a = -1, top_prev = -1; // cached minimum and its predecessor
+
+	static bool later(const event& a, const event& b)
+	{
+		return a > b;
+	}
+
+	int64_t day(double t)
+	{
+		return (int64_t)(t * inv_w);
+	}
+
+	void insert(event e)
+	{
+		int32_t a = e.second;
+		if ((size_t)a >= tm.size())
+		{
+			tm.resize(a + a / 2 + 1);
+			link.resize(a + a / 2 + 1);
+		}
+		int64_t d = day(e.first);
+		if (d >= cur + nb)
+		{
+			over.push_back(e);
+			std::push_heap(over.begin(), over.end(), later);
+			return;
+		}
+		int64_t b = std::max(d, cur) & mask;
+		tm[a] = e.first;
+		link[a] = head[b];
+		head[b] = a;
+		in_buckets++;
+	}
+
+	// move overflow events that have come inside the window into buckets
+	void migrate(void)
+	{
+		while (!over.empty() && day(over[0].first) < cur + nb)
+		{
+			event e = over[0];
+			std::pop_heap(over.begin(), over.end(), later);
+			over.pop_back();
+			insert(e);
+		}
+	}
+
+	void build(void)
+	{
+		double sum = 0, tmin = 0, tmax = 0;
+		for (size_t i = 0; i < staged.size(); i++)
+		{
+			double t = staged[i].first;
+			sum += t;
+			tmin = i ? std::min(tmin, t) : t;
+			tmax = std::max(tmax, t);
+		}
+		double w = staged.empty() || sum <= 0 ? 1 : 2 * sum / staged.size() / staged.size();
+		double window = span > 0 ? span : tmax - tmin;
+		int64_t want = (int64_t)std::min(window / w, 4.0 * staged.size()) + 2;
+		nb = 2;
+		while (nb < want)
+			nb <<= 1;
+		mask = nb - 1;
+		inv_w = 1 / w;
+		cur = day(tmin);
+		head.assign(nb, -1);
+		built = true;
+		for (event e : staged)
+			insert(e);
+		std::vector<event>().swap(staged);
+	}
+
+public:
+	cal_queue(double _span = 0) : span(_span) {}
+
+	size_t size(void)
+	{
+		return n;
+	}
+
+	void push(event e)
+	{
+		n++;
+		top_a = -1;
+		if (built)
+			insert(e);
+		else
+			staged.push_back(e);
+	}
+
+	event top(void)
+	{
+		if (!built)
+			build();
+		while (top_a < 0)
+		{
+			if (in_buckets == 0)
+			{
+				cur = day(over[0].first);
+				migrate();
+			}
+			int32_t prev = -1;
+			for (int32_t a = head[cur & mask]; a >= 0; prev = a, a = link[a])
+			{
+				if (top_a < 0 || tm[a] < tm[top_a] || (tm[a] == tm[top_a] && a < top_a))
+				{
+					top_a = a;
+					top_prev = prev;
+				}
+			}
+			if (top_a < 0)
+			{
+				cur++;
+				migrate();
+			}
+		}
+		return {tm[top_a], top_a};
+	}
+
+	// pop the minimum and schedule e in its place
+	void replace_top(event e)
+	{
+		top();
+		if (top_prev < 0)
+			head[cur & mask] = link[top_a];
+		else
+			link[top_prev] = link[top_a];
+		in_buckets--;
+		top_a = -1;
+		insert(e);
+	}
+};
+
+class ird_gen
+{
+	typedef std::pair<double, int32_t> event;
+
+	std::vector<event> heap; // min-heap on (t, addr)
+	int32_t a0 = 0;			 // next fresh address
+	double t_last = 0;		 // time of the most recent pop
+
+	std::vector<std::vector<double>> pool; // per-address IRD queues
+	std::vector<size_t> pos;			   // next unread entry of each queue
+	int32_t starved_addr = -1;			   // address that stopped run_pooled
+
+	bool use_cal = false; // schedule on cal instead of heap
+	cal_queue cal;
+
+	static bool later(const event& a, const event& b)
+	{
+		return a > b;
+	}
+
+	// replace the top of the heap and sift it down (heapq.heapreplace)
+	void replace_top(event e)
+	{
+		size_t n = heap.size(), i = 0;
+		while (true)
+		{
+			size_t l = 2 * i + 1;
+			if (l >= n)
+				break;
+			size_t c = (l + 1 < n && heap[l + 1] < heap[l]) ? l + 1 : l;
+			if (!(heap[c] < e))
+				break;
+			heap[i] = heap[c];
+			i = c;
+		}
+		heap[i] = e;
+	}
+
+	bool empty(void)
+	{
+		return use_cal ? cal.size() == 0 : heap.empty();
+	}
+
+	event top(void)
+	{
+		return use_cal ? cal.top() : heap[0];
+	}
+
+	void push(event e)
+	{
+		if (use_cal)
+			cal.push(e);
+		else
+		{
+			heap.push_back(e);
+			std::push_heap(heap.begin(), heap.end(), later);
+		}
+	}
+
+	void reschedule(event e)
+	{
+		if (use_cal)
+			cal.replace_top(e);
+		else
+			replace_top(e);
+	}
+
+public:
+	/*
+	  scheduler: 0 = binary heap, 1 = calendar queue (span: IRD bound used to
+	  size its window, 0 to estimate it from the first fill)
+	 */
+	ird_gen(int scheduler = 0, double span = 0) : use_cal(scheduler == 1), cal(span) {}
+	~ird_gen() {}
+
+	// push every non-singleton sample with a fresh address; returns # pushed
+	int fill(int n, py::array_t<double>& irds)
+	{
+		const double* irds_ptr = irds.data();
+		int pushed = 0;
+		for (int i = 0; i < n; i++)
+		{
+			if (irds_ptr[i] == -1)
+				continue;
+			push({irds_ptr[i], a0++});
+			pushed++;
+		}
+		return pushed;
+	}
+
+	/*
+	  n accesses; is_irm (n flags, or empty for no IRM) selects the branch.
+	  irds and irm are consumed in order by the IRD and IRM accesses
+	  respectively. times (n entries, or empty) receives the popped t0.
+	 */
+	int multi_access(int n, py::array_t<uint8_t>& is_irm, py::array_t<double>& irds,
+					 py::array_t<int32_t>& irm, py::array_t<int32_t>& out,
+					 py::array_t<double>& times)
+	{
+		const uint8_t* is_irm_ptr = is_irm.size() ? is_irm.data() : nullptr;
+		const double* irds_ptr = irds.data();
+		const int32_t* irm_ptr = irm.data();
+		int32_t* out_ptr = out.mutable_data();
+		double* times_ptr = times.size() ? times.mutable_data() : nullptr;
+		int n_ird = irds.size(), n_irm = irm.size();
+		int j = 0, k = 0;
+
+		for (int i = 0; i < n; i++)
+		{
+			if (is_irm_ptr && is_irm_ptr[i])
+			{
+				if (k >= n_irm)
+					throw std::out_of_range("ran out of IRM samples");
+				out_ptr[i] = irm_ptr[k++];
+				continue;
+			}
+			if (j >= n_ird)
+				throw std::out_of_range("ran out of IRD samples");
+			double t = irds_ptr[j++];
+			if (t == -1)
+				out_ptr[i] = a0++;
+			else
+			{
+				if (empty())
+					throw std::length_error("IRD heap is empty");
+				event e = top();
+				out_ptr[i] = e.second;
+				t_last = e.first;
+				reschedule({e.first + t, e.second});
+			}
+			if (times_ptr)
+				times_ptr[i] = t_last;
+		}
+		return n;
+	}
+
+	// append irds[i] to the queue of addrs[i]; addresses must already exist
+	int load(int n, py::array_t<int32_t, py::array::c_style>& addrs, py::array_t<double>& irds)
+	{
+		const int32_t* addrs_ptr = addrs.data();
+		const double* irds_ptr = irds.data();
+		if (pool.size() < (size_t)a0)
+		{
+			pool.resize(a0);
+			pos.resize(a0, 0);
+		}
+		for (int i = 0; i < n; i++)
+		{
+			int32_t a = addrs_ptr[i];
+			if (a < 0 || a >= a0)
+				throw std::out_of_range("address not in the IRD heap");
+			std::vector<double>& q = pool[a];
+			if (pos[a] > 0 && 2 * pos[a] >= q.size())
+			{
+				q.erase(q.begin(), q.begin() + pos[a]);
+				pos[a] = 0;
+			}
+			q.push_back(irds_ptr[i]);
+		}
+		return n;
+	}
+
+	// unread queue lengths of addresses 0..a0-1 into rem
+	int remaining(py::array_t<int32_t>& rem)
+	{
+		int32_t* rem_ptr = rem.mutable_data();
+		int n = std::min((int)rem.size(), (int)a0);
+		for (int a = 0; a < n; a++)
+			rem_ptr[a] = a < (int)pool.size() ? pool[a].size() - pos[a] : 0;
+		return n;
+	}
+
+	/*
+	  up to n IRD accesses, each re-inserting the popped address after the
+	  next entry of its own queue. Returns the number done; fewer than n means
+	  the queue of starved() ran dry and must be loaded before resuming.
+	 */
+	int run_pooled(int n, py::array_t<int32_t>& out, py::array_t<double>& times)
+	{
+		int32_t* out_ptr = out.mutable_data();
+		double* times_ptr = times.size() ? times.mutable_data() : nullptr;
+		starved_addr = -1;
+		if (n > 0 && empty())
+			throw std::length_error("IRD heap is empty");
+		for (int i = 0; i < n; i++)
+		{
+			event e = top();
+			int32_t a = e.second;
+			if ((size_t)a >= pool.size() || pos[a] >= pool[a].size())
+			{
+				starved_addr = a;
+				return i;
+			}
+			out_ptr[i] = a;
+			t_last = e.first;
+			reschedule({e.first + pool[a][pos[a]++], a});
+			if (times_ptr)
+				times_ptr[i] = t_last;
+		}
+		return n;
+	}
+
+	int starved(void)
+	{
+		return starved_addr;
+	}
+
+	int size(void)
+	{
+		return use_cal ? cal.size() : heap.size();
+	}
+
+	int next_addr(void)
+	{
+		return a0;
+	}
+};
+
+PYBIND11_MODULE(_ird_gen, m)
+{
+	py::class_<ird_gen>(m, "ird_gen")
+		.def(py::init<int, double>(), py::arg("scheduler") = 0, py::arg("span") = 0)
+		.def("fill", &ird_gen::fill)
+		.def("multi_access", &ird_gen::multi_access, py::call_guard<py::gil_scoped_release>())
+		.def("load", &ird_gen::load)
+		.def("remaining", &ird_gen::remaining)
+		.def("run_pooled", &ird_gen::run_pooled)
+		.def("starved", &ird_gen::starved)
+		.def("size", &ird_gen::size)
+		.def("next_addr", &ird_gen::next_addr);
+	m.def("ird_gen_create", [](int scheduler, double span) {
+		return new ird_gen(scheduler, span);
+	}, py::arg("scheduler") = 0, py::arg("span") = 0);
+	m.def("ird_gen_fill", [](void* _g, int n, py::array_t<double>& irds) {
+		ird_gen* g = (ird_gen *)_g;
+		return g->fill(n, irds);
+	});
+	m.def("ird_gen_run", [](void* _g, int n, py::array_t<uint8_t>& is_irm, py::array_t<double>& irds,
+							py::array_t<int32_t>& irm, py::array_t<int32_t>& out, py::array_t<double>& times) {
+		ird_gen* g = (ird_gen *)_g;
+		return g->multi_access(n, is_irm, irds, irm, out, times);
+	}, py::call_guard<py::gil_scoped_release>());
+	m.def("ird_gen_load", [](void* _g, int n, py::array_t<int32_t, py::array::c_style>& addrs, py::array_t<double>& irds) {
+		ird_gen* g = (ird_gen *)_g;
+		return g->load(n, addrs, irds);
+	});
+	m.def("ird_gen_remaining", [](void* _g, py::array_t<int32_t>& rem) {
+		ird_gen* g = (ird_gen *)_g;
+		return g->remaining(rem);
+	});
+	m.def("ird_gen_run_pooled", [](void* _g, int n, py::array_t<int32_t>& out, py::array_t<double>& times) {
+		ird_gen* g = (ird_gen *)_g;
+		return g->run_pooled(n, out, times);
+	}, py::call_guard<py::gil_scoped_release>());
+	m.def("ird_gen_starved", [](void* _g) {
+		ird_gen* g = (ird_gen *)_g;
+		return g->starved();
+	});
+	m.def("ird_gen_size", [](void* _g) {
+		ird_gen* g = (ird_gen *)_g;
+		return g->size();
+	});
+	m.def("ird_gen_next_addr", [](void* _g) {
+		ird_gen* g = (ird_gen *)_g;
+		return g->next_addr();
+	});
+}
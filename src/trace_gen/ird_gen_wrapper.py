@@ -0,0 +1,84 @@
+import numpy as np
+import _ird_gen
+
+
+SCHEDULERS = {'heap': 0, 'calendar': 1}
+
+
+class ird_gen:
+    # native IRD/IRM mixture engine; keeps the heap and the fresh-address
+    # counter between calls, so a trace can be produced block by block.
+    # scheduler: 'heap' (binary heap, O(log M) per access) or 'calendar'
+    # (calendar queue, amortized O(1), for large M); span bounds the IRDs
+    # (e.g. tmax) to size the calendar, None to estimate it from the fill.
+    # Both produce the same trace.
+    def __init__(self, scheduler='heap', span=None):
+        if scheduler not in SCHEDULERS:
+            raise ValueError("Invalid scheduler type.")
+        self.scheduler = scheduler
+        self.g = _ird_gen.ird_gen_create(SCHEDULERS[scheduler], float(span or 0))
+
+    def fill(self, irds):
+        # push the non-singleton samples as new addresses; returns # pushed
+        irds = np.asarray(irds, dtype=np.float64)
+        return _ird_gen.ird_gen_fill(self.g, len(irds), irds)
+
+    def fill_to(self, f, M):
+        # draw from the batch sampler f(size) until the heap holds M addresses
+        while self.size() < M:
+            self.fill(f(M - self.size()))
+
+    def run(self, irds, is_irm=None, irm=None, out=None, times=None):
+        irds = np.asarray(irds, dtype=np.float64)
+        if is_irm is None:
+            n = len(irds)
+            is_irm = np.zeros(0, dtype=np.uint8)
+        else:
+            n = len(is_irm)
+            is_irm = np.asarray(is_irm, dtype=bool).view(np.uint8)
+        if irm is None:
+            irm = np.zeros(0, dtype=np.int32)
+        else:
+            irm = np.asarray(irm).astype(np.int32, copy=False)
+        if out is None:
+            out = np.empty(n, dtype=np.int32)
+        if times is None:
+            times = np.zeros(0, dtype=np.float64)
+        _ird_gen.ird_gen_run(self.g, n, is_irm, irds, irm, out, times)
+        return out
+
+    def load(self, addrs, irds):
+        # append irds[i] to the per-address IRD queue of addrs[i]
+        addrs = np.asarray(addrs).astype(np.int32, copy=False)
+        irds = np.asarray(irds, dtype=np.float64)
+        return _ird_gen.ird_gen_load(self.g, len(addrs), addrs, irds)
+
+    def remaining(self):
+        # unread queue length of every address in the heap
+        rem = np.zeros(self.next_addr(), dtype=np.int32)
+        _ird_gen.ird_gen_remaining(self.g, rem)
+        return rem
+
+    def run_pooled(self, n, refill, out=None, times=None):
+        # n accesses drawing each IRD from the popped address's queue;
+        # refill(a) returns more IRDs for address a when its queue runs dry
+        if out is None:
+            out = np.empty(n, dtype=np.int32)
+        if times is None:
+            times = np.zeros(0, dtype=np.float64)
+        i = 0
+        while i < n:
+            t = times[i:] if len(times) else times
+            o = out[i:]
+            i += _ird_gen.ird_gen_run_pooled(self.g, n - i, o, t)
+            if i < n:
+                a = _ird_gen.ird_gen_starved(self.g)
+                irds = refill(a)
+                self.load(np.full(len(irds), a, dtype=np.int32), irds)
+        return out
+
+    def size(self):
+        return _ird_gen.ird_gen_size(self.g)
+
+    def next_addr(self):
+        return _ird_gen.ird_gen_next_addr(self.g)
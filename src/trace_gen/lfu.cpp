@@ -6,57 +6,142 @@
 #include <pybind11/numpy.h>
 #include <pybind11/pybind11.h>
 #include <pybind11/stl.h>
+#include "sim_common.h"
 
 namespace py = pybind11;
 
+/*
+  O(1) LFU (Shah, Mitra & Matani): entries with equal frequency sit in one
+  doubly linked list, and those lists hang off a list of frequency nodes in
+  increasing frequency order. An entry joins a list only when it is
+  accessed, i.e. with the newest last-use time, so appending at the tail
+  keeps every list sorted by last use. The victim, smallest frequency with
+  ties broken by oldest last-use time, is then the head of the first list.
+ */
+
 class lfu
 {
 	int C = 0;
 
 	struct entry
 	{
-		int32_t addr = -1;
-		int freq = 0;
-		int last = 0;
+		int64_t addr = -1;
+		int64_t freq = 0;
+		int64_t last = 0;
+		int prev = -1, next = -1; // neighbours within its frequency list
+		int node = -1;			  // its frequency node
+	};
+
+	struct fnode
+	{
+		int64_t freq = 0;
+		int head = -1, tail = -1; // slots, oldest last use first
+		int prev = -1, next = -1; // neighbouring frequency nodes
 	};
 
 	std::vector<entry> slots;  // physical cache slots
 	std::vector<int> loc;	   // addr -> slot index or -1
+	std::vector<fnode> nodes;  // frequency nodes, recycled through free_nodes
+	std::vector<int> free_nodes;
+	int first = -1;			   // node with the smallest frequency
 
 	int len = 0;
-	int n_access = 0;
-	int n_miss = 0;
-	int n_cachefill = 0;
+	int64_t n_access = 0;
+	int64_t n_miss = 0;
+	int64_t n_cachefill = 0;
 
-	void expand(int32_t addr)
+	void expand(int64_t addr)
 	{
 		if (addr < 0)
 			throw std::invalid_argument("Address must be non-negative");
-		if (addr >= (int32_t)loc.size())
+		if (addr >= (int64_t)loc.size())
 		{
-			int n = addr * 3 / 2 + 1;
+			size_t n = addr * 3 / 2 + 1;
 			loc.resize(n, -1);
 		}
 	}
 
-	int victim_index() const
+	// new frequency node after node `after` (-1: at the front)
+	int new_node(int64_t freq, int after)
 	{
-		// Choose the item with the smallest frequency; break ties by oldest last-use time.
-		int victim = 0;
-		int best_freq = slots[0].freq;
-		int best_last = slots[0].last;
-		for (int i = 1; i < len; i++)
+		int v;
+		if (free_nodes.empty())
 		{
-			int f = slots[i].freq;
-			int l = slots[i].last;
-			if (f < best_freq || (f == best_freq && l < best_last))
-			{
-				victim = i;
-				best_freq = f;
-				best_last = l;
-			}
+			v = nodes.size();
+			nodes.push_back(fnode{});
+		}
+		else
+		{
+			v = free_nodes.back();
+			free_nodes.pop_back();
 		}
-		return victim;
+		nodes[v] = fnode{freq, -1, -1, after, after == -1 ? first : nodes[after].next};
+		if (nodes[v].next != -1)
+			nodes[nodes[v].next].prev = v;
+		if (after == -1)
+			first = v;
+		else
+			nodes[after].next = v;
+		return v;
+	}
+
+	void drop_node(int v)
+	{
+		fnode& x = nodes[v];
+		if (x.prev == -1)
+			first = x.next;
+		else
+			nodes[x.prev].next = x.next;
+		if (x.next != -1)
+			nodes[x.next].prev = x.prev;
+		free_nodes.push_back(v);
+	}
+
+	void append(int i, int v)
+	{
+		entry& e = slots[i];
+		e.node = v;
+		e.prev = nodes[v].tail;
+		e.next = -1;
+		if (e.prev == -1)
+			nodes[v].head = i;
+		else
+			slots[e.prev].next = i;
+		nodes[v].tail = i;
+	}
+
+	// unlink slot i from its list; drops the node once empty
+	void unlink(int i)
+	{
+		entry& e = slots[i];
+		fnode& x = nodes[e.node];
+		if (e.prev == -1)
+			x.head = e.next;
+		else
+			slots[e.prev].next = e.next;
+		if (e.next == -1)
+			x.tail = e.prev;
+		else
+			slots[e.next].prev = e.prev;
+		if (x.head == -1)
+			drop_node(e.node);
+	}
+
+	// new entry for addr in slot i, frequency 1
+	void insert(int i, int64_t addr)
+	{
+		slots[i].addr = addr;
+		slots[i].freq = 1;
+		slots[i].last = n_access;
+		loc[addr] = i;
+		int v = (first != -1 && nodes[first].freq == 1) ? first : new_node(1, -1);
+		append(i, v);
+	}
+
+	int victim_index() const
+	{
+		// Choose the item with the smallest frequency; break ties by oldest last-use time.
+		return nodes[first].head;
 	}
 
 public:
@@ -68,7 +153,7 @@ public:
 		loc.assign(100000, -1);
 	}
 
-	void access(int32_t addr)
+	void access(int64_t addr)
 	{
 		n_access++;
 		if (len < C)
@@ -81,34 +166,39 @@ public:
 			n_miss++;
 			if (len < C)
 			{
-				slots[len] = entry{addr, 1, n_access};
-				loc[addr] = len;
-				len++;
+				insert(len++, addr);
 				return;
 			}
 
 			int victim = victim_index();
 			loc[slots[victim].addr] = -1;
-			slots[victim] = entry{addr, 1, n_access};
-			loc[addr] = victim;
+			unlink(victim);
+			insert(victim, addr);
 			return;
 		}
 
 		auto& e = slots[pos];
+		int v = e.node;
+		int w = nodes[v].next;
+		if (w == -1 || nodes[w].freq != e.freq + 1)
+			w = new_node(e.freq + 1, v);
+		unlink(pos);
 		e.freq++;
 		e.last = n_access;
+		append(pos, w);
 	}
 
-	void multi_access(int n, py::array_t<int32_t>& addrs)
+	template <class T>
+	void multi_access(int64_t n, py::array_t<T, py::array::c_style>& addrs)
 	{
-		int32_t* addrs_ptr = addrs.mutable_data();
-		for (int i = 0; i < n; i++)
+		const T* addrs_ptr = addrs.data();
+		for (int64_t i = 0; i < n; i++)
 			access(addrs_ptr[i]);
 	}
 
-	int contents(py::array_t<int32_t>& out)
+	int contents(py::array_t<int64_t>& out)
 	{
-		int32_t* out_ptr = out.mutable_data();
+		int64_t* out_ptr = out.mutable_data();
 		int n = 0;
 		for (int i = 0; i < len; i++)
 		{
@@ -121,12 +211,12 @@ public:
 	double hit_rate() const
 	{
 		if (n_access <= n_cachefill)
-			return 1.0 - (n_miss * 1.0 / std::max(1, n_access));
-		double miss_rate = (n_miss - C) * 1.0 / std::max(1, (n_access - n_cachefill));
+			return 1.0 - (n_miss * 1.0 / std::max<int64_t>(1, n_access));
+		double miss_rate = (n_miss - C) * 1.0 / std::max<int64_t>(1, (n_access - n_cachefill));
 		return 1.0 - miss_rate;
 	}
 
-	void data(int& _access, int& _miss, int& _cachefill) const
+	void data(int64_t& _access, int64_t& _miss, int64_t& _cachefill) const
 	{
 		_access = n_access;
 		_miss = n_miss;
@@ -134,11 +224,29 @@ public:
 	}
 };
 
+// the bindings that take a trace, for int32 or int64 addresses
+template <class T>
+static void def_runs(py::module_& m)
+{
+	m.def("lfu_run", [](void* _l, int64_t n, py::array_t<T, py::array::c_style>& a) {
+		lfu* l = (lfu*)_l;
+		l->multi_access(n, a);
+	}, py::call_guard<py::gil_scoped_release>());
+	// cumulative (accesses, misses) at window ends, see run_windows()
+	m.def("lfu_run_windows", [](void* _l, int64_t n, py::array_t<T, py::array::c_style>& a, int64_t first, int64_t window,
+								  py::array_t<int64_t>& acc, py::array_t<int64_t>& miss) {
+		lfu* l = (lfu*)_l;
+		return run_windows(*l, a.data(), n, first, window, acc.mutable_data(), miss.mutable_data(),
+						   [](lfu& c, int64_t& _a, int64_t& _m) { int64_t f; c.data(_a, _m, f); });
+	}, py::call_guard<py::gil_scoped_release>());
+}
+
 PYBIND11_MODULE(_lfu, m)
 {
 	py::class_<lfu>(m, "lfu")
 		.def(py::init<int>())
-		.def("multi_access", &lfu::multi_access)
+		.def("multi_access", &lfu::multi_access<int32_t>, py::call_guard<py::gil_scoped_release>())
+		.def("multi_access", &lfu::multi_access<int64_t>, py::call_guard<py::gil_scoped_release>())
 		.def("contents", &lfu::contents)
 		.def("hit_rate", &lfu::hit_rate)
 		.def("data", &lfu::data);
@@ -147,12 +255,10 @@ PYBIND11_MODULE(_lfu, m)
 		return new lfu(C);
 	});
 
-	m.def("lfu_run", [](void* _l, int n, py::array_t<int32_t>& a) {
-		lfu* l = (lfu*)_l;
-		l->multi_access(n, a);
-	});
+	def_runs<int32_t>(m);
+	def_runs<int64_t>(m);
 
-	m.def("lfu_contents", [](void* _l, py::array_t<int32_t>& out) {
+	m.def("lfu_contents", [](void* _l, py::array_t<int64_t>& out) {
 		lfu* l = (lfu*)_l;
 		return l->contents(out);
 	});
@@ -165,8 +271,8 @@ PYBIND11_MODULE(_lfu, m)
 	m.def("lfu_data", [](py::object _l) -> py::tuple {
 		if (py::isinstance<lfu>(_l))
 		{
-			lfu l = _l.cast<lfu>();
-			int _access, _miss, _cachefill;
+			lfu& l = _l.cast<lfu&>();
+			int64_t _access, _miss, _cachefill;
 			l.data(_access, _miss, _cachefill);
 			return py::make_tuple(_access, _miss, _cachefill);
 		}
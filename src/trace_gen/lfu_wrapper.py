@@ -1,21 +1,30 @@
 import numpy as np
+from trace_gen import windows
 import _lfu
 
 
 class lfu:
-    def __init__(self, C):
+    def __init__(self, C, amap=None):
+        self.amap = amap
         self.l = _lfu.lfu_create(C)
         self.C = C
 
     def run(self, trace):
-        if type(trace[0]) != np.int32:
+        if self.amap is not None:
+            trace = self.amap.map(trace)
+        if type(trace[0]) not in (np.int32, np.int64):
             trace = np.array(trace, dtype=np.int32)
         _lfu.lfu_run(self.l, len(trace), trace)
 
+    def run_windows(self, trace, window, snapshots=None):
+        # (accesses, misses) of every window of trace in one native call,
+        # plus contents() after each of the snapshots offsets if given
+        return windows.run_windows(self, _lfu.lfu_run_windows, self.l, trace, window, snapshots)
+
     def contents(self):
-        val = np.zeros(self.C, dtype=np.int32)
+        val = np.zeros(self.C, dtype=np.int64)
         n = _lfu.lfu_contents(self.l, val)
-        return val[:n]
+        return val[:n] if self.amap is None else self.amap.unmap(val[:n])
 
     def hitrate(self):
         a, m, c = self.data()
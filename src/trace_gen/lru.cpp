@@ -1,10 +1,12 @@
 #include <map>
+#include <algorithm>
 #include <unordered_map>
 #include <assert.h>
 #include <vector>
 #include <pybind11/pybind11.h>
 #include <pybind11/stl.h>
 #include <pybind11/numpy.h>
+#include "sim_common.h"
 
 namespace py = pybind11;
 
@@ -24,20 +26,20 @@ class lru {
 	int C = 0;
 	std::vector<int> map; // track item position in cache
 	int tail = 0, head = 0;
-	std::vector<int> cache;
+	std::vector<int64_t> cache;
 
-	std::vector<int> ref;	// time of most recent ref
-	std::vector<int> enter; // time entered cache
+	std::vector<int64_t> ref;	// time of most recent ref
+	std::vector<int64_t> enter; // time entered cache
 
-	int n_evict = 0;
+	int64_t n_evict = 0;
 	double s_evict_ref = 0;
 	double s2_evict_ref = 0;
 
 	int len = 0;
 
-	int n_cachefill = 0;
-	int n_access = 0;
-	int n_miss = 0;
+	int64_t n_cachefill = 0;
+	int64_t n_access = 0;
+	int64_t n_miss = 0;
 
 public:
 	lru(int _C)
@@ -64,9 +66,9 @@ public:
 		}
 	}
 
-	int contents(py::array_t< int32_t >& out)
+	int contents(py::array_t< int64_t >& out)
 	{
-		int32_t* out_ptr = out.mutable_data();
+		int64_t* out_ptr = out.mutable_data();
 		int i, n;
 		for (i = head - 1, n = 0; i >= 0; i--)
 			if (cache[i] != -1)
@@ -74,7 +76,7 @@ public:
 		return n;
 	}
 
-	void pull(int addr) 
+	void pull(int64_t addr) 
 	{
 		assert(map[addr] != -1);
 		cache[map[addr]] = -1;
@@ -82,16 +84,16 @@ public:
 		len--;
 	}
 
-	int pop(void)
+	int64_t pop(void)
 	{
 		while (cache[tail] == -1)
 			tail++;
-		int addr = cache[tail];
+		int64_t addr = cache[tail];
 		pull(addr);
 		return addr;
 	}
 
-	void push(int addr)
+	void push(int64_t addr)
 	{
 		if (head >= 2 * C) 
 		{
@@ -110,7 +112,7 @@ public:
 		len++;
 	}
 
-	void access(unsigned int addr)
+	void access(uint64_t addr)
 	{
 		n_access++;
 		if (len < C)
@@ -126,15 +128,15 @@ public:
 			pop();
 	}
 
-	void access_verbose(unsigned int addr, int32_t* miss, int32_t* evictee,
-						int32_t* last_ref, int32_t* entered)
+	void access_verbose(uint64_t addr, int32_t* miss, int64_t* evictee,
+						int64_t* last_ref, int64_t* entered)
 	{
 		n_access++;
 		if (len < C)
 			n_cachefill = n_access;
 		if (addr >= map.size())
 		{
-			int n = addr * 3 / 2;
+			size_t n = addr * 3 / 2;
 			map.resize(n, -1);
 			ref.resize(n, 0);
 			enter.resize(n, 0);
@@ -153,7 +155,7 @@ public:
 		push(addr);
 		if (len > C)
 		{
-			int e = pop();
+			int64_t e = pop();
 			*miss= 1;
 			*evictee = e;
 			*last_ref = n_access - ref[e];
@@ -165,9 +167,9 @@ public:
 		}
 	}
 
-	void queue_stats(py::array_t< int32_t >& n, py::array_t<double>& s, py::array_t<double>& s2)
+	void queue_stats(py::array_t< int64_t >& n, py::array_t<double>& s, py::array_t<double>& s2)
 	{
-		int32_t* n_ptr = n.mutable_data();
+		int64_t* n_ptr = n.mutable_data();
 		double* s_ptr = s.mutable_data();
 		double* s2_ptr = s2.mutable_data();
 
@@ -176,26 +178,28 @@ public:
 		*s2_ptr = s2_evict_ref;
 	}
 
-	void multi_access(int n, py::array_t<int>& addrs)
+	template <class T>
+	void multi_access(int64_t n, py::array_t<T, py::array::c_style>& addrs)
 	{
-		int32_t* addrs_ptr = addrs.mutable_data();
+		const T* addrs_ptr = addrs.data();
 
-		for (int i = 0; i < n; i++)
+		for (int64_t i = 0; i < n; i++)
 		{
 			access(addrs_ptr[i]);
 		}
 	}
 
-	void multi_access_age(int n, py::array_t<int>& addrs, py::array_t< int32_t >& misses,
-						  py::array_t< int32_t >& evicted, py::array_t< int32_t >& age1, py::array_t< int32_t >& age2)
+	template <class T>
+	void multi_access_age(int64_t n, py::array_t<T, py::array::c_style>& addrs, py::array_t< int32_t >& misses,
+						  py::array_t< int64_t >& evicted, py::array_t< int64_t >& age1, py::array_t< int64_t >& age2)
 	{
-		int32_t* addrs_ptr = addrs.mutable_data();
+		const T* addrs_ptr = addrs.data();
 		int32_t* misses_ptr = misses.mutable_data();
-		int32_t* evicted_ptr = evicted.mutable_data();
-		int32_t* age1_ptr = age1.mutable_data();
-		int32_t* age2_ptr = age2.mutable_data();
+		int64_t* evicted_ptr = evicted.mutable_data();
+		int64_t* age1_ptr = age1.mutable_data();
+		int64_t* age2_ptr = age2.mutable_data();
 
-		for (int i = 0; i < n; i++)
+		for (int64_t i = 0; i < n; i++)
 			access_verbose(addrs_ptr[i], &misses_ptr[i], &evicted_ptr[i], &age1_ptr[i], &age2_ptr[i]);
 	}
 
@@ -205,7 +209,7 @@ public:
 		return 1 - miss_rate;
 	}
 
-	void data(int& _access, int& _miss, int& _cachefill)
+	void data(int64_t& _access, int64_t& _miss, int64_t& _cachefill)
 	{
 		_access = n_access;
 		_miss = n_miss;
@@ -213,44 +217,201 @@ public:
 	}
 };
 
+/*
+  Single-pass LRU stack distances (Bennett-Kruskal): every address keeps a
+  mark at the slot of its most recent reference, and a Fenwick tree over the
+  slots counts the distinct addresses referenced since. An access at stack
+  distance d hits in every LRU cache of size >= d, so hist gives the whole
+  miss-ratio curve at once. As with the lru queue above, slots are
+  compacted once 2x the live addresses are used, so memory is O(M), not O(n).
+ */
+
+class lru_sd {
+
+	std::vector<int> last;	   // addr -> slot of most recent ref, -1 if none
+	std::vector<int64_t> owner; // slot -> addr, -1 if stale
+	std::vector<int> bit;	   // Fenwick tree over slots, 1 for live marks
+	int head = 0, live = 0;
+
+	std::vector<int64_t> hist; // hist[d]: # accesses at stack distance d
+	int64_t n_access = 0;
+	int64_t n_cold = 0;
+
+	void add(int i, int v)
+	{
+		for (i++; i <= (int)bit.size(); i += i & -i)
+			bit[i - 1] += v;
+	}
+
+	// # live marks in slots [0, i]
+	int prefix(int i)
+	{
+		int s = 0;
+		for (i++; i > 0; i -= i & -i)
+			s += bit[i - 1];
+		return s;
+	}
+
+	// renumber live marks to 0..live-1 (keeping their order) and rebuild
+	void compact(void)
+	{
+		int cap = std::max(1024, 2 * (live + 1));
+		int j = 0;
+		for (int i = 0; i < head; i++)
+			if (owner[i] != -1)
+			{
+				last[owner[i]] = j;
+				owner[j++] = owner[i];
+			}
+		head = j;
+		owner.resize(cap);
+		std::fill(owner.begin() + head, owner.end(), -1);
+		bit.assign(cap, 0);
+		for (int i = 1; i <= cap; i++)
+		{
+			bit[i - 1] += i <= head;
+			int p = i + (i & -i);
+			if (p <= cap)
+				bit[p - 1] += bit[i - 1];
+		}
+	}
+
+public:
+	lru_sd() {}
+	~lru_sd() {}
+
+	void access(uint64_t addr)
+	{
+		n_access++;
+		if (addr >= last.size())
+			last.resize(std::max<size_t>(addr * 3 / 2 + 1, 100000), -1);
+		int s = last[addr];
+		if (s == -1)
+		{
+			n_cold++;
+			live++;
+		}
+		else
+		{
+			int d = live - prefix(s) + 1;
+			if (d >= (int)hist.size())
+				hist.resize(2 * d, 0);
+			hist[d]++;
+			add(s, -1);
+			owner[s] = -1;
+		}
+		if (head >= (int)owner.size())
+			compact();
+		owner[head] = addr;
+		last[addr] = head;
+		add(head++, 1);
+	}
+
+	template <class T>
+	void multi_access(int64_t n, py::array_t<T, py::array::c_style>& addrs)
+	{
+		const T* addrs_ptr = addrs.data();
+		for (int64_t i = 0; i < n; i++)
+			access(addrs_ptr[i]);
+	}
+
+	// stack-distance histogram, entries 1..# distinct addresses
+	py::array_t<int64_t> histogram(void)
+	{
+		py::array_t<int64_t> out(live + 1);
+		int64_t* out_ptr = out.mutable_data();
+		for (int d = 0; d <= live; d++)
+			out_ptr[d] = d < (int)hist.size() ? hist[d] : 0;
+		return out;
+	}
+
+	void data(int64_t& _access, int64_t& _cold, int& _distinct)
+	{
+		_access = n_access;
+		_cold = n_cold;
+		_distinct = live;
+	}
+};
+
+// the bindings that take a trace, for int32 or int64 addresses
+template <class T>
+static void def_runs(py::module_& m)
+{
+	m.def("lru_run", [](void* _l, int64_t n, py::array_t<T, py::array::c_style>& a) {
+		lru* l = (lru *)_l;
+		l->multi_access(n, a); 
+		}, py::call_guard<py::gil_scoped_release>());
+	// cumulative (accesses, misses) at window ends, see run_windows()
+	m.def("lru_run_windows", [](void* _l, int64_t n, py::array_t<T, py::array::c_style>& a, int64_t first, int64_t window,
+								  py::array_t<int64_t>& acc, py::array_t<int64_t>& miss) {
+		lru* l = (lru*)_l;
+		return run_windows(*l, a.data(), n, first, window, acc.mutable_data(), miss.mutable_data(),
+						   [](lru& c, int64_t& _a, int64_t& _m) { int64_t f; c.data(_a, _m, f); });
+	}, py::call_guard<py::gil_scoped_release>());
+	m.def("lru_run_age", [](void* _l, int64_t n, py::array_t<T, py::array::c_style>& a, py::array_t< int32_t >& b, py::array_t< int64_t >& c, py::array_t< int64_t >& d, py::array_t< int64_t >& e) {
+		lru* l = (lru *)_l;
+		l->multi_access_age(n, a, b, c, d, e); 
+		}, py::call_guard<py::gil_scoped_release>());
+	m.def("lru_sd_run", [](void* _s, int64_t n, py::array_t<T, py::array::c_style>& a) {
+		lru_sd* s = (lru_sd *)_s;
+		s->multi_access(n, a);
+		}, py::call_guard<py::gil_scoped_release>());
+}
+
 PYBIND11_MODULE(_lru, m) {
     py::class_<lru>(m, "LRU")
 		.def(py::init<int>())
-		.def("multi_access", &lru::multi_access)
+		.def("multi_access", &lru::multi_access<int32_t>, py::call_guard<py::gil_scoped_release>())
+		.def("multi_access", &lru::multi_access<int64_t>, py::call_guard<py::gil_scoped_release>())
 		.def("contents", &lru::contents)
-		.def("multi_access_age", &lru::multi_access_age)
+		.def("multi_access_age", &lru::multi_access_age<int32_t>, py::call_guard<py::gil_scoped_release>())
+		.def("multi_access_age", &lru::multi_access_age<int64_t>, py::call_guard<py::gil_scoped_release>())
 		.def("hit_rate", &lru::hit_rate)
 		.def("queue_stats", &lru::queue_stats)
 		.def("data", &lru::data);
+	py::class_<lru_sd>(m, "LRU_SD")
+		.def(py::init<>())
+		.def("multi_access", &lru_sd::multi_access<int32_t>, py::call_guard<py::gil_scoped_release>())
+		.def("multi_access", &lru_sd::multi_access<int64_t>, py::call_guard<py::gil_scoped_release>())
+		.def("histogram", &lru_sd::histogram);
 
 	m.def("lru_create", [](int C) {
 		return new lru(C); 
 		});
-	m.def("lru_run", [](void* _l, int n, py::array_t< int32_t >& a) {
-		lru* l = (lru *)_l;
-		l->multi_access(n, a); 
-		});
-	m.def("lru_contents", [](void* _l, py::array_t< int32_t >& out) {
+	def_runs<int32_t>(m);
+	def_runs<int64_t>(m);
+	m.def("lru_contents", [](void* _l, py::array_t< int64_t >& out) {
 		lru* l = (lru *)_l;
 		return l->contents(out); 
 		});
-	m.def("lru_run_age", [](void* _l, int n, py::array_t< int32_t >& a, py::array_t< int32_t >& b, py::array_t< int32_t >& c, py::array_t< int32_t >& d, py::array_t< int32_t >& e) {
-		lru* l = (lru *)_l;
-		l->multi_access_age(n, a, b, c, d, e); 
-		});
 	m.def("lru_hitrate", [](void* _l) {
 		lru* l = (lru *)_l;
 		return l->hit_rate(); 
 		});
-	m.def("lru_queue_stats", [](void* _l, py::array_t< int32_t >& n, py::array_t<double>& s, py::array_t<double>& s2) {
+	m.def("lru_queue_stats", [](void* _l, py::array_t< int64_t >& n, py::array_t<double>& s, py::array_t<double>& s2) {
 		lru* l = (lru *)_l;
 		l->queue_stats(n, s, s2); 
 		});
 
+	m.def("lru_sd_create", []() {
+		return new lru_sd();
+		});
+	m.def("lru_sd_hist", [](void* _s) {
+		lru_sd* s = (lru_sd *)_s;
+		return s->histogram();
+		});
+	m.def("lru_sd_data", [](void* _s) {
+		lru_sd* s = (lru_sd *)_s;
+		int64_t _access, _cold;
+		int _distinct;
+		s->data(_access, _cold, _distinct);
+		return py::make_tuple(_access, _cold, _distinct);
+		});
+
 	m.def("lru_data", [](py::object _l) -> py::tuple {
 		if (py::isinstance< lru >(_l)) {
-			lru l = _l.cast< lru >();
-			int _access, _miss, _cachefill;
+			lru& l = _l.cast< lru& >();
+			int64_t _access, _miss, _cachefill;
 			l.data(_access, _miss, _cachefill);
 			return py::make_tuple(_access, _miss, _cachefill);
 		} else { 
@@ -1,53 +1,54 @@
 from ctypes import *
 import numpy as np
+from trace_gen.addrmap_wrapper import dense_trace
+from trace_gen import windows
 import _lru
 
 
 class lru:
-    def __init__(self, C):
+    def __init__(self, C, amap=None):
+        self.amap = amap
         self.l = _lru.lru_create(C)
         self.C = C
 
     def run(self, trace):
-        if type(trace[0]) != np.int32:
+        if self.amap is not None:
+            trace = self.amap.map(trace)
+        if type(trace[0]) not in (np.int32, np.int64):
             trace = np.array(trace, dtype=np.int32)
         _lru.lru_run(self.l, len(trace), trace)
 
     def run_age(self, trace):
-        if type(trace[0]) != np.int32:
+        if self.amap is not None:
+            trace = self.amap.map(trace)
+        if type(trace[0]) not in (np.int32, np.int64):
             trace = np.array(trace, dtype=np.int32)
         misses = np.zeros(len(trace), dtype=np.int32)
-        evicted = np.zeros(len(trace), dtype=np.int32)
-        age1 = np.zeros(len(trace), dtype=np.int32)
-        age2 = np.zeros(len(trace), dtype=np.int32)
+        evicted = np.zeros(len(trace), dtype=np.int64)
+        age1 = np.zeros(len(trace), dtype=np.int64)
+        age2 = np.zeros(len(trace), dtype=np.int64)
         _lru.lru_run_age(self.l, len(trace), trace, misses, evicted, age1, age2)
         return [age1, age2, misses]
 
+    def run_windows(self, trace, window, snapshots=None):
+        # (accesses, misses) of every window of trace in one native call,
+        # plus contents() after each of the snapshots offsets if given
+        return windows.run_windows(self, _lru.lru_run_windows, self.l, trace, window, snapshots)
+
     def run_parts(self, trace, n):
-        a0, m0, vals = 0, 0, []
-        for i in range(0, len(trace), n):
-            t = np.array(trace[i:i+n], dtype=np.int32)
-            self.run(t)
-            a, m, c = self.data()
-            vals.append(1 - (m-m0)/(a-a0))
-            a0, m0 = a, m
-        return np.array(vals)
+        # hit rate of every window of n references
+        a, m = self.run_windows(trace, n)
+        return 1 - m / a
 
     # run slice to get contents: return a list of cache states.
     def run_slices(self, trace, n):
-        sliced_contents = []
-        for i in range(0, len(trace), n):
-            # print('y', i, n, i*n, (i+1)*n)
-            t = np.array(trace[i:i+n], dtype=np.int32)
-            self.run(t)
-            contents = self.contents()
-            sliced_contents.append(contents)
-        return sliced_contents
+        ends = [min(i + n, len(trace)) for i in range(0, len(trace), n)]
+        return self.run_windows(trace, n, ends)[2]
 
     def contents(self):
-        val = np.zeros(self.C, dtype=np.int32)
+        val = np.zeros(self.C, dtype=np.int64)
         n = _lru.lru_contents(self.l, val)
-        return val[:n]
+        return val[:n] if self.amap is None else self.amap.unmap(val[:n])
 
     def hitrate(self):
         a, m, c = self.data()
@@ -57,11 +58,44 @@ class lru:
         return _lru.lru_data(self.l)
 
     def queue_raw_stats(self):
-        n, s, s2 = c_int(), c_double(), c_double()
-        _lru.lru_queue_stats(self.l, byref(n), byref(s), byref(s2))
-        return [n.value, s.value, s2.value]
+        n, s, s2 = np.zeros(1, dtype=np.int64), np.zeros(1), np.zeros(1)
+        _lru.lru_queue_stats(self.l, n, s, s2)
+        return [int(n[0]), s[0], s2[0]]
 
     def queue_stats(self):
         n, s, s2 = self.queue_raw_stats()
         return (s/n, np.sqrt((s2 - s*s/n)/(n-1)))
 
+
+
+class lru_stack:
+    # one-pass LRU stack distances; trace may be fed in chunks
+    def __init__(self, amap=None):
+        self.amap = amap
+        self.s = _lru.lru_sd_create()
+
+    def run(self, trace):
+        if self.amap is not None:
+            trace = self.amap.map(trace)
+        if type(trace[0]) not in (np.int32, np.int64):
+            trace = np.array(trace, dtype=np.int32)
+        _lru.lru_sd_run(self.s, len(trace), trace)
+
+    def hist(self):
+        # hist[d]: # accesses at stack distance d, d = 1..# distinct addrs
+        return _lru.lru_sd_hist(self.s)
+
+    def mrc(self):
+        # hit ratio of an LRU cache of size C at index C-1, C = 1..# distinct
+        a, cold, distinct = self.data()
+        return np.cumsum(self.hist()[1:]) / a
+
+    def data(self) -> tuple: # return (accesses, cold misses, distinct addrs)
+        return _lru.lru_sd_data(self.s)
+
+
+def lru_mrc(trace):
+    # exact LRU hit-ratio curve of trace for every cache size, in one pass
+    s = lru_stack()
+    s.run(dense_trace(trace))
+    return s.mrc()
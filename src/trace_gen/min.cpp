@@ -1,114 +1,212 @@
 #include <stdint.h>
-#include <unordered_map>
+#include <algorithm>
 #include <vector>
-#include <queue>
 #include <pybind11/pybind11.h>
 #include <pybind11/numpy.h>
 
 namespace py = pybind11;
 
+/*
+  Map the addresses of a trace to dense ids 0..D-1 (returns D): indexed
+  directly when the address range is small, else through the sorted set of
+  distinct addresses. addr_of receives the address of each id.
+ */
+template <class T>
+static int compact(const T *a, int64_t n, std::vector<int> &id, std::vector<int64_t> &addr_of)
+{
+	id.resize(n);
+	T lo = 0, hi = 0;
+	for (int64_t i = 0; i < n; i++)
+	{
+		lo = std::min(lo, a[i]);
+		hi = std::max(hi, a[i]);
+	}
+	addr_of.clear();
+	if (lo >= 0 && (int64_t)hi < 4 * (int64_t)n + 1024)
+	{
+		std::vector<int> dense(hi + 1, -1);
+		for (int64_t i = 0; i < n; i++)
+		{
+			if (dense[a[i]] == -1)
+			{
+				dense[a[i]] = addr_of.size();
+				addr_of.push_back(a[i]);
+			}
+			id[i] = dense[a[i]];
+		}
+	}
+	else
+	{
+		addr_of.assign(a, a + n);
+		std::sort(addr_of.begin(), addr_of.end());
+		addr_of.erase(std::unique(addr_of.begin(), addr_of.end()), addr_of.end());
+		for (int64_t i = 0; i < n; i++)
+			id[i] = std::lower_bound(addr_of.begin(), addr_of.end(), a[i]) - addr_of.begin();
+	}
+	return addr_of.size();
+}
+
+// next_idx[i]: position of the next reference to id[i], or INF
+static void next_uses(const std::vector<int> &id, int D, int64_t INF, std::vector<int64_t> &next_idx)
+{
+	int64_t n = id.size();
+	std::vector<int64_t> last_pos(D, INF);
+	next_idx.resize(n);
+	for (int64_t i = n - 1; i >= 0; --i)
+	{
+		next_idx[i] = last_pos[id[i]];
+		last_pos[id[i]] = i;
+	}
+}
+
 class belady_min
 {
 	int C = 0;
-	int n_access = 0;
-	int n_miss = 0;
-	int n_cachefill = 0;
-	std::vector<int> contents_vec;
+	int64_t n_access = 0;
+	int64_t n_miss = 0;
+	int64_t n_cachefill = 0;
+	std::vector<int64_t> contents_vec;
+
+	// indexed max-heap of cached ids on (next use, addr); hpos[id] = -1 if not cached
+	std::vector<int> heap, hpos;
+	std::vector<int64_t> key;
+	std::vector<int64_t> addr_of;
+
+	bool above(int u, int v) const
+	{
+		return key[u] > key[v] || (key[u] == key[v] && addr_of[u] > addr_of[v]);
+	}
+
+	void place(int i, int u)
+	{
+		heap[i] = u;
+		hpos[u] = i;
+	}
+
+	void sift_up(int i)
+	{
+		int u = heap[i];
+		while (i > 0 && above(u, heap[(i - 1) / 2]))
+		{
+			place(i, heap[(i - 1) / 2]);
+			i = (i - 1) / 2;
+		}
+		place(i, u);
+	}
+
+	void sift_down(int i)
+	{
+		int u = heap[i], n = heap.size();
+		while (true)
+		{
+			int c = 2 * i + 1;
+			if (c >= n)
+				break;
+			if (c + 1 < n && above(heap[c + 1], heap[c]))
+				c++;
+			if (!above(heap[c], u))
+				break;
+			place(i, heap[c]);
+			i = c;
+		}
+		place(i, u);
+	}
 
 public:
 	belady_min(int _C) : C(_C) {}
 	~belady_min() {}
 
-	void multi_access(int n, py::array_t<int32_t> &addrs)
+	template <class T>
+	void multi_access(int64_t n, py::array_t<T, py::array::c_style> &addrs)
+	{
+		simulate(n, addrs.data(), 0, nullptr);
+	}
+
+	// one offline run over a[0..n); with wmiss, also adds the misses of
+	// reference i to wmiss[i / window]
+	template <class T>
+	void simulate(int64_t n, const T *a, int64_t window, int64_t *wmiss)
 	{
 		n_access = n_miss = n_cachefill = 0;
 		contents_vec.clear();
 		if (n <= 0 || C < 0)
 			return;
 
-		const int32_t *a = addrs.data();
-		const int INF = n + 1;
+		const int64_t INF = n + 1;
+		std::vector<int> id;
+		std::vector<int64_t> next_idx;
+		int D = compact(a, n, id, addr_of);
+		next_uses(id, D, INF, next_idx);
 
-		// Precompute next occurrence for each position
-		std::vector<int> next_idx(n, INF);
-		std::unordered_map<int, int> last_pos;
-		last_pos.reserve(n * 2);
-		for (int i = n - 1; i >= 0; --i)
-		{
-			int addr = a[i];
-			auto it = last_pos.find(addr);
-			next_idx[i] = (it == last_pos.end()) ? INF : it->second;
-			last_pos[addr] = i;
-		}
-
-		std::unordered_map<int, int> cache_next;
-		cache_next.reserve(C * 2 + 1);
-		std::priority_queue<std::pair<int, int>> pq; // (next_idx, addr) max-heap by next_idx
-		int distinct_seen = 0;
+		heap.clear();
+		heap.reserve(std::min(C, D));
+		hpos.assign(D, -1);
+		key.assign(D, 0);
+		int64_t distinct_seen = 0;
 
 		auto update_fill = [&](int size_now) {
 			if (n_cachefill == 0)
 			{
-				int target = std::min(C, distinct_seen);
+				int64_t target = std::min<int64_t>(C, distinct_seen);
 				if (size_now >= target && target > 0)
 					n_cachefill = n_access;
 			}
 		};
 
-		for (int i = 0; i < n; ++i)
+		for (int64_t i = 0; i < n; ++i)
 		{
-			int addr = a[i];
-			int nxt = next_idx[i];
+			int u = id[i];
+			int64_t nxt = next_idx[i];
 			n_access++;
 
-			auto it = cache_next.find(addr);
-			if (it != cache_next.end())
+			if (hpos[u] != -1)
 			{
-				it->second = nxt;
-				pq.push({nxt, addr});
+				// the next use only moves later, so u can only rise
+				key[u] = nxt;
+				sift_up(hpos[u]);
 				continue;
 			}
 
 			distinct_seen++;
 			n_miss++;
+			if (wmiss)
+				wmiss[i / window]++;
 
-			if (C > 0 && static_cast<int>(cache_next.size()) >= C)
+			if (C > 0 && static_cast<int>(heap.size()) >= C)
 			{
-				while (!pq.empty())
+				// evict the furthest next use
+				hpos[heap[0]] = -1;
+				int last = heap.back();
+				heap.pop_back();
+				if (!heap.empty())
 				{
-					auto top = pq.top();
-					auto ct = cache_next.find(top.second);
-					if (ct != cache_next.end() && ct->second == top.first)
-					{
-						cache_next.erase(ct);
-						pq.pop();
-						break;
-					}
-					pq.pop();
+					place(0, last);
+					sift_down(0);
 				}
 			}
 
 			if (C > 0)
 			{
-				cache_next[addr] = nxt;
-				pq.push({nxt, addr});
-				update_fill(static_cast<int>(cache_next.size()));
+				key[u] = nxt;
+				heap.push_back(u);
+				sift_up(heap.size() - 1);
+				update_fill(static_cast<int>(heap.size()));
 			}
 		}
 
 		if (n_cachefill == 0)
 			n_cachefill = n_access; // never filled to capacity or distinct set, treat run as warmup
 
-		contents_vec.reserve(cache_next.size());
-		for (const auto &kv : cache_next)
-			contents_vec.push_back(kv.first);
+		contents_vec.reserve(heap.size());
+		for (int u : heap)
+			contents_vec.push_back(addr_of[u]);
 	}
 
-	int contents(py::array_t<int32_t> &out)
+	int contents(py::array_t<int64_t> &out)
 	{
-		int32_t *out_ptr = out.mutable_data();
+		int64_t *out_ptr = out.mutable_data();
 		int n = 0;
-		for (int addr : contents_vec)
+		for (int64_t addr : contents_vec)
 			out_ptr[n++] = addr;
 		return n;
 	}
@@ -117,14 +215,14 @@ public:
 	{
 		if (n_access == 0)
 			return 0.0;
-		int warm = n_access - n_cachefill;
+		int64_t warm = n_access - n_cachefill;
 		if (warm <= 0)
 			return 1.0 - (static_cast<double>(n_miss) / n_access);
 		double miss_rate = (n_miss - C) * 1.0 / warm;
 		return 1 - miss_rate;
 	}
 
-	void data(int &_access, int &_miss, int &_cachefill)
+	void data(int64_t &_access, int64_t &_miss, int64_t &_cachefill)
 	{
 		_access = n_access;
 		_miss = n_miss;
@@ -132,11 +230,133 @@ public:
 	}
 };
 
+/*
+  OPT hit counts for every cache size up to max_size in one pass: Mattson's
+  priority stack with priority = sooner next use. The accessed item moves
+  to the top; the old top is carried down to the item's old depth, at each
+  level keeping the item used sooner and carrying on the other one. The
+  top C entries are then exactly the contents of a size-C MIN cache, so a
+  hit at depth d hits for every C >= d. Entries pushed below max_size are
+  dropped, which does not change the top max_size levels.
+  Levels never shift (only swap), so a max-tree over the next uses of the
+  levels finds each level where the carry is swapped in O(log max_size),
+  instead of walking every level above the accessed item.
+  hits[C] receives the # hits of a size-C cache, C = 0..max_size.
+ */
+template <class T>
+static void opt_hits(int64_t n, const T *a, int max_size, int64_t *hits)
+{
+	const int64_t INF = n + 1;
+	std::vector<int> id;
+	std::vector<int64_t> next_idx;
+	std::vector<int64_t> addr_of;
+	int D = compact(a, n, id, addr_of);
+	next_uses(id, D, INF, next_idx);
+
+	std::vector<int> st;		  // the stack, top first
+	std::vector<int> pos(D, -1);  // id -> depth, -1 if below max_size
+	std::vector<int64_t> nxt(D, INF); // id -> next use
+	std::vector<int64_t> hist(max_size + 1, 0);
+	st.reserve(max_size);
+
+	int L = 1;
+	while (L < max_size)
+		L <<= 1;
+	std::vector<int64_t> tree(2 * L, -1); // max next use per subtree of levels
+
+	auto set = [&](int j, int u) {
+		st[j] = u;
+		pos[u] = j;
+		int k = j + L;
+		tree[k] = nxt[u];
+		for (k >>= 1; k; k >>= 1)
+		{
+			int64_t m = std::max(tree[2 * k], tree[2 * k + 1]);
+			if (tree[k] == m)
+				break;
+			tree[k] = m;
+		}
+	};
+	// first level in [lo, hi) whose next use is > v, or hi
+	auto first_above = [&](int lo, int hi, int64_t v) {
+		if (lo >= hi)
+			return hi;
+		int k = lo + L;
+		// climb until a subtree right of lo holds a value > v
+		while (tree[k] <= v)
+		{
+			while (k & 1)
+				k >>= 1;
+			if (k == 0)
+				return hi;
+			k++;
+		}
+		while (k < L)
+			k = tree[2 * k] > v ? 2 * k : 2 * k + 1;
+		return std::min(k - L, hi);
+	};
+
+	for (int64_t i = 0; i < n; i++)
+	{
+		int u = id[i];
+		int d = pos[u];
+		nxt[u] = next_idx[i];
+		if (d != -1)
+			hist[d + 1]++;
+		else if ((int)st.size() < max_size)
+		{
+			d = st.size();
+			st.push_back(-1);
+		}
+		else
+			d = max_size;
+		if (max_size == 0)
+			continue;
+		int carry = st[0];
+		set(0, u);
+		if (carry == -1 || carry == u)
+			continue;
+		for (int j = first_above(1, d, nxt[carry]); j < d; j = first_above(j + 1, d, nxt[carry]))
+		{
+			int v = st[j];
+			set(j, carry);
+			carry = v;
+		}
+		if (d < max_size)
+			set(d, carry);
+		else
+			pos[carry] = -1;
+	}
+	hits[0] = 0;
+	for (int c = 1; c <= max_size; c++)
+		hits[c] = hits[c - 1] + hist[c];
+}
+
+// the bindings that take a trace, for int32 or int64 addresses
+template <class T>
+static void def_runs(py::module_ &m)
+{
+	m.def("min_run", [](void *_c, int64_t n, py::array_t<T, py::array::c_style> &a) {
+		belady_min *c = (belady_min *)_c;
+		c->multi_access(n, a);
+	}, py::call_guard<py::gil_scoped_release>());
+	// misses per window of `window` references (MIN is offline, so the
+	// windows come out of one run over the whole trace)
+	m.def("min_run_windows", [](void *_c, int64_t n, py::array_t<T, py::array::c_style> &a, int64_t window, py::array_t<int64_t> &miss) {
+		belady_min *c = (belady_min *)_c;
+		c->simulate(n, a.data(), window, miss.mutable_data());
+	}, py::call_guard<py::gil_scoped_release>());
+	m.def("opt_hits", [](int64_t n, py::array_t<T, py::array::c_style> &a, int max_size, py::array_t<int64_t> &hits) {
+		opt_hits(n, a.data(), max_size, hits.mutable_data());
+	}, py::call_guard<py::gil_scoped_release>());
+}
+
 PYBIND11_MODULE(_min, m)
 {
 	py::class_<belady_min>(m, "belady_min")
 		.def(py::init<int>(), py::arg("C"))
-		.def("multi_access", &belady_min::multi_access, py::arg("n"), py::arg("addrs"))
+		.def("multi_access", &belady_min::multi_access<int32_t>, py::call_guard<py::gil_scoped_release>(), py::arg("n"), py::arg("addrs"))
+		.def("multi_access", &belady_min::multi_access<int64_t>, py::call_guard<py::gil_scoped_release>(), py::arg("n"), py::arg("addrs"))
 		.def("contents", &belady_min::contents)
 		.def("hit_rate", &belady_min::hit_rate)
 		.def("data", &belady_min::data);
@@ -144,11 +364,9 @@ PYBIND11_MODULE(_min, m)
 	m.def("min_create", [](int C) {
 		return new belady_min(C);
 	});
-	m.def("min_run", [](void *_c, int n, py::array_t<int32_t> &a) {
-		belady_min *c = (belady_min *)_c;
-		c->multi_access(n, a);
-	});
-	m.def("min_contents", [](void *_c, py::array_t<int32_t> &out) {
+	def_runs<int32_t>(m);
+	def_runs<int64_t>(m);
+	m.def("min_contents", [](void *_c, py::array_t<int64_t> &out) {
 		belady_min *c = (belady_min *)_c;
 		return c->contents(out);
 	});
@@ -158,7 +376,7 @@ PYBIND11_MODULE(_min, m)
 	});
 	m.def("min_data", [](void *_c) -> py::tuple {
 		belady_min *c = (belady_min *)_c;
-		int _access, _miss, _cachefill;
+		int64_t _access, _miss, _cachefill;
 		c->data(_access, _miss, _cachefill);
 		return py::make_tuple(_access, _miss, _cachefill);
 	});
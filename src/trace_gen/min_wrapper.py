@@ -1,23 +1,49 @@
 import numpy as np
+from trace_gen.addrmap_wrapper import dense_trace
 import _min
 
 
 class belady_min:
-    def __init__(self, C):
+    def __init__(self, C, amap=None):
+        self.amap = amap
         self.C = C
         self.m = _min.min_create(C)
 
     def run(self, trace):
         if len(trace) == 0:
             return
-        if type(trace[0]) != np.int32:
+        if self.amap is not None:
+            trace = self.amap.map(trace)
+        if type(trace[0]) not in (np.int32, np.int64):
             trace = np.array(trace, dtype=np.int32)
         _min.min_run(self.m, len(trace), trace)
 
+    def run_windows(self, trace, window, snapshots=None):
+        # (accesses, misses) of every window of `window` references, from one
+        # offline run over the whole trace; MIN decides by the future, so
+        # there are no cache states to snapshot part way
+        if snapshots is not None:
+            raise ValueError("MIN has no mid-trace contents to snapshot")
+        window = int(window)
+        if window <= 0:
+            raise ValueError("window must be positive")
+        if self.amap is not None:
+            trace = self.amap.map(trace)
+        elif len(trace) and type(trace[0]) not in (np.int32, np.int64):
+            trace = np.array(trace, dtype=np.int32)
+        n = len(trace)
+        misses = np.zeros(-(-n // window), dtype=np.int64)
+        acc = np.full(len(misses), window, dtype=np.int64)
+        if n % window:
+            acc[-1] = n % window
+        if n:
+            _min.min_run_windows(self.m, n, trace, window, misses)
+        return acc, misses
+
     def contents(self):
-        val = np.zeros(self.C, dtype=np.int32)
+        val = np.zeros(self.C, dtype=np.int64)
         n = _min.min_contents(self.m, val)
-        return val[:n]
+        return val[:n] if self.amap is None else self.amap.unmap(val[:n])
 
     def data(self):
         return _min.min_data(self.m)
@@ -26,3 +52,14 @@ class belady_min:
         a, m, c = self.data()
         denom = (a - c) if (a - c) > 0 else a if a > 0 else 1
         return 1 - (m - self.C) / denom
+
+
+def opt_mrc(trace, max_size=None):
+    # exact MIN/OPT hit-ratio curve for cache sizes 1..max_size (default: #
+    # distinct addresses), in one priority-stack pass
+    trace = dense_trace(trace)
+    if max_size is None:
+        max_size = len(np.unique(trace))
+    hits = np.zeros(max_size + 1, dtype=np.int64)
+    _min.opt_hits(len(trace), trace, int(max_size), hits)
+    return hits[1:] / len(trace)
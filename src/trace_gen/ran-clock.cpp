@@ -8,6 +8,7 @@
 #include <pybind11/pybind11.h>
 #include <pybind11/stl.h>
 #include <pybind11/numpy.h>
+#include "sim_common.h"
 
 namespace py = pybind11;
 
@@ -15,23 +16,23 @@ class ran_clock
 {
 	int C = 0;
 	int K = 1;
-	std::vector<int> cache;
-	std::vector<int> t_enter;
+	std::vector<int64_t> cache;
+	std::vector<int64_t> t_enter;
 	std::vector<int> counter;
 	std::vector<char> map;
 
-	std::vector<int> enter; // time item entered cache
-	std::vector<int> ref;	// time item last referenced
+	std::vector<int64_t> enter; // time item entered cache
+	std::vector<int64_t> ref;	// time item last referenced
 	
-	int n_top = 0;
+	int64_t n_top = 0;
 	double sum_top = 0, sum_top2 = 0;
 	int in = 0, out = 0;
-	int n_cachefill = 0;
-	int n_access = 0;
-	int n_miss = 0;
-	int n_recycle = 0;
-	int n_examined = 0;
-	int sum_counter = 0;
+	int64_t n_cachefill = 0;
+	int64_t n_access = 0;
+	int64_t n_miss = 0;
+	int64_t n_recycle = 0;
+	int64_t n_examined = 0;
+	int64_t sum_counter = 0;
 
 	std::mt19937 rng;
 	int in_ptr = -1;
@@ -43,7 +44,7 @@ private:
 		return (in + 1) % (C + 1) == out;
 	}
 
-	int pop(void)
+	int64_t pop(void)
 	{
 		if (C == 0)
 			return -1;
@@ -52,7 +53,7 @@ private:
 		{
 			int offset = dist(rng);
 			int slot = (out + offset) % (C + 1);
-			int32_t addr = cache[slot];
+			int64_t addr = cache[slot];
 			n_examined++;
 			if (counter[addr] > 0)
 			{
@@ -62,9 +63,9 @@ private:
 			}
 			else
 			{
-				int age = (n_access - t_enter[slot]);
+				int64_t age = (n_access - t_enter[slot]);
 				sum_top += age;
-				sum_top2 += (age * age);
+				sum_top2 += 1.0 * age * age;
 				n_top++;
 				map[addr] = false;
 				in_ptr = slot;
@@ -73,7 +74,7 @@ private:
 		}
 	}
 
-	void push(int32_t addr)
+	void push(int64_t addr)
 	{
 		int slot = (in_ptr != -1) ? in_ptr : in;
 		cache[slot] = addr;
@@ -86,15 +87,15 @@ private:
 		counter[addr] = 0;
 	}
 
-	void access_common(int32_t addr, bool verbose,
-					   int32_t* evict_addr = nullptr, int* miss = nullptr,
-					   int* ref_age = nullptr, int* enter_age = nullptr,
+	void access_common(int64_t addr, bool verbose,
+					   int64_t* evict_addr = nullptr, int* miss = nullptr,
+					   int64_t* ref_age = nullptr, int64_t* enter_age = nullptr,
 					   int* examined = nullptr)
 	{
 		n_access++;
 		if (addr >= map.size())
 		{
-			int n = std::max(addr * 3 / 2, addr + 1);
+			int64_t n = std::max(addr * 3 / 2, addr + 1);
 			map.resize(n, 0);
 			counter.resize(n, 0);
 			if (verbose)
@@ -106,7 +107,7 @@ private:
 
 		if (verbose && addr >= enter.size())
 		{
-			int n = std::max(addr * 3 / 2, addr + 1);
+			int64_t n = std::max(addr * 3 / 2, addr + 1);
 			enter.resize(n, 0);
 			ref.resize(n, 0);
 		}
@@ -125,8 +126,8 @@ private:
 			}
 			else
 			{
-				int examined0 = n_examined;
-				int evictee = pop();
+				int64_t examined0 = n_examined;
+				int64_t evictee = pop();
 				if (examined)
 					*examined = n_examined - examined0;
 				if (evictee == -1)
@@ -135,7 +136,7 @@ private:
 				{
 					if (evictee >= enter.size())
 					{
-						int n = std::max(evictee * 3 / 2, evictee + 1);
+						int64_t n = std::max(evictee * 3 / 2, evictee + 1);
 						enter.resize(n, 0);
 						ref.resize(n, 0);
 					}
@@ -176,27 +177,28 @@ public:
 	}
 	~ran_clock() {}
 
-	void access(int32_t addr)
+	void access(int64_t addr)
 	{
 		access_common(addr, false);
 	}
 
-	void access_verbose(int32_t addr, int32_t* evict_addr, int* miss,
-						int* ref_age, int* enter_age, int* examined = nullptr)
+	void access_verbose(int64_t addr, int64_t* evict_addr, int* miss,
+						int64_t* ref_age, int64_t* enter_age, int* examined = nullptr)
 	{
 		access_common(addr, true, evict_addr, miss, ref_age, enter_age, examined);
 	}
 
-	void multi_access(int n, py::array_t< int32_t >& addrs)
+	template <class T>
+	void multi_access(int64_t n, py::array_t<T, py::array::c_style>& addrs)
 	{
-		int32_t* addrs_ptr = addrs.mutable_data();
-		for (int i = 0; i < n; i++)
+		const T* addrs_ptr = addrs.data();
+		for (int64_t i = 0; i < n; i++)
 			access(addrs_ptr[i]);
 	}
 
-	void queue_stats(py::array_t< int >& n, py::array_t<double>& sum, py::array_t<double>& sum2)
+	void queue_stats(py::array_t< int64_t >& n, py::array_t<double>& sum, py::array_t<double>& sum2)
 	{
-		int* n_ptr = n.mutable_data();
+		int64_t* n_ptr = n.mutable_data();
 		double* sum_ptr = sum.mutable_data();
 		double* sum2_ptr = sum2.mutable_data();
 		*n_ptr = n_top;
@@ -204,20 +206,21 @@ public:
 		*sum2_ptr = sum_top2;
 	}
 
-	void multi_access_age(int n, py::array_t< int32_t >& addrs, py::array_t< int >& evicted, py::array_t< int >& misses,
-						  py::array_t< int >& age1, py::array_t< int >& age2, py::array_t< int >& examined)
+	template <class T>
+	void multi_access_age(int64_t n, py::array_t<T, py::array::c_style>& addrs, py::array_t< int64_t >& evicted, py::array_t< int >& misses,
+						  py::array_t< int64_t >& age1, py::array_t< int64_t >& age2, py::array_t< int >& examined)
 	{
-		int32_t* addrs_ptr = addrs.mutable_data();
-		int* evicted_ptr = evicted.mutable_data();
+		const T* addrs_ptr = addrs.data();
+		int64_t* evicted_ptr = evicted.mutable_data();
 		int* misses_ptr = misses.mutable_data();
-		int* age1_ptr = age1.mutable_data();
-		int* age2_ptr = age2.mutable_data();
+		int64_t* age1_ptr = age1.mutable_data();
+		int64_t* age2_ptr = age2.mutable_data();
 		int* examined_ptr = examined.mutable_data();
 
 		enter.resize(100000);
 		ref.resize(100000);
 		
-		for (int i = 0; i < n; i++)
+		for (int64_t i = 0; i < n; i++)
 		{
 			examined_ptr[i] = 0;
 			access_verbose(addrs_ptr[i], &evicted_ptr[i], &misses_ptr[i], &age1_ptr[i], &age2_ptr[i], &examined_ptr[i]);
@@ -230,9 +233,9 @@ public:
 		return 1 - miss_rate;
 	}
 
-	int contents(py::array_t< int >& val)
+	int contents(py::array_t< int64_t >& val)
 	{
-		int* val_ptr = val.mutable_data();
+		int64_t* val_ptr = val.mutable_data();
 		int i, n;
 		for (i = (in + C) % (C + 1), n = 0;; i = (i + C) % (C + 1))
 		{
@@ -243,8 +246,8 @@ public:
 		return n;
 	}
 
-	void data(int &_access, int &_miss, int &_cachefill, int &_recycle,
-			  int &_examined, int &_sum_counter)
+	void data(int64_t &_access, int64_t &_miss, int64_t &_cachefill, int64_t &_recycle,
+			  int64_t &_examined, int64_t &_sum_counter)
 	{
 		_access = n_access;
 		_miss = n_miss;
@@ -255,32 +258,49 @@ public:
 	}
 };
 
+// the bindings that take a trace, for int32 or int64 addresses
+template <class T>
+static void def_runs(py::module_& m)
+{
+	m.def("ran_clock_run", [](void* _c, int64_t n, py::array_t<T, py::array::c_style>& a) {
+		ran_clock* c = (ran_clock *)_c;
+		c->multi_access(n, a);
+	}, py::call_guard<py::gil_scoped_release>(), py::arg("handle"), py::arg("n"), py::arg("addrs"));
+	// cumulative (accesses, misses) at window ends, see run_windows()
+	m.def("ran_clock_run_windows", [](void* _c, int64_t n, py::array_t<T, py::array::c_style>& a, int64_t first, int64_t window,
+								  py::array_t<int64_t>& acc, py::array_t<int64_t>& miss) {
+		ran_clock* c = (ran_clock*)_c;
+		return run_windows(*c, a.data(), n, first, window, acc.mutable_data(), miss.mutable_data(),
+						   [](ran_clock& c, int64_t& _a, int64_t& _m) { int64_t x[4]; c.data(_a, _m, x[0], x[1], x[2], x[3]); });
+	}, py::call_guard<py::gil_scoped_release>());
+	m.def("ran_clock_run_age", [](void* _c, int64_t n, py::array_t<T, py::array::c_style>& a, py::array_t< int64_t >& b, py::array_t< int >& c, py::array_t< int64_t >& d, py::array_t< int64_t >& e, py::array_t< int >& f) {
+		ran_clock* cl = (ran_clock *)_c;
+		cl->multi_access_age(n, a, b, c, d, e, f);
+	}, py::call_guard<py::gil_scoped_release>(), py::arg("handle"), py::arg("n"), py::arg("addrs"), py::arg("evicted"), py::arg("misses"), py::arg("age1"), py::arg("age2"), py::arg("examined"));
+}
+
 PYBIND11_MODULE(_ran_clock, m)
 {
 	py::class_<ran_clock>(m, "ran_clock")
 		.def(py::init<int, int, uint32_t>(), py::arg("C"), py::arg("K") = 1, py::arg("seed") = 0)
-		.def("multi_access", &ran_clock::multi_access, py::arg("n"), py::arg("addrs"))
+		.def("multi_access", &ran_clock::multi_access<int32_t>, py::call_guard<py::gil_scoped_release>(), py::arg("n"), py::arg("addrs"))
+		.def("multi_access", &ran_clock::multi_access<int64_t>, py::call_guard<py::gil_scoped_release>(), py::arg("n"), py::arg("addrs"))
 		.def("contents", &ran_clock::contents)
-		.def("multi_access_age", &ran_clock::multi_access_age, py::arg("n"), py::arg("addrs"), py::arg("evicted"), py::arg("misses"), py::arg("age1"), py::arg("age2"), py::arg("examined"))
+		.def("multi_access_age", &ran_clock::multi_access_age<int32_t>, py::call_guard<py::gil_scoped_release>(), py::arg("n"), py::arg("addrs"), py::arg("evicted"), py::arg("misses"), py::arg("age1"), py::arg("age2"), py::arg("examined"))
+		.def("multi_access_age", &ran_clock::multi_access_age<int64_t>, py::call_guard<py::gil_scoped_release>(), py::arg("n"), py::arg("addrs"), py::arg("evicted"), py::arg("misses"), py::arg("age1"), py::arg("age2"), py::arg("examined"))
 		.def("queue_stats", &ran_clock::queue_stats)
 		.def("hit_rate", &ran_clock::hit_rate)
 		.def("data", &ran_clock::data);
 	m.def("ran_clock_create", [](int C, int K, uint32_t seed) {
 		return new ran_clock(C, K, seed);
 	}, py::arg("C"), py::arg("K") = 1, py::arg("seed") = 0);
-	m.def("ran_clock_run", [](void* _c, int n, py::array_t< int32_t >& a) {
-		ran_clock* c = (ran_clock *)_c;
-		c->multi_access(n, a);
-	}, py::arg("handle"), py::arg("n"), py::arg("addrs"));
-	m.def("ran_clock_contents", [](void* _c, py::array_t< int >& out) {
+	def_runs<int32_t>(m);
+	def_runs<int64_t>(m);
+	m.def("ran_clock_contents", [](void* _c, py::array_t< int64_t >& out) {
 		ran_clock* c = (ran_clock *)_c;
 		return c->contents(out);
 	});
-	m.def("ran_clock_run_age", [](void* _c, int n, py::array_t< int32_t >& a, py::array_t< int >& b, py::array_t< int >& c, py::array_t< int >& d, py::array_t< int >& e, py::array_t< int >& f) {
-		ran_clock* cl = (ran_clock *)_c;
-		cl->multi_access_age(n, a, b, c, d, e, f);
-	}, py::arg("handle"), py::arg("n"), py::arg("addrs"), py::arg("evicted"), py::arg("misses"), py::arg("age1"), py::arg("age2"), py::arg("examined"));
-	m.def("ran_clock_queue_stats", [](void* _c, py::array_t< int >& n, py::array_t< double >& sum, py::array_t< double >& sum2) {
+	m.def("ran_clock_queue_stats", [](void* _c, py::array_t< int64_t >& n, py::array_t< double >& sum, py::array_t< double >& sum2) {
 		ran_clock* c = (ran_clock *)_c;
 		c->queue_stats(n, sum, sum2);
 	});
@@ -290,7 +310,7 @@ PYBIND11_MODULE(_ran_clock, m)
 	});
 	m.def("ran_clock_data", [](void* _c) -> py::tuple {
 		ran_clock* cl = (ran_clock *)_c;
-		int _access, _miss, _cachefill, _recycle, _examined, _sum_counter;
+		int64_t _access, _miss, _cachefill, _recycle, _examined, _sum_counter;
 		cl->data(_access, _miss, _cachefill, _recycle, _examined, _sum_counter);
 		return py::make_tuple(_access, _miss, _cachefill, _recycle, _examined, _sum_counter);		
 	});
@@ -6,6 +6,7 @@
 #include <pybind11/pybind11.h>
 #include <pybind11/stl.h>
 #include <pybind11/numpy.h>
+#include "sim_common.h"
 
 namespace py = pybind11;
 
@@ -13,28 +14,28 @@ class ran_sieve
 {
 	int C = 0;
 	int K = 1;
-	std::vector<int> cache;
+	std::vector<int64_t> cache;
 	std::vector<char> map;		  
 	std::vector<int> counter;	   
-	std::vector<int> t_enter;   
-	std::vector<int> t_ref;	   
-	int n_top = 0;
+	std::vector<int64_t> t_enter;   
+	std::vector<int64_t> t_ref;	   
+	int64_t n_top = 0;
 	double sum_top = 0, sum_top2 = 0;
 
-	int n_cachefill = 0;
-	int n_access = 0;
-	int n_miss = 0;
-	int n_recycle = 0;
-	int n_examined = 0;
-	int sum_counter = 0;
+	int64_t n_cachefill = 0;
+	int64_t n_access = 0;
+	int64_t n_miss = 0;
+	int64_t n_recycle = 0;
+	int64_t n_examined = 0;
+	int64_t sum_counter = 0;
 
 	std::mt19937 rng;
 
-	void expand(int32_t addr)
+	void expand(int64_t addr)
 	{
-		if (addr >= static_cast<int32_t>(map.size()))
+		if (addr >= static_cast<int64_t>(map.size()))
 		{
-			int n = addr * 3 / 2 + 1;
+			int64_t n = addr * 3 / 2 + 1;
 			map.resize(n, 0);
 			counter.resize(n, 0);
 			t_enter.resize(n, 0);
@@ -47,7 +48,7 @@ class ran_sieve
 		return static_cast<int>(cache.size()) == C;
 	}
 
-	int pop(int* ref_age = nullptr, int* ent_age = nullptr)
+	int64_t pop(int64_t* ref_age = nullptr, int64_t* ent_age = nullptr)
 	{
 		if (cache.empty())
 			return -1;
@@ -56,7 +57,7 @@ class ran_sieve
 		while (true)
 		{
 			int idx = dist(rng);
-			int addr = cache[idx];
+			int64_t addr = cache[idx];
 			n_examined++;
 			if (counter[addr] > 0)
 			{
@@ -66,10 +67,10 @@ class ran_sieve
 			}
 			else
 			{
-				int r_age = n_access - t_ref[addr];
-				int e_age = n_access - t_enter[addr];
+				int64_t r_age = n_access - t_ref[addr];
+				int64_t e_age = n_access - t_enter[addr];
 				sum_top += e_age;
-				sum_top2 += (e_age * e_age);
+				sum_top2 += 1.0 * e_age * e_age;
 				n_top++;
 				map[addr] = 0;
 				counter[addr] = 0;
@@ -84,7 +85,7 @@ class ran_sieve
 		}
 	}
 
-	void push(int addr)
+	void push(int64_t addr)
 	{
 		cache.push_back(addr);
 		map[addr] = 1;
@@ -103,16 +104,16 @@ public:
 	}
 	~ran_sieve() {}
 
-	int contents(py::array_t< int >& val)
+	int contents(py::array_t< int64_t >& val)
 	{
-		int* val_ptr = val.mutable_data();
+		int64_t* val_ptr = val.mutable_data();
 		int n = 0;
-		for (int addr : cache)
+		for (int64_t addr : cache)
 			val_ptr[n++] = addr;
 		return n;
 	}
 
-	void access(int32_t addr)
+	void access(int64_t addr)
 	{
 		n_access++;
 		expand(addr);
@@ -127,7 +128,7 @@ public:
 			}
 			else
 			{
-				int evictee = pop();
+				int64_t evictee = pop();
 				(void)evictee;
 				push(addr);
 			}
@@ -140,8 +141,8 @@ public:
 		}
 	}
 
-	void access_verbose(int32_t addr, int32_t* evict_addr, int* miss,
-						int* ref_age, int* enter_age)
+	void access_verbose(int64_t addr, int64_t* evict_addr, int* miss,
+						int64_t* ref_age, int64_t* enter_age)
 	{
 		if (evict_addr)
 			*evict_addr = -1;
@@ -165,8 +166,8 @@ public:
 			}
 			else
 			{
-				int r_age = 0, e_age = 0;
-				int evictee = pop(&r_age, &e_age);
+				int64_t r_age = 0, e_age = 0;
+				int64_t evictee = pop(&r_age, &e_age);
 				if (evictee == -1)
 					return;
 				if (miss)
@@ -188,16 +189,17 @@ public:
 		}
 	}
 
-	void multi_access(int n, py::array_t< int32_t >& addrs)
+	template <class T>
+	void multi_access(int64_t n, py::array_t<T, py::array::c_style>& addrs)
 	{
-		int32_t* addrs_ptr = addrs.mutable_data();
-		for (int i = 0; i < n; i++)
+		const T* addrs_ptr = addrs.data();
+		for (int64_t i = 0; i < n; i++)
 			access(addrs_ptr[i]);
 	}
 
-	void queue_stats(py::array_t< int >& n, py::array_t<double>& sum, py::array_t<double>& sum2)
+	void queue_stats(py::array_t< int64_t >& n, py::array_t<double>& sum, py::array_t<double>& sum2)
 	{
-		int* n_ptr = n.mutable_data();
+		int64_t* n_ptr = n.mutable_data();
 		double* sum_ptr = sum.mutable_data();
 		double* sum2_ptr = sum2.mutable_data();
 		*n_ptr = n_top;
@@ -205,16 +207,17 @@ public:
 		*sum2_ptr = sum_top2;
 	}
 
-	void multi_access_age(int n, py::array_t< int32_t >& addrs, py::array_t< int >& evicted, py::array_t< int >& misses,
-						  py::array_t< int >& age1, py::array_t< int >& age2)
+	template <class T>
+	void multi_access_age(int64_t n, py::array_t<T, py::array::c_style>& addrs, py::array_t< int64_t >& evicted, py::array_t< int >& misses,
+						  py::array_t< int64_t >& age1, py::array_t< int64_t >& age2)
 	{
-		int32_t* addrs_ptr = addrs.mutable_data();
-		int* evicted_ptr = evicted.mutable_data();
+		const T* addrs_ptr = addrs.data();
+		int64_t* evicted_ptr = evicted.mutable_data();
 		int* misses_ptr = misses.mutable_data();
-		int* age1_ptr = age1.mutable_data();
-		int* age2_ptr = age2.mutable_data();
+		int64_t* age1_ptr = age1.mutable_data();
+		int64_t* age2_ptr = age2.mutable_data();
 
-		for (int i = 0; i < n; i++)
+		for (int64_t i = 0; i < n; i++)
 			access_verbose(addrs_ptr[i], &evicted_ptr[i], &misses_ptr[i], &age1_ptr[i], &age2_ptr[i]);
 	}
 
@@ -224,8 +227,8 @@ public:
 		return 1 - miss_rate;
 	}
 
-	void data(int &_access, int &_miss, int &_cachefill, int &_recycle,
-			  int &_examined, int &_sum_counter)
+	void data(int64_t &_access, int64_t &_miss, int64_t &_cachefill, int64_t &_recycle,
+			  int64_t &_examined, int64_t &_sum_counter)
 	{
 		_access = n_access;
 		_miss = n_miss;
@@ -236,32 +239,49 @@ public:
 	}
 };
 
+// the bindings that take a trace, for int32 or int64 addresses
+template <class T>
+static void def_runs(py::module_& m)
+{
+	m.def("ran_sieve_run", [](void* _c, int64_t n, py::array_t<T, py::array::c_style>& a) {
+		ran_sieve* c = (ran_sieve *)_c;
+		c->multi_access(n, a);
+	}, py::call_guard<py::gil_scoped_release>());
+	// cumulative (accesses, misses) at window ends, see run_windows()
+	m.def("ran_sieve_run_windows", [](void* _c, int64_t n, py::array_t<T, py::array::c_style>& a, int64_t first, int64_t window,
+								  py::array_t<int64_t>& acc, py::array_t<int64_t>& miss) {
+		ran_sieve* c = (ran_sieve*)_c;
+		return run_windows(*c, a.data(), n, first, window, acc.mutable_data(), miss.mutable_data(),
+						   [](ran_sieve& c, int64_t& _a, int64_t& _m) { int64_t x[4]; c.data(_a, _m, x[0], x[1], x[2], x[3]); });
+	}, py::call_guard<py::gil_scoped_release>());
+	m.def("ran_sieve_run_age", [](void* _c, int64_t n, py::array_t<T, py::array::c_style>& a, py::array_t< int64_t >& b, py::array_t< int >& c, py::array_t< int64_t >& d, py::array_t< int64_t >& e) {
+		ran_sieve* cl = (ran_sieve *)_c;
+		cl->multi_access_age(n, a, b, c, d, e);
+	}, py::call_guard<py::gil_scoped_release>());
+}
+
 PYBIND11_MODULE(_ran_sieve, m)
 {
 	py::class_<ran_sieve>(m, "ran_sieve")
 		.def(py::init<int, int, uint32_t>(), py::arg("C"), py::arg("K") = 1, py::arg("seed") = 0)
-		.def("multi_access", &ran_sieve::multi_access)
+		.def("multi_access", &ran_sieve::multi_access<int32_t>, py::call_guard<py::gil_scoped_release>())
+		.def("multi_access", &ran_sieve::multi_access<int64_t>, py::call_guard<py::gil_scoped_release>())
 		.def("contents", &ran_sieve::contents)
-		.def("multi_access_age", &ran_sieve::multi_access_age)
+		.def("multi_access_age", &ran_sieve::multi_access_age<int32_t>, py::call_guard<py::gil_scoped_release>())
+		.def("multi_access_age", &ran_sieve::multi_access_age<int64_t>, py::call_guard<py::gil_scoped_release>())
 		.def("queue_stats", &ran_sieve::queue_stats)
 		.def("hit_rate", &ran_sieve::hit_rate)
 		.def("data", &ran_sieve::data);
 	m.def("ran_sieve_create", [](int C, int K, uint32_t seed) {
 		return new ran_sieve(C, K, seed);
 	}, py::arg("C"), py::arg("K") = 1, py::arg("seed") = 0);
-	m.def("ran_sieve_run", [](void* _c, int n, py::array_t< int32_t >& a) {
-		ran_sieve* c = (ran_sieve *)_c;
-		c->multi_access(n, a);
-	});
-	m.def("ran_sieve_contents", [](void* _c, py::array_t< int >& out) {
+	def_runs<int32_t>(m);
+	def_runs<int64_t>(m);
+	m.def("ran_sieve_contents", [](void* _c, py::array_t< int64_t >& out) {
 		ran_sieve* c = (ran_sieve *)_c;
 		return c->contents(out);
 	});
-	m.def("ran_sieve_run_age", [](void* _c, int n, py::array_t< int32_t >& a, py::array_t< int >& b, py::array_t< int >& c, py::array_t< int >& d, py::array_t< int >& e) {
-		ran_sieve* cl = (ran_sieve *)_c;
-		cl->multi_access_age(n, a, b, c, d, e);
-	});
-	m.def("ran_sieve_queue_stats", [](void* _c, py::array_t< int >& n, py::array_t< double >& sum, py::array_t< double >& sum2) {
+	m.def("ran_sieve_queue_stats", [](void* _c, py::array_t< int64_t >& n, py::array_t< double >& sum, py::array_t< double >& sum2) {
 		ran_sieve* c = (ran_sieve *)_c;
 		c->queue_stats(n, sum, sum2);
 	});
@@ -271,7 +291,7 @@ PYBIND11_MODULE(_ran_sieve, m)
 	});
 	m.def("ran_sieve_data", [](void* _c) -> py::tuple {
 		ran_sieve* cl = (ran_sieve *)_c;
-		int _access, _miss, _cachefill, _recycle, _examined, _sum_counter;
+		int64_t _access, _miss, _cachefill, _recycle, _examined, _sum_counter;
 		cl->data(_access, _miss, _cachefill, _recycle, _examined, _sum_counter);
 		return py::make_tuple(_access, _miss, _cachefill, _recycle, _examined, _sum_counter);
 	});
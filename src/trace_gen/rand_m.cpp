@@ -8,6 +8,7 @@
 #include <pybind11/numpy.h>
 #include <pybind11/pybind11.h>
 #include <pybind11/stl.h>
+#include "sim_common.h"
 
 namespace py = pybind11;
 
@@ -18,28 +19,24 @@ class rand_m
 	std::vector<int> heads;
 
 	int total_m = 0;
-	std::vector<int32_t> cells; // physical slots, -1 means empty
+	std::vector<int64_t> cells; // physical slots, -1 means empty
 	std::vector<int> loc;		// addr -> physical slot index in `cells` (or -1)
 
 	int len = 0;
-	int n_access = 0;
-	int n_miss = 0;
-	int fill_access = 0;
-	int fill_miss = 0;
+	int64_t n_access = 0;
+	int64_t n_miss = 0;
+	int64_t fill_access = 0;
+	int64_t fill_miss = 0;
 
-	static std::mt19937_64& rng()
-	{
-		static std::mt19937_64 rng(std::random_device{}());
-		return rng;
-	}
+	std::mt19937_64 rng; // per-instance stream; seed 0 means nondeterministic
 
-	void expand(int32_t addr)
+	void expand(int64_t addr)
 	{
 		if (addr < 0)
 			throw std::invalid_argument("Address must be non-negative");
-		if (addr >= (int32_t)loc.size())
+		if (addr >= (int64_t)loc.size())
 		{
-			int n = addr * 3 / 2 + 1;
+			int64_t n = addr * 3 / 2 + 1;
 			loc.resize(n, -1);
 		}
 	}
@@ -71,12 +68,12 @@ class rand_m
 	int rand_pos(int list)
 	{
 		std::uniform_int_distribution<int> dist(0, list_sizes[list] - 1);
-		return dist(rng());
+		return dist(rng);
 	}
 
 public:
-	rand_m(std::vector<int> m)
-		: list_sizes(std::move(m))
+	rand_m(std::vector<int> m, uint64_t seed = 0)
+		: list_sizes(std::move(m)), rng(seed ? seed : std::random_device{}())
 	{
 		if (list_sizes.empty())
 			throw std::invalid_argument("m must have at least one list size");
@@ -96,7 +93,7 @@ public:
 		loc.assign(100000, -1);
 	}
 
-	void access(int32_t addr)
+	void access(int64_t addr)
 	{
 		n_access++;
 		if (len < total_m)
@@ -112,7 +109,7 @@ public:
 
 			int rp = rand_pos(0);
 			int target = phys_slot(0, rp);
-			int32_t evicted = cells[target];
+			int64_t evicted = cells[target];
 			if (evicted != -1)
 			{
 				loc[evicted] = -1;
@@ -131,7 +128,7 @@ public:
 
 		int rp = rand_pos(list + 1);
 		int target = phys_slot(list + 1, rp);
-		int32_t displaced = cells[target];
+		int64_t displaced = cells[target];
 
 		cells[target] = addr;
 		loc[addr] = target;
@@ -141,23 +138,24 @@ public:
 			loc[displaced] = slot;
 	}
 
-	void multi_access(int n, py::array_t<int32_t>& addrs)
+	template <class T>
+	void multi_access(int64_t n, py::array_t<T, py::array::c_style>& addrs)
 	{
-		int32_t* addrs_ptr = addrs.mutable_data();
-		for (int i = 0; i < n; i++)
+		const T* addrs_ptr = addrs.data();
+		for (int64_t i = 0; i < n; i++)
 			access(addrs_ptr[i]);
 	}
 
-	int contents(py::array_t<int32_t>& out)
+	int contents(py::array_t<int64_t>& out)
 	{
-		int32_t* out_ptr = out.mutable_data();
+		int64_t* out_ptr = out.mutable_data();
 		int n = 0;
 		for (size_t li = 0; li < list_sizes.size(); li++)
 		{
 			for (int p = 0; p < list_sizes[li]; p++)
 			{
 				int slot = phys_slot((int)li, p);
-				int32_t v = cells[slot];
+				int64_t v = cells[slot];
 				if (v != -1)
 					out_ptr[n++] = v;
 			}
@@ -168,12 +166,12 @@ public:
 	double hit_rate() const
 	{
 		if (n_access <= fill_access)
-			return 1.0 - (n_miss * 1.0 / std::max(1, n_access));
+			return 1.0 - (n_miss * 1.0 / std::max<int64_t>(1, n_access));
 		double miss_rate = (n_miss - fill_miss) * 1.0 / (n_access - fill_access);
 		return 1.0 - miss_rate;
 	}
 
-	void data(int& _access, int& _miss, int& _fill_access, int& _fill_miss) const
+	void data(int64_t& _access, int64_t& _miss, int64_t& _fill_access, int64_t& _fill_miss) const
 	{
 		_access = n_access;
 		_miss = n_miss;
@@ -184,27 +182,63 @@ public:
 	int cache_size() const { return total_m; }
 };
 
+// the bindings that take a trace, for int32 or int64 addresses
+template <class T>
+static void def_runs(py::module_& m)
+{
+	m.def("rand_m_run", [](void* _r, int64_t n, py::array_t<T, py::array::c_style>& a) {
+		rand_m* r = (rand_m*)_r;
+		r->multi_access(n, a);
+	}, py::call_guard<py::gil_scoped_release>());
+	// cumulative (accesses, misses) at window ends, see run_windows()
+	m.def("rand_m_run_windows", [](void* _r, int64_t n, py::array_t<T, py::array::c_style>& a, int64_t first, int64_t window,
+								  py::array_t<int64_t>& acc, py::array_t<int64_t>& miss) {
+		rand_m* r = (rand_m*)_r;
+		return run_windows(*r, a.data(), n, first, window, acc.mutable_data(), miss.mutable_data(),
+						   [](rand_m& c, int64_t& _a, int64_t& _m) { int64_t x[2]; c.data(_a, _m, x[0], x[1]); });
+	}, py::call_guard<py::gil_scoped_release>());
+
+	// raw hit rate of one rand_m per size, all run in a single tiled pass
+	m.def("rand_m_mrc", [](int64_t n, py::array_t<T, py::array::c_style>& addrs, std::vector<std::vector<int>> ms, uint64_t seed, int threads) {
+		std::vector<std::unique_ptr<rand_m>> caches;
+		for (auto& m : ms)
+			caches.emplace_back(new rand_m(m, seed));
+		{
+			py::gil_scoped_release release;
+			run_tiled(caches, addrs.data(), n, threads);
+		}
+		py::array_t<double> hr(caches.size());
+		double* hr_ptr = hr.mutable_data();
+		for (size_t j = 0; j < caches.size(); j++)
+		{
+			int64_t a, m, fa, fm;
+			caches[j]->data(a, m, fa, fm);
+			hr_ptr[j] = a ? 1 - (double)m / a : 0;
+		}
+		return hr;
+	}, py::arg("n"), py::arg("addrs"), py::arg("ms"), py::arg("seed") = 0, py::arg("threads") = 1);
+}
+
 PYBIND11_MODULE(_rand_m, m)
 {
 	py::class_<rand_m>(m, "rand_m")
-		.def(py::init<std::vector<int>>(),
-			 py::arg("m"))
-		.def("multi_access", &rand_m::multi_access)
+		.def(py::init<std::vector<int>, uint64_t>(),
+			 py::arg("m"), py::arg("seed") = 0)
+		.def("multi_access", &rand_m::multi_access<int32_t>, py::call_guard<py::gil_scoped_release>())
+		.def("multi_access", &rand_m::multi_access<int64_t>, py::call_guard<py::gil_scoped_release>())
 		.def("contents", &rand_m::contents)
 		.def("hit_rate", &rand_m::hit_rate)
 		.def("cache_size", &rand_m::cache_size);
 
-	m.def("rand_m_create", [](std::vector<int> m) {
-		return new rand_m(std::move(m));
+	m.def("rand_m_create", [](std::vector<int> m, uint64_t seed) {
+		return new rand_m(std::move(m), seed);
 	},
-		  py::arg("m"));
+		  py::arg("m"), py::arg("seed") = 0);
 
-	m.def("rand_m_run", [](void* _r, int n, py::array_t<int32_t>& a) {
-		rand_m* r = (rand_m*)_r;
-		r->multi_access(n, a);
-	});
+	def_runs<int32_t>(m);
+	def_runs<int64_t>(m);
 
-	m.def("rand_m_contents", [](void* _r, py::array_t<int32_t>& out) {
+	m.def("rand_m_contents", [](void* _r, py::array_t<int64_t>& out) {
 		rand_m* r = (rand_m*)_r;
 		return r->contents(out);
 	});
@@ -217,8 +251,8 @@ PYBIND11_MODULE(_rand_m, m)
 	m.def("rand_m_data", [](py::object _r) -> py::tuple {
 		if (py::isinstance<rand_m>(_r))
 		{
-			rand_m r = _r.cast<rand_m>();
-			int a, m, fa, fm;
+			rand_m& r = _r.cast<rand_m&>();
+			int64_t a, m, fa, fm;
 			r.data(a, m, fa, fm);
 			return py::make_tuple(a, m, fa, fm);
 		}
@@ -1,23 +1,36 @@
 import numpy as np
+from trace_gen.addrmap_wrapper import dense_trace
+from trace_gen import windows
 import _rand_m
 
 
 class rand_m:
-    def __init__(self, m):
+    def __init__(self, m, seed=None, amap=None):
+        self.amap = amap
         m = list(m)
         self.m = m
         self.C = int(sum(m))
-        self.r = _rand_m.rand_m_create(m)
+        if seed is None:
+            self.r = _rand_m.rand_m_create(m)
+        else:
+            self.r = _rand_m.rand_m_create(m, np.uint64(seed))
 
     def run(self, trace):
-        if type(trace[0]) != np.int32:
+        if self.amap is not None:
+            trace = self.amap.map(trace)
+        if type(trace[0]) not in (np.int32, np.int64):
             trace = np.array(trace, dtype=np.int32)
         _rand_m.rand_m_run(self.r, len(trace), trace)
 
+    def run_windows(self, trace, window, snapshots=None):
+        # (accesses, misses) of every window of trace in one native call,
+        # plus contents() after each of the snapshots offsets if given
+        return windows.run_windows(self, _rand_m.rand_m_run_windows, self.r, trace, window, snapshots)
+
     def contents(self):
-        val = np.zeros(self.C, dtype=np.int32)
+        val = np.zeros(self.C, dtype=np.int64)
         n = _rand_m.rand_m_contents(self.r, val)
-        return val[:n]
+        return val[:n] if self.amap is None else self.amap.unmap(val[:n])
 
     def hitrate(self):
         return _rand_m.rand_m_hitrate(self.r)
@@ -25,3 +38,10 @@ class rand_m:
     def data(self) -> tuple:
         # returns (accesses, misses, fill_accesses, fill_misses)
         return _rand_m.rand_m_data(self.r)
+
+
+def rand_m_mrc(trace, ms, seed=None, threads=1):
+    # raw hit rate of a RAND(m) cache for each list-size vector m in ms,
+    # in one tiled native pass
+    trace = dense_trace(trace)
+    return _rand_m.rand_m_mrc(len(trace), trace, [list(m) for m in ms], np.uint64(seed or 0), threads)
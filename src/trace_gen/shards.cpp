@@ -0,0 +1,113 @@
+#include <stdint.h>
+#include <algorithm>
+#include <unordered_set>
+#include <utility>
+#include <vector>
+#include <pybind11/pybind11.h>
+#include <pybind11/stl.h>
+#include <pybind11/numpy.h>
+
+namespace py = pybind11;
+
+/*
+  SHARDS spatially-hashed sampling (Waldspurger et al., FAST '15).
+
+  An address a is sampled iff hash(a) mod P < T, so every reference to a
+  sampled address is kept and the sample rate is R = T/P. P is a power of 2
+  and the hash is MurmurHash3's 64-bit finalizer.
+
+  Fixed-rate: the caller picks T = round(R * P).
+  Fixed-size: threshold() streams the trace keeping the s_max distinct
+  addresses with the smallest hashes (a max-heap on hash), and returns the
+  T that admits exactly those; filtering with it bounds the sampled
+  footprint to ~s_max whatever the trace size.
+ */
+
+class shards
+{
+	typedef std::pair<uint32_t, int32_t> entry; // (hash, addr)
+
+	uint64_t seed;
+	std::vector<entry> heap;		  // max-heap of the smallest hashes
+	std::unordered_set<int32_t> kept; // addresses in heap
+	size_t s_max = 0;
+
+public:
+	static const uint32_t P = 1 << 24;
+
+	shards(uint64_t _seed = 0) : seed(_seed) {}
+	~shards() {}
+
+	uint32_t hash(int32_t addr)
+	{
+		uint64_t k = (uint64_t)(uint32_t)addr ^ seed;
+		k ^= k >> 33;
+		k *= 0xff51afd7ed558ccdULL;
+		k ^= k >> 33;
+		k *= 0xc4ceb9fe1a85ec53ULL;
+		k ^= k >> 33;
+		return k & (P - 1);
+	}
+
+	// copy the references with hash < T to out; returns # kept
+	int filter(int n, py::array_t<int32_t, py::array::c_style>& addrs, uint32_t T, py::array_t<int32_t>& out)
+	{
+		const int32_t* addrs_ptr = addrs.data();
+		int32_t* out_ptr = out.mutable_data();
+		int j = 0;
+		for (int i = 0; i < n; i++)
+			if (hash(addrs_ptr[i]) < T)
+				out_ptr[j++] = addrs_ptr[i];
+		return j;
+	}
+
+	// feed n references to the fixed-size sampler; returns its threshold
+	uint32_t threshold(int n, py::array_t<int32_t, py::array::c_style>& addrs, int _s_max)
+	{
+		const int32_t* addrs_ptr = addrs.data();
+		if (s_max != (size_t)_s_max)
+		{
+			heap.clear();
+			kept.clear();
+			s_max = _s_max;
+		}
+		for (int i = 0; i < n; i++)
+		{
+			int32_t a = addrs_ptr[i];
+			uint32_t h = hash(a);
+			if (heap.size() >= s_max && h >= heap[0].first)
+				continue;
+			if (!kept.insert(a).second)
+				continue;
+			heap.push_back({h, a});
+			std::push_heap(heap.begin(), heap.end());
+			if (heap.size() > s_max)
+			{
+				kept.erase(heap[0].second);
+				std::pop_heap(heap.begin(), heap.end());
+				heap.pop_back();
+			}
+		}
+		return heap.size() < s_max ? P : heap[0].first + 1;
+	}
+};
+
+PYBIND11_MODULE(_shards, m)
+{
+	py::class_<shards>(m, "shards")
+		.def(py::init<uint64_t>(), py::arg("seed") = 0)
+		.def("filter", &shards::filter)
+		.def("threshold", &shards::threshold);
+	m.attr("P") = shards::P;
+	m.def("shards_create", [](uint64_t seed) {
+		return new shards(seed);
+	}, py::arg("seed") = 0);
+	m.def("shards_filter", [](void* _s, int n, py::array_t<int32_t, py::array::c_style>& addrs, uint32_t T, py::array_t<int32_t>& out) {
+		shards* s = (shards *)_s;
+		return s->filter(n, addrs, T, out);
+	}, py::call_guard<py::gil_scoped_release>());
+	m.def("shards_threshold", [](void* _s, int n, py::array_t<int32_t, py::array::c_style>& addrs, int s_max) {
+		shards* s = (shards *)_s;
+		return s->threshold(n, addrs, s_max);
+	}, py::call_guard<py::gil_scoped_release>());
+}
@@ -0,0 +1,36 @@
+import numpy as np
+import _shards
+
+
+class shards:
+    # SHARDS hash-based address sampling: keeps every reference to the
+    # addresses whose hash mod P falls below a threshold T (rate T/P)
+    P = _shards.P
+
+    def __init__(self, seed=0):
+        self.seed = seed
+        self.s = _shards.shards_create(np.uint64(seed))
+
+    def filter(self, trace, T):
+        # the references to sampled addresses, in trace order
+        if type(trace[0]) != np.int32:
+            trace = np.array(trace, dtype=np.int32)
+        out = np.empty(len(trace), dtype=np.int32)
+        n = _shards.shards_filter(self.s, len(trace), trace, int(T), out)
+        return out[:n].copy()
+
+    def threshold(self, trace, s_max):
+        # fixed-size threshold after feeding trace (may be fed in chunks)
+        if type(trace[0]) != np.int32:
+            trace = np.array(trace, dtype=np.int32)
+        return _shards.shards_threshold(self.s, len(trace), trace, int(s_max))
+
+    def sample(self, trace, rate=None, s_max=None):
+        # fixed-rate (rate) or fixed-size (s_max) sample: (sampled trace, R)
+        if s_max is not None:
+            T = shards(self.seed).threshold(trace, s_max)
+        elif rate is not None:
+            T = max(1, int(round(rate * self.P)))
+        else:
+            raise ValueError("Either rate or s_max must be given.")
+        return self.filter(trace, T), T / self.P
@@ -5,36 +5,37 @@
 #include <pybind11/pybind11.h>
 #include <pybind11/stl.h>
 #include <pybind11/numpy.h>
+#include "sim_common.h"
 
 namespace py = pybind11;
 
 class sieve
 {
 	int C = 0;
-	std::list<int> cache; // front = head (newest), back = tail (oldest)
+	std::list<int64_t> cache; // front = head (newest), back = tail (oldest)
 	std::vector<char> map;		  
 	std::vector<int> counter;	   
-	std::vector<int> enter_time;   
-	std::vector<int> ref_time;	   
-	int n_top = 0;
+	std::vector<int64_t> enter_time;   
+	std::vector<int64_t> ref_time;	   
+	int64_t n_top = 0;
 	int K = 1;
 	double sum_top = 0, sum_top2 = 0;
 
-	int n_cachefill = 0;
-	int n_access = 0;
-	int n_miss = 0;
-	int n_recycle = 0;
-	int n_examined = 0;
-	int sum_counter = 0;
+	int64_t n_cachefill = 0;
+	int64_t n_access = 0;
+	int64_t n_miss = 0;
+	int64_t n_recycle = 0;
+	int64_t n_examined = 0;
+	int64_t sum_counter = 0;
 
-	std::list<int>::iterator hand;
+	std::list<int64_t>::iterator hand;
 	bool hand_valid = false;
 
-	void expand(int32_t addr)
+	void expand(int64_t addr)
 	{
-		if (addr >= static_cast<int32_t>(map.size()))
+		if (addr >= static_cast<int64_t>(map.size()))
 		{
-			int n = addr * 3 / 2 + 1;
+			int64_t n = addr * 3 / 2 + 1;
 			map.resize(n, 0);
 			counter.resize(n, 0);
 			enter_time.resize(n, 0);
@@ -42,7 +43,7 @@ class sieve
 		}
 	}
 
-	int pop(int* ref_age = nullptr, int* ent_age = nullptr)
+	int64_t pop(int64_t* ref_age = nullptr, int64_t* ent_age = nullptr)
 	{
 		if (cache.empty())
 			return -1;
@@ -57,7 +58,7 @@ class sieve
 		auto it = hand;
 		while (true)
 		{
-			int addr = *it;
+			int64_t addr = *it;
 			n_examined++;
 			if (counter[addr])
 			{
@@ -72,11 +73,11 @@ class sieve
 				continue;
 			}
 
-			int r_age = n_access - ref_time[addr];
-			int e_age = n_access - enter_time[addr];
-			int age = e_age;
+			int64_t r_age = n_access - ref_time[addr];
+			int64_t e_age = n_access - enter_time[addr];
+			int64_t age = e_age;
 			sum_top += age;
-			sum_top2 += (age * age);
+			sum_top2 += 1.0 * age * age;
 			n_top++;
 
 			if (it == cache.begin())
@@ -99,7 +100,7 @@ class sieve
 		}
 	}
 
-	void push(int addr)
+	void push(int64_t addr)
 	{
 		cache.push_front(addr);
 		map[addr] = 1;
@@ -122,16 +123,16 @@ public:
 		return static_cast<int>(cache.size()) >= C;
 	}
 
-	int contents(py::array_t< int >& val)
+	int contents(py::array_t< int64_t >& val)
 	{
-		int* val_ptr = val.mutable_data();
+		int64_t* val_ptr = val.mutable_data();
 		int n = 0;
-		for (int addr : cache)
+		for (int64_t addr : cache)
 			val_ptr[n++] = addr;
 		return n;
 	}
 
-	void access(int32_t addr)
+	void access(int64_t addr)
 	{
 		n_access++;
 		expand(addr);
@@ -146,7 +147,7 @@ public:
 			}
 			else
 			{
-				int evictee = pop();
+				int64_t evictee = pop();
 				(void)evictee;
 				push(addr);
 			}
@@ -159,8 +160,8 @@ public:
 		}
 	}
 
-	void access_verbose(int32_t addr, int32_t* evict_addr, int* miss,
-						int* ref_age, int* enter_age)
+	void access_verbose(int64_t addr, int64_t* evict_addr, int* miss,
+						int64_t* ref_age, int64_t* enter_age)
 	{
 		if (evict_addr)
 			*evict_addr = -1;
@@ -184,8 +185,8 @@ public:
 			}
 			else
 			{
-				int r_age = 0, e_age = 0;
-				int evictee = pop(&r_age, &e_age);
+				int64_t r_age = 0, e_age = 0;
+				int64_t evictee = pop(&r_age, &e_age);
 				if (evictee == -1)
 					return;
 				if (miss)
@@ -207,16 +208,17 @@ public:
 		}
 	}
 
-	void multi_access(int n, py::array_t< int32_t >& addrs)
+	template <class T>
+	void multi_access(int64_t n, py::array_t<T, py::array::c_style>& addrs)
 	{
-		int32_t* addrs_ptr = addrs.mutable_data();
-		for (int i = 0; i < n; i++)
+		const T* addrs_ptr = addrs.data();
+		for (int64_t i = 0; i < n; i++)
 			access(addrs_ptr[i]);
 	}
 
-	void queue_stats(py::array_t< int >& n, py::array_t<double>& sum, py::array_t<double>& sum2)
+	void queue_stats(py::array_t< int64_t >& n, py::array_t<double>& sum, py::array_t<double>& sum2)
 	{
-		int* n_ptr = n.mutable_data();
+		int64_t* n_ptr = n.mutable_data();
 		double* sum_ptr = sum.mutable_data();
 		double* sum2_ptr = sum2.mutable_data();
 		*n_ptr = n_top;
@@ -224,16 +226,17 @@ public:
 		*sum2_ptr = sum_top2;
 	}
 
-	void multi_access_age(int n, py::array_t< int32_t >& addrs, py::array_t< int >& evicted, py::array_t< int >& misses,
-						  py::array_t< int >& age1, py::array_t< int >& age2)
+	template <class T>
+	void multi_access_age(int64_t n, py::array_t<T, py::array::c_style>& addrs, py::array_t< int64_t >& evicted, py::array_t< int >& misses,
+						  py::array_t< int64_t >& age1, py::array_t< int64_t >& age2)
 	{
-		int32_t* addrs_ptr = addrs.mutable_data();
-		int* evicted_ptr = evicted.mutable_data();
+		const T* addrs_ptr = addrs.data();
+		int64_t* evicted_ptr = evicted.mutable_data();
 		int* misses_ptr = misses.mutable_data();
-		int* age1_ptr = age1.mutable_data();
-		int* age2_ptr = age2.mutable_data();
+		int64_t* age1_ptr = age1.mutable_data();
+		int64_t* age2_ptr = age2.mutable_data();
 
-		for (int i = 0; i < n; i++)
+		for (int64_t i = 0; i < n; i++)
 			access_verbose(addrs_ptr[i], &evicted_ptr[i], &misses_ptr[i], &age1_ptr[i], &age2_ptr[i]);
 	}
 
@@ -243,8 +246,8 @@ public:
 		return 1 - miss_rate;
 	}
 
-	void data(int &_access, int &_miss, int &_cachefill, int &_recycle,
-			  int &_examined, int &_sum_counter)
+	void data(int64_t &_access, int64_t &_miss, int64_t &_cachefill, int64_t &_recycle,
+			  int64_t &_examined, int64_t &_sum_counter)
 	{
 		_access = n_access;
 		_miss = n_miss;
@@ -255,32 +258,69 @@ public:
 	}
 };
 
+// the bindings that take a trace, for int32 or int64 addresses
+template <class T>
+static void def_runs(py::module_& m)
+{
+	m.def("sieve_run", [](void* _c, int64_t n, py::array_t<T, py::array::c_style>& a) {
+		sieve* c = (sieve *)_c;
+		c->multi_access(n, a);
+	}, py::call_guard<py::gil_scoped_release>());
+	// cumulative (accesses, misses) at window ends, see run_windows()
+	m.def("sieve_run_windows", [](void* _c, int64_t n, py::array_t<T, py::array::c_style>& a, int64_t first, int64_t window,
+								  py::array_t<int64_t>& acc, py::array_t<int64_t>& miss) {
+		sieve* c = (sieve*)_c;
+		return run_windows(*c, a.data(), n, first, window, acc.mutable_data(), miss.mutable_data(),
+						   [](sieve& c, int64_t& _a, int64_t& _m) { int64_t x[4]; c.data(_a, _m, x[0], x[1], x[2], x[3]); });
+	}, py::call_guard<py::gil_scoped_release>());
+	m.def("sieve_run_age", [](void* _c, int64_t n, py::array_t<T, py::array::c_style>& a, py::array_t< int64_t >& b, py::array_t< int >& c, py::array_t< int64_t >& d, py::array_t< int64_t >& e) {
+		sieve* cl = (sieve *)_c;
+		cl->multi_access_age(n, a, b, c, d, e);
+	}, py::call_guard<py::gil_scoped_release>());
+
+	// raw hit rate of one sieve per size, all run in a single tiled pass
+	m.def("sieve_mrc", [](int64_t n, py::array_t<T, py::array::c_style>& addrs, std::vector<int> sizes, int K, int threads) {
+		std::vector<std::unique_ptr<sieve>> caches;
+		for (int C : sizes)
+			caches.emplace_back(new sieve(C, K));
+		{
+			py::gil_scoped_release release;
+			run_tiled(caches, addrs.data(), n, threads);
+		}
+		py::array_t<double> hr(caches.size());
+		double* hr_ptr = hr.mutable_data();
+		for (size_t j = 0; j < caches.size(); j++)
+		{
+			int64_t a, m, c, r, x, y;
+			caches[j]->data(a, m, c, r, x, y);
+			hr_ptr[j] = a ? 1 - (double)m / a : 0;
+		}
+		return hr;
+	}, py::arg("n"), py::arg("addrs"), py::arg("sizes"), py::arg("K") = 1, py::arg("threads") = 1);
+}
+
 PYBIND11_MODULE(_sieve, m)
 {
 	py::class_<sieve>(m, "sieve")
 		.def(py::init<int, int>(), py::arg("C"), py::arg("K") = 1)
-		.def("multi_access", &sieve::multi_access)
+		.def("multi_access", &sieve::multi_access<int32_t>, py::call_guard<py::gil_scoped_release>())
+		.def("multi_access", &sieve::multi_access<int64_t>, py::call_guard<py::gil_scoped_release>())
 		.def("contents", &sieve::contents)
-		.def("multi_access_age", &sieve::multi_access_age)
+		.def("multi_access_age", &sieve::multi_access_age<int32_t>, py::call_guard<py::gil_scoped_release>())
+		.def("multi_access_age", &sieve::multi_access_age<int64_t>, py::call_guard<py::gil_scoped_release>())
 		.def("queue_stats", &sieve::queue_stats)
 		.def("hit_rate", &sieve::hit_rate)
 		.def("data", &sieve::data);
 	m.def("sieve_create", [](int C, int K) {
 		return new sieve(C, K);
 	}, py::arg("C"), py::arg("K") = 1);
-	m.def("sieve_run", [](void* _c, int n, py::array_t< int32_t >& a) {
-		sieve* c = (sieve *)_c;
-		c->multi_access(n, a);
-	});
-	m.def("sieve_contents", [](void* _c, py::array_t< int >& out) {
+	def_runs<int32_t>(m);
+	def_runs<int64_t>(m);
+	m.def("sieve_contents", [](void* _c, py::array_t< int64_t >& out) {
 		sieve* c = (sieve *)_c;
 		return c->contents(out);
 	});
-	m.def("sieve_run_age", [](void* _c, int n, py::array_t< int32_t >& a, py::array_t< int >& b, py::array_t< int >& c, py::array_t< int >& d, py::array_t< int >& e) {
-		sieve* cl = (sieve *)_c;
-		cl->multi_access_age(n, a, b, c, d, e);
-	});
-	m.def("sieve_queue_stats", [](void* _c, py::array_t< int >& n, py::array_t< double >& sum, py::array_t< double >& sum2) {
+	m.def("sieve_queue_stats", [](void* _c, py::array_t< int64_t >& n, py::array_t< double >& sum, py::array_t< double >& sum2) {
 		sieve* c = (sieve *)_c;
 		c->queue_stats(n, sum, sum2);
 	});
@@ -290,7 +330,7 @@ PYBIND11_MODULE(_sieve, m)
 	});
 	m.def("sieve_data", [](void* _c) -> py::tuple {
 		sieve* cl = (sieve *)_c;
-		int _access, _miss, _cachefill, _recycle, _examined, _sum_counter;
+		int64_t _access, _miss, _cachefill, _recycle, _examined, _sum_counter;
 		cl->data(_access, _miss, _cachefill, _recycle, _examined, _sum_counter);
 		return py::make_tuple(_access, _miss, _cachefill, _recycle, _examined, _sum_counter);
 	});
@@ -0,0 +1,69 @@
+#pragma once
+
+#include <stdint.h>
+#include <algorithm>
+#include <memory>
+#include <vector>
+#ifdef _OPENMP
+#include <omp.h>
+#endif
+
+/*
+  Multi-size simulation for the policies that are not stack algorithms
+  (FIFO, CLOCK, SIEVE, RAND(m), FIFO(m)), where an MRC needs one cache per
+  size. Instead of one full pass over the trace per size, the trace is cut
+  into tiles and every cache instance consumes a tile before moving on to
+  the next one, so the trace is streamed from memory once for all sizes.
+  A tile is 256K references (1 MB): small enough to be re-read from cache
+  by every instance, large enough that each instance only re-warms its own
+  per-address state once per tile (smaller tiles measured slower, since
+  that state, not the trace, dominates the working set). With OpenMP the
+  instances are split over `threads` threads (a fixed set of sizes per
+  thread, no barrier between tiles).
+ */
+
+#ifndef MRC_TILE
+#define MRC_TILE (1 << 18) // references per tile
+#endif
+
+template <class Cache, class T>
+void run_tiled(std::vector<std::unique_ptr<Cache>>& caches, const T* addrs, int64_t n, int threads)
+{
+	int k = caches.size();
+#ifdef _OPENMP
+#pragma omp parallel num_threads(std::max(1, threads))
+#endif
+	for (int64_t i0 = 0; i0 < n; i0 += MRC_TILE)
+	{
+		int64_t i1 = std::min<int64_t>(n, i0 + MRC_TILE);
+#ifdef _OPENMP
+#pragma omp for schedule(static) nowait
+#endif
+		for (int j = 0; j < k; j++)
+			for (int64_t i = i0; i < i1; i++)
+				caches[j]->access(addrs[i]);
+	}
+}
+
+/*
+  Windowed run, for hit rate over time: feeds n references to c and,
+  after every reference whose 1-based index is first + k*window, stores
+  c's cumulative access and miss counts (read by counts(c, acc, miss)) in
+  acc[k], miss[k]. Returns the number of windows closed; the caller takes
+  differences, and splits the trace wherever it wants cache snapshots.
+ */
+template <class Cache, class T, class Counts>
+int64_t run_windows(Cache& c, const T* addrs, int64_t n, int64_t first, int64_t window,
+					int64_t* acc, int64_t* miss, Counts counts)
+{
+	int64_t i = 0, k = 0;
+	for (int64_t end = first; end <= n; end += window, k++)
+	{
+		for (; i < end; i++)
+			c.access(addrs[i]);
+		counts(c, acc[k], miss[k]);
+	}
+	for (; i < n; i++)
+		c.access(addrs[i]);
+	return k;
+}
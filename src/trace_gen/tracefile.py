@@ -0,0 +1,170 @@
+# binary on-disk trace format, opened with np.memmap so that traces of any
+# size open at once and page in lazily.
+#
+# layout (little-endian):
+#   0   8 bytes  magic b'TGTRACE\0'
+#   8   u32      format version (1)
+#   12  u32      header size (64)
+#   16  u64      n, number of records
+#   24  4 x 4    dtype tags of the addr, length, op, time columns ('<i4\0',
+#                '<i8\0', ...; all zero = column absent)
+#   40  -        zero padding up to the header size
+# then each present column in that order, n raw values, starting on a
+# 64-byte boundary. addr is int32 or int64; the others may be any of
+# int8/16/32/64 and float32/64.
+
+import os
+import numpy as np
+from trace_gen.unroll import unroll
+
+MAGIC = b'TGTRACE\0'
+VERSION = 1
+HEADER = 64
+COLUMNS = ('addr', 'length', 'op', 'time')
+DTYPES = [np.dtype(t).newbyteorder('<') for t in
+          (np.int8, np.int16, np.int32, np.int64, np.float32, np.float64)]
+
+
+def _align(x):
+    return -(-x // 64) * 64
+
+
+def _tag(dtype):
+    if dtype is None:
+        return b'\0' * 4
+    return dtype.str.encode().ljust(4, b'\0')
+
+
+def _check_dtype(col, dtype):
+    dtype = np.dtype(dtype).newbyteorder('<')
+    if dtype not in DTYPES or (col == 'addr' and (dtype.kind != 'i' or dtype.itemsize < 4)):
+        raise ValueError(f"unsupported dtype {dtype} for column {col}")
+    return dtype
+
+
+class trace_writer:
+    # streams a trace to `path` chunk by chunk: write(addr, length=, op=, time=)
+    # per chunk, then close() (or use as a context manager). addr goes
+    # straight to the file; the optional columns are spooled to side files
+    # and appended at close.
+    def __init__(self, path, addr=np.int32, length=None, op=None, time=None):
+        dtypes = dict(zip(COLUMNS, (addr, length, op, time)))
+        self.dtypes = {c: _check_dtype(c, d) for c, d in dtypes.items() if d is not None}
+        self.path = path
+        self.n = 0
+        self.fp = open(path, 'wb')
+        self.fp.write(b'\0' * HEADER)
+        self.side = {c: open(f'{path}.{c}.tmp', 'w+b') for c in self.dtypes if c != 'addr'}
+
+    def write(self, addr, length=None, op=None, time=None):
+        cols = dict(zip(COLUMNS, (addr, length, op, time)))
+        n = np.shape(addr)[0]
+        for c, dtype in self.dtypes.items():
+            if cols[c] is None:
+                raise ValueError(f"missing column {c}")
+            a = np.ascontiguousarray(cols[c], dtype=dtype)
+            if a.shape != (n,):
+                raise ValueError(f"column {c} has {a.shape} values, expected {n}")
+            a.tofile(self.fp if c == 'addr' else self.side[c])
+        self.n += n
+
+    def close(self):
+        if self.fp is None:
+            return
+        fp = self.fp
+        for c, dtype in self.dtypes.items():
+            if c == 'addr':
+                continue
+            fp.write(b'\0' * (_align(fp.tell()) - fp.tell()))
+            side = self.side[c]
+            side.seek(0)
+            while True:
+                buf = side.read(1 << 24)
+                if not buf:
+                    break
+                fp.write(buf)
+            side.close()
+            os.remove(side.name)
+        fp.seek(0)
+        fp.write(MAGIC)
+        fp.write(np.array([VERSION, HEADER], dtype='<u4').tobytes())
+        fp.write(np.array([self.n], dtype='<u8').tobytes())
+        fp.write(b''.join(_tag(self.dtypes.get(c)) for c in COLUMNS))
+        fp.close()
+        self.fp = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def write_trace(path, addr, length=None, op=None, time=None, chunk=1 << 24):
+    """
+    write a whole trace (numpy arrays, memmaps included) to `path`; addr
+    keeps its dtype if int32/int64 (otherwise int64), the optional columns
+    keep theirs. Returns the number of records.
+    """
+    cols = [addr, length, op, time]
+    dtypes = [None if a is None else np.asarray(a).dtype for a in cols]
+    if dtypes[0] not in (np.int32, np.int64):
+        dtypes[0] = np.dtype(np.int64)
+    with trace_writer(path, *dtypes) as w:
+        for i in range(0, np.shape(addr)[0], chunk):
+            w.write(*[None if a is None else a[i:i + chunk] for a in cols])
+    return w.n
+
+
+class trace_file:
+    # a trace written by trace_writer/write_trace, memory-mapped read-only:
+    # .addr (and .length, .op, .time when present, else None) are np.memmap
+    # columns the simulators, sweep and mrc take as is
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as fp:
+            head = fp.read(40)
+        if len(head) < 40 or head[:8] != MAGIC:
+            raise ValueError(f"{path}: not a trace file")
+        version, header = np.frombuffer(head, dtype='<u4', count=2, offset=8)
+        if version != VERSION:
+            raise ValueError(f"{path}: unsupported trace file version {version}")
+        self.n = int(np.frombuffer(head, dtype='<u8', count=1, offset=16)[0])
+        offset = int(header)
+        for i, c in enumerate(COLUMNS):
+            tag = head[24 + 4 * i:28 + 4 * i].rstrip(b'\0')
+            if not tag:
+                setattr(self, c, None)
+                continue
+            dtype = np.dtype(tag.decode())
+            if self.n == 0:
+                setattr(self, c, np.zeros(0, dtype=dtype))
+            else:
+                setattr(self, c, np.memmap(path, dtype=dtype, mode='r', offset=offset, shape=(self.n,)))
+            offset = _align(offset + self.n * dtype.itemsize)
+
+    def __len__(self):
+        return self.n
+
+    def columns(self):
+        return [c for c in COLUMNS if getattr(self, c) is not None]
+
+    def chunks(self, chunk=1 << 20, columns=None, unrolled=False):
+        """
+        iterate over the trace `chunk` records at a time, as zero-copy
+        slices of the mapped columns: addr arrays by default, tuples with
+        columns= (names from COLUMNS). unrolled: yield the block
+        addresses covered by each chunk's (addr, length) extents instead
+        (see unroll).
+        """
+        for i in range(0, self.n, chunk):
+            if unrolled:
+                yield unroll(np.column_stack((self.length[i:i + chunk], self.addr[i:i + chunk])))
+            elif columns is None:
+                yield self.addr[i:i + chunk]
+            else:
+                yield tuple(getattr(self, c)[i:i + chunk] for c in columns)
+
+
+def open_trace(path):
+    return trace_file(path)
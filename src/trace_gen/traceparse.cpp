@@ -0,0 +1,348 @@
+#include <stdint.h>
+#include <string.h>
+#include <fcntl.h>
+#include <sys/mman.h>
+#include <sys/stat.h>
+#include <unistd.h>
+#include <algorithm>
+#include <charconv>
+#include <functional>
+#include <stdexcept>
+#include <string>
+#include <thread>
+#include <vector>
+#include <pybind11/pybind11.h>
+#include <pybind11/stl.h>
+#include <pybind11/numpy.h>
+
+namespace py = pybind11;
+
+/*
+  Parser for block I/O traces in delimited text (SPC, MSR Cambridge, the
+  trace-gen CLI's output): one request per line, with the ASU/disk, LBA
+  or byte offset, size, opcode and timestamp in configurable fields.
+
+  The file is memory-mapped; the byte range to parse is snapped to line
+  boundaries and split into one piece per thread at newlines. Each thread
+  counts its lines, the outputs are allocated for the total, then each
+  thread parses its lines into its own rows and the rows are compacted
+  over the lines that did not parse (headers, blank lines, comments).
+  Parsing a range [begin, end) of a large file bounds the memory to that
+  range's rows, which is how the chunk iterator walks a file.
+
+  Fields are split on `delim`, or on runs of spaces/tabs if delim is ' '.
+  Opcodes R/r/Read -> 0, W/w/Write -> 1, or a number as is.
+ */
+
+enum { ASU, LBA, SIZE, OP, TIME, NCOLS };
+
+class traceparse
+{
+	const char *data = nullptr;
+	size_t size = 0;
+	int fd = -1;
+
+public:
+	traceparse(const std::string &path)
+	{
+		fd = open(path.c_str(), O_RDONLY);
+		if (fd < 0)
+			throw std::runtime_error("cannot open " + path);
+		struct stat st;
+		fstat(fd, &st);
+		size = st.st_size;
+		if (size > 0)
+		{
+			void *p = mmap(nullptr, size, PROT_READ, MAP_PRIVATE, fd, 0);
+			if (p == MAP_FAILED)
+			{
+				close(fd);
+				throw std::runtime_error("cannot map " + path);
+			}
+			madvise(p, size, MADV_SEQUENTIAL);
+			data = (const char *)p;
+		}
+	}
+	~traceparse()
+	{
+		if (data)
+			munmap((void *)data, size);
+		if (fd >= 0)
+			close(fd);
+	}
+
+	size_t file_size() { return size; }
+	const char *data_ptr() { return data; }
+
+	// i if a line starts at i, else the start of the next line
+	size_t line_start(size_t i)
+	{
+		if (i == 0 || i >= size)
+			return std::min(i, size);
+		if (data[i - 1] == '\n')
+			return i;
+		const char *nl = (const char *)memchr(data + i, '\n', size - i);
+		return nl ? nl - data + 1 : size;
+	}
+
+	struct cols
+	{
+		int field[NCOLS]; // field index of each column, -1 if absent
+		char delim;
+		int32_t *asu;
+		int64_t *lba, *size;
+		int8_t *op;
+		double *time;
+	};
+
+	static bool parse_int(const char *b, const char *e, int64_t &v)
+	{
+		while (b < e && (*b == ' ' || *b == '\t'))
+			b++;
+		auto r = std::from_chars(b, e, v);
+		return r.ec == std::errc() && r.ptr != b;
+	}
+
+	static bool parse_op(const char *b, const char *e, int8_t &v)
+	{
+		while (b < e && (*b == ' ' || *b == '\t'))
+			b++;
+		if (b == e)
+			return false;
+		if (*b == 'R' || *b == 'r')
+			v = 0;
+		else if (*b == 'W' || *b == 'w')
+			v = 1;
+		else
+		{
+			int64_t x;
+			if (!parse_int(b, e, x))
+				return false;
+			v = x;
+		}
+		return true;
+	}
+
+	static bool parse_double(const char *b, const char *e, double &v)
+	{
+		while (b < e && (*b == ' ' || *b == '\t'))
+			b++;
+		auto r = std::from_chars(b, e, v);
+		return r.ec == std::errc() && r.ptr != b;
+	}
+
+	// parse line [b, e) into row j of c; false if a wanted field is missing or bad
+	static bool parse_line(const char *b, const char *e, const cols &c, int nf, int64_t j)
+	{
+		const char *fb[16], *fe[16];
+		int k = 0;
+		const char *p = b;
+		if (c.delim == ' ')
+		{
+			while (k < nf)
+			{
+				while (p < e && (*p == ' ' || *p == '\t'))
+					p++;
+				if (p == e)
+					break;
+				fb[k] = p;
+				while (p < e && *p != ' ' && *p != '\t')
+					p++;
+				fe[k++] = p;
+			}
+		}
+		else
+		{
+			while (k < nf && p <= e)
+			{
+				const char *q = (const char *)memchr(p, c.delim, e - p);
+				if (!q)
+					q = e;
+				fb[k] = p;
+				fe[k++] = q;
+				p = q + 1;
+			}
+		}
+		int64_t x;
+		int f;
+		if ((f = c.field[ASU]) >= 0)
+		{
+			if (f >= k || !parse_int(fb[f], fe[f], x))
+				return false;
+			c.asu[j] = x;
+		}
+		if ((f = c.field[LBA]) >= 0 && (f >= k || !parse_int(fb[f], fe[f], c.lba[j])))
+			return false;
+		if ((f = c.field[SIZE]) >= 0 && (f >= k || !parse_int(fb[f], fe[f], c.size[j])))
+			return false;
+		if ((f = c.field[OP]) >= 0 && (f >= k || !parse_op(fb[f], fe[f], c.op[j])))
+			return false;
+		if ((f = c.field[TIME]) >= 0 && (f >= k || !parse_double(fb[f], fe[f], c.time[j])))
+			return false;
+		return true;
+	}
+
+	static int64_t count_lines(const char *b, const char *e)
+	{
+		int64_t n = 0;
+		for (const char *p = b; p < e; p++)
+		{
+			p = (const char *)memchr(p, '\n', e - p);
+			if (!p)
+			{
+				n++; // last line without a newline
+				break;
+			}
+			n++;
+		}
+		return n;
+	}
+
+	// parse lines [b, e) into rows from `row`; returns # rows that parsed
+	static int64_t parse_range(const char *b, const char *e, const cols &c, int nf, int64_t row)
+	{
+		int64_t j = row;
+		while (b < e)
+		{
+			const char *nl = (const char *)memchr(b, '\n', e - b);
+			const char *le = nl ? nl : e;
+			const char *te = le;
+			if (te > b && te[-1] == '\r')
+				te--;
+			if (parse_line(b, te, c, nf, j))
+				j++;
+			b = le + 1;
+		}
+		return j - row;
+	}
+
+	// split [b, e) into pieces at line starts, one per thread
+	std::vector<size_t> split(size_t b, size_t e, int threads)
+	{
+		std::vector<size_t> cut{b};
+		for (int t = 1; t < threads; t++)
+		{
+			size_t p = std::max(cut.back(), line_start(b + (e - b) * t / threads));
+			cut.push_back(std::min(p, e));
+		}
+		cut.push_back(e);
+		return cut;
+	}
+};
+
+static void run_threads(int n, const std::function<void(int)> &f)
+{
+	std::vector<std::thread> ts;
+	for (int t = 1; t < n; t++)
+		ts.emplace_back(f, t);
+	f(0);
+	for (auto &t : ts)
+		t.join();
+}
+
+PYBIND11_MODULE(_traceparse, m)
+{
+	py::class_<traceparse>(m, "traceparse")
+		.def(py::init<const std::string &>())
+		.def("file_size", &traceparse::file_size)
+		.def("line_start", &traceparse::line_start);
+
+	m.def("traceparse_create", [](const std::string &path) {
+		return new traceparse(path);
+	});
+	m.def("traceparse_size", [](void *_p) {
+		traceparse *p = (traceparse *)_p;
+		return p->file_size();
+	});
+
+	/*
+	  parse the lines starting in [begin, end) (both move forward to the
+	  next line start); fields: field index of asu, lba, size, op, time (-1
+	  = skip). Returns (# rows, next offset, asu, lba, size, op, time), the
+	  arrays sized for every line and filled up to # rows, None if skipped.
+	 */
+	m.def("traceparse_parse", [](void *_p, int64_t begin, int64_t end, std::vector<int> fields,
+								 std::string delim, int threads) {
+		traceparse *p = (traceparse *)_p;
+		if (fields.size() != NCOLS || delim.size() != 1)
+			throw std::invalid_argument("traceparse_parse: need 5 field indices and a 1-char delimiter");
+		traceparse::cols c;
+		int nf = 0;
+		for (int i = 0; i < NCOLS; i++)
+		{
+			c.field[i] = fields[i];
+			nf = std::max(nf, fields[i] + 1);
+		}
+		if (nf > 16)
+			throw std::invalid_argument("traceparse_parse: field index above 15");
+		c.delim = delim[0];
+		threads = std::max(1, threads);
+
+		std::vector<size_t> cut;
+		std::vector<int64_t> lines(threads), rows(threads);
+		size_t b, e;
+		{
+			py::gil_scoped_release release;
+			b = p->line_start(std::max<int64_t>(0, begin));
+			e = std::max(b, p->line_start(std::max<int64_t>(0, end)));
+			if (e - b < ((size_t)1 << 20))
+				threads = 1; // not worth the threads
+			cut = p->split(b, e, threads);
+			const char *d = p->data_ptr();
+			run_threads(threads, [&](int t) {
+				lines[t] = traceparse::count_lines(d + cut[t], d + cut[t + 1]);
+			});
+		}
+		int64_t total = 0;
+		for (int t = 0; t < threads; t++)
+			total += lines[t];
+
+		auto alloc = [&](int col, auto *&ptr, auto tag) -> py::object {
+			using V = decltype(tag);
+			if (c.field[col] < 0)
+			{
+				ptr = nullptr;
+				return py::none();
+			}
+			py::array_t<V> a(total);
+			ptr = a.mutable_data();
+			return a;
+		};
+		py::object asu = alloc(ASU, c.asu, int32_t());
+		py::object lba = alloc(LBA, c.lba, int64_t());
+		py::object size = alloc(SIZE, c.size, int64_t());
+		py::object op = alloc(OP, c.op, int8_t());
+		py::object time = alloc(TIME, c.time, double());
+
+		int64_t n = 0;
+		{
+			py::gil_scoped_release release;
+			const char *d = p->data_ptr();
+			std::vector<int64_t> first(threads, 0);
+			for (int t = 1; t < threads; t++)
+				first[t] = first[t - 1] + lines[t - 1];
+			run_threads(threads, [&](int t) {
+				rows[t] = traceparse::parse_range(d + cut[t], d + cut[t + 1], c, nf, first[t]);
+			});
+			// compact: move each thread's rows down over the lines that did not parse
+			for (int t = 0; t < threads; t++)
+			{
+				if (n != first[t])
+				{
+					if (c.asu)
+						memmove(c.asu + n, c.asu + first[t], rows[t] * sizeof(int32_t));
+					if (c.lba)
+						memmove(c.lba + n, c.lba + first[t], rows[t] * sizeof(int64_t));
+					if (c.size)
+						memmove(c.size + n, c.size + first[t], rows[t] * sizeof(int64_t));
+					if (c.op)
+						memmove(c.op + n, c.op + first[t], rows[t] * sizeof(int8_t));
+					if (c.time)
+						memmove(c.time + n, c.time + first[t], rows[t] * sizeof(double));
+				}
+				n += rows[t];
+			}
+		}
+		return py::make_tuple(n, (int64_t)e, asu, lba, size, op, time);
+	});
+}
@@ -0,0 +1,79 @@
+import os
+import numpy as np
+from trace_gen.unroll import unroll
+import _traceparse
+
+# field index of each column (None = not in the format), the delimiter (' '
+# = runs of blanks) and the LBA unit in bytes
+FORMATS = {
+    # ASU,LBA,Size,Opcode,Timestamp; LBA in 512-byte sectors, size in bytes
+    'spc': dict(asu=0, lba=1, size=2, op=3, time=4, delim=',', sector=512),
+    # Timestamp,Hostname,DiskNumber,Type,Offset,Size,ResponseTime; bytes
+    'msr': dict(asu=2, lba=4, size=5, op=3, time=0, delim=',', sector=1),
+    # the trace-gen CLI: "op size offset", bytes
+    'tracegen': dict(asu=None, lba=2, size=1, op=0, time=None, delim=' ', sector=1),
+}
+FIELDS = ('asu', 'lba', 'size', 'op', 'time')
+
+
+class traceparse:
+    # memory-mapped text trace (SPC, MSR, trace-gen output, or any
+    # delimited layout given as fmt=dict(asu=, lba=, size=, op=, time=,
+    # delim=, sector=)), parsed natively on `threads` threads into typed
+    # columns: asu int32, lba/size int64, op int8 (read 0, write 1), time
+    # float64. Lines that do not parse (headers, comments) are skipped.
+    def __init__(self, path, fmt='spc', threads=None):
+        self.fmt = dict(FORMATS[fmt]) if isinstance(fmt, str) else dict(fmt)
+        self.p = _traceparse.traceparse_create(os.fspath(path))
+        self.threads = threads or os.cpu_count()
+        self.fields = [-1 if self.fmt.get(c) is None else int(self.fmt[c]) for c in FIELDS]
+
+    def __len__(self):
+        # size of the file in bytes
+        return _traceparse.traceparse_size(self.p)
+
+    def parse(self, begin=0, end=None):
+        # dict column -> array for the lines starting in [begin, end) bytes,
+        # and the offset of the line after them
+        end = len(self) if end is None else end
+        n, nxt, *cols = _traceparse.traceparse_parse(self.p, begin, end, self.fields,
+                                                     self.fmt.get('delim', ','), self.threads)
+        return {c: a[:n] for c, a in zip(FIELDS, cols) if a is not None}, nxt
+
+    def read(self):
+        # the whole file
+        return self.parse()[0]
+
+    def chunks(self, chunk_bytes=64 << 20):
+        # the file chunk_bytes at a time (rounded to whole lines), so the
+        # parsed columns of only one chunk are in memory at once
+        pos = 0
+        while pos < len(self):
+            cols, pos = self.parse(pos, pos + chunk_bytes)
+            yield cols
+
+    def extents(self, cols, block=4096):
+        # (length, first block) of every request in cols, the n x 2 layout
+        # unroll takes; requests are rounded out to whole blocks
+        off = cols['lba'] * self.fmt.get('sector', 1)
+        first = off // block
+        last = (off + np.maximum(cols['size'], 1) - 1) // block
+        return np.column_stack((last - first + 1, first))
+
+    def blocks(self, block=4096, chunk_bytes=None):
+        # the block address trace: every block of every request, in order
+        if chunk_bytes is None:
+            return unroll(self.extents(self.read(), block))
+        parts = [unroll(self.extents(c, block)) for c in self.chunks(chunk_bytes)]
+        return np.concatenate(parts) if parts else np.zeros(0, dtype=np.int32)
+
+
+def read_csv(path, fmt='spc', threads=None):
+    # parsed columns of a whole SPC/MSR/trace-gen text trace, see traceparse
+    return traceparse(path, fmt, threads).read()
+
+
+def read_blocks(path, fmt='spc', block=4096, threads=None):
+    # block address trace of a text trace, ready for the simulators or
+    # TraceReconstructor
+    return traceparse(path, fmt, threads).blocks(block)
@@ -6,12 +6,15 @@
 
 namespace py = pybind11;
 
-int unroll(int32_t n_in, py::array_t< int32_t >& len, py::array_t< int32_t >& addr,
-           int32_t n_out, py::array_t< int32_t >& out) {
-    const int32_t* len_ptr = len.data();
-    const int32_t* addr_ptr = addr.data();
-    int32_t* out_ptr = out.mutable_data();
-    int i, j, k;
+// T: address type (int32, or int64 for addresses past 2^31)
+template <class T>
+int64_t unroll(int64_t n_in, py::array_t< int64_t >& len, py::array_t<T, py::array::c_style>& addr,
+           int64_t n_out, py::array_t< T >& out) {
+    const int64_t* len_ptr = len.data();
+    const T* addr_ptr = addr.data();
+    T* out_ptr = out.mutable_data();
+    int64_t i, j;
+    T k;
     for (i = j = 0; i < n_in && j < n_out; i++)
     {
         for (k = addr_ptr[i]; k < addr_ptr[i] + len_ptr[i]; k++)
@@ -21,5 +24,6 @@ int unroll(int32_t n_in, py::array_t< int32_t >& len, py::array_t< int32_t >& ad
 }
 
 PYBIND11_MODULE(_unroll, m) {
-    m.def("unroll", &unroll);
-}
\ No newline at end of file
+    m.def("unroll", &unroll<int32_t>);
+    m.def("unroll", &unroll<int64_t>);
+}
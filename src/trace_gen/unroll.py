@@ -2,9 +2,12 @@ import numpy as np
 import _unroll 
 
 def unroll(len_addr):
-    l = np.array(len_addr[:, 0], dtype=np.int32)
-    a = np.array(len_addr[:, 1], dtype=np.int32)
-    n_out = np.sum(l)
-    out = np.zeros(n_out, dtype=np.int32)
+    l = np.array(len_addr[:, 0], dtype=np.int64)
+    a = np.array(len_addr[:, 1], dtype=np.int64)
+    # int32 output unless the addresses need 64 bits
+    dtype = np.int32 if len(a) == 0 or (a + l).max() <= np.iinfo(np.int32).max else np.int64
+    a = a.astype(dtype)
+    n_out = int(np.sum(l))
+    out = np.zeros(n_out, dtype=dtype)
     n = _unroll.unroll(len(l), l, a, n_out, out)
     return out[:n]
@@ -0,0 +1,45 @@
+import numpy as np
+
+
+def run_windows(sim, native, handle, trace, window, snapshots=None):
+    """
+    hit-rate time series of simulator sim (any wrapper with amap, data()
+    and contents()) over trace: the accesses and misses of every window of
+    `window` references (the last one may be shorter), as two int64
+    arrays. native(handle, n, trace, first, window, acc, miss) is the
+    module's *_run_windows binding, which runs the whole trace in one call
+    and records the cumulative counters at the window ends.
+    snapshots: reference offsets after which to also take sim.contents();
+    the trace is only split at those, so they should be few (sampled).
+    Returns (accesses, misses), or (accesses, misses, contents list) when
+    snapshots is given.
+    """
+    window = int(window)
+    if window <= 0:
+        raise ValueError("window must be positive")
+    if sim.amap is not None:
+        trace = sim.amap.map(trace)
+    elif len(trace) and type(trace[0]) not in (np.int32, np.int64):
+        trace = np.array(trace, dtype=np.int32)
+    n = len(trace)
+    k = -(-n // window)
+    acc = np.zeros(k + 1, dtype=np.int64)
+    miss = np.zeros(k + 1, dtype=np.int64)
+    acc[0], miss[0] = sim.data()[:2]
+    offsets = [] if snapshots is None else [int(s) for s in snapshots]
+    if any(s < 0 or s > n for s in offsets):
+        raise ValueError("snapshot offsets must be within the trace")
+    taken = {}
+    j, pos = 1, 0   # next window end to record is j * window
+    for end in sorted(set(offsets)) + [n]:
+        if end > pos:
+            j += native(handle, end - pos, trace[pos:end], j * window - pos, window, acc[j:], miss[j:])
+            pos = end
+        if end not in taken and end in offsets:
+            taken[end] = sim.contents()
+    if n % window:
+        acc[k], miss[k] = sim.data()[:2]
+    acc, miss = np.diff(acc), np.diff(miss)
+    if snapshots is None:
+        return acc, miss
+    return acc, miss, [taken[s] for s in offsets]